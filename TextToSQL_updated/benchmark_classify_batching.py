@@ -0,0 +1,154 @@
+"""Throughput of classify_query with and without micro-batching under load
+
+Runs `--concurrency` threads, each classifying questions back to back, once
+with every request making its own (streamed) classification call and once
+through the Redis batch queue (CLASSIFY_BATCH_*). Needs Redis.
+
+    # Simulated provider: 0.4s per call + 10ms per query, at most 8 calls in flight
+    python benchmark_classify_batching.py --requests 400 --concurrency 64
+
+    # The configured LLM_WITHOUT_REASONING model (spends tokens)
+    python benchmark_classify_batching.py --llm configured --requests 100 --concurrency 16
+
+Reports requests per second, p50 / p95 latency, LLM calls and the mean batch
+size for both modes. The simulated provider's concurrency cap stands in for
+rate limits and connection limits, where per-request overhead hurts most.
+"""
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from langchain_core.messages import AIMessage
+
+from src.agents.nodes import decisive_label
+from src.config import Settings
+from src.core.classify_batch import ClassifyBatcher
+from src.core.dependencies import get_llm_manager, get_redis_client
+from src.core.llm_calls import get_llm_caller
+from src.prompts.system_prompts import get_classify_query_prompt
+
+QUESTIONS = [
+    ("how many teams can a chapter send for cricket", "IN_DOMAIN_DB_QUERY"),
+    ("what is the points table for football", "IN_DOMAIN_DB_QUERY"),
+    ("when is the badminton final", "IN_DOMAIN_WEB_SEARCH"),
+    ("who won chess last year", "IN_DOMAIN_WEB_SEARCH"),
+    ("what about the second one", "IN_DOMAIN_WITHIN_PREVIOUS_CONVERSATION"),
+    ("what's the weather in ahmedabad", "OUT_OF_DOMAIN"),
+]
+_EXPECTED = dict(QUESTIONS)
+
+
+class SimulatedLLM:
+    """Provider stand-in: fixed overhead per call plus a per-query cost, with limited concurrency"""
+
+    def __init__(self, overhead: float, per_item: float, concurrency: int):
+        self.overhead = overhead
+        self.per_item = per_item
+        self.slots = threading.Semaphore(concurrency)
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def bind(self, **kwargs):
+        return self
+
+    def _call(self, items: int) -> None:
+        with self.slots:
+            with self._lock:
+                self.calls += 1
+            time.sleep(self.overhead + self.per_item * items)
+
+    def invoke(self, messages):
+        items = json.loads(messages[-1]["content"])
+        self._call(len(items))
+        routes = [{"index": item["index"], "route": _EXPECTED.get(item["query"], "OUT_OF_DOMAIN")} for item in items]
+        return AIMessage(content=json.dumps({"routes": routes}))
+
+    def stream(self, messages):
+        self._call(1)
+        yield AIMessage(content=json.dumps({"route": _EXPECTED.get(messages[-1]["content"], "OUT_OF_DOMAIN")}))
+
+
+def prompt(question: str) -> list[dict]:
+    return [
+        {"role": "system", "content": get_classify_query_prompt()},
+        {"role": "system", "content": 'PREVIOUS CONVERSATION (JSON; "summary" covers older turns, "recent" are the latest messages verbatim):\n{}'},
+        {"role": "user", "content": question},
+    ]
+
+
+def run(mode: str, llm, batcher: ClassifyBatcher, requests: int, concurrency: int) -> dict:
+    llm_caller = get_llm_caller()
+    classify_llm = llm_caller.limited(llm, "classify_query")
+    latencies, correct = [], 0
+    lock = threading.Lock()
+    calls_before = getattr(llm, "calls", 0)
+
+    def one(question: str, expected: str) -> None:
+        nonlocal correct
+        start_time = time.perf_counter()
+        label = batcher.classify(llm, prompt(question)) if mode == "batched" else None
+        if label is None:
+            label, _ = llm_caller.stream_until("classify_query", classify_llm, prompt(question), decisive_label)
+        with lock:
+            latencies.append(time.perf_counter() - start_time)
+            correct += label == expected
+
+    workload = [random.choice(QUESTIONS) for _ in range(requests)]
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(lambda item: one(*item), workload))
+    elapsed = time.perf_counter() - start_time
+    latencies.sort()
+    calls = getattr(llm, "calls", 0) - calls_before
+    return {
+        "mode": mode,
+        "rps": requests / elapsed,
+        "p50": latencies[len(latencies) // 2],
+        "p95": latencies[int(len(latencies) * 0.95)],
+        "calls": calls,
+        "batch": requests / calls if calls else float("nan"),
+        "accuracy": correct / requests,
+    }
+
+
+def main():
+    config = Settings.from_env().classify_batch
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--llm", choices=("simulated", "configured"), default="simulated")
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--window-ms", type=float, default=config.window * 1000)
+    parser.add_argument("--max-items", type=int, default=config.max_items)
+    parser.add_argument("--overhead", type=float, default=0.4, help="simulated seconds per call")
+    parser.add_argument("--per-item", type=float, default=0.01, help="simulated seconds per classified query")
+    parser.add_argument("--provider-concurrency", type=int, default=8, help="simulated calls in flight")
+    args = parser.parse_args()
+
+    if not get_redis_client():
+        print("Redis is required for the batched mode")
+        sys.exit(1)
+    if args.llm == "simulated":
+        llm = SimulatedLLM(args.overhead, args.per_item, args.provider_concurrency)
+    else:
+        llm = get_llm_manager().get_model_without_reasoning()
+    config.enabled, config.window, config.max_items = True, args.window_ms / 1000, args.max_items
+    batcher = ClassifyBatcher(config)
+
+    results = [run(mode, llm, batcher, args.requests, args.concurrency) for mode in ("unbatched", "batched")]
+    print(f"\n{'mode':<10} {'req/s':>8} {'p50 s':>7} {'p95 s':>7} {'LLM calls':>10} {'per call':>9} {'accuracy':>9}")
+    for r in results:
+        calls = f"{r['calls']:>10}" if r["calls"] else f"{'n/a':>10}"
+        print(f"{r['mode']:<10} {r['rps']:>8.1f} {r['p50']:>7.2f} {r['p95']:>7.2f} {calls} {r['batch']:>9.1f} {r['accuracy']:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
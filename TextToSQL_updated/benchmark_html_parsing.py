@@ -0,0 +1,78 @@
+"""Micro-benchmark of HTML text extraction per siciliangames.com page
+
+Fetches each page once through the shared HTTP client (or reads local files)
+and times every available extractor (selectolax, lxml, bs4) on it:
+
+    # All pages the web topic router knows about
+    python benchmark_html_parsing.py --repeat 50
+
+    # Saved pages
+    python benchmark_html_parsing.py --file schedule.html --file winners.html
+
+Reports median / p95 milliseconds per parse and the extracted text size, so
+parser choices can be compared on the real pages.
+"""
+
+import argparse
+import statistics
+import sys
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from src.tools import http_client
+from src.tools.web_scraper import HTML_EXTRACTORS, get_topic_router
+
+
+def load_pages(urls: list[str], files: list[str]) -> dict[str, bytes]:
+    pages = {}
+    for path in files:
+        with open(path, "rb") as f:
+            pages[path] = f.read()
+    for url in urls:
+        start = time.perf_counter()
+        resp = http_client.fetch(url)
+        print(f"fetched {url}: {len(resp.content) / 1024:.1f} KiB over {resp.http_version} "
+              f"in {(time.perf_counter() - start) * 1000:.0f} ms")
+        pages[url] = resp.content
+    return pages
+
+
+def benchmark(pages: dict[str, bytes], repeat: int) -> list[tuple]:
+    rows = []
+    for name, html in pages.items():
+        for parser, extractor in HTML_EXTRACTORS.items():
+            timings = []
+            text = ""
+            for _ in range(repeat):
+                start = time.perf_counter()
+                text = extractor(html, "\n")
+                timings.append((time.perf_counter() - start) * 1000)
+            timings.sort()
+            p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+            rows.append((name, parser, statistics.median(timings), p95, len(text.split())))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", action="append", default=[], help="Page URL (repeatable)")
+    parser.add_argument("--file", action="append", default=[], help="Saved HTML file (repeatable)")
+    parser.add_argument("--repeat", type=int, default=20, help="Parses per page and parser")
+    args = parser.parse_args()
+
+    urls = args.url or ([] if args.file else get_topic_router().urls())
+    pages = load_pages(urls, args.file)
+    if not pages:
+        print("No pages to benchmark")
+        sys.exit(1)
+
+    print(f"\n{'page':<50} {'parser':<11} {'median ms':>10} {'p95 ms':>9} {'words':>7}")
+    for name, parser_name, median, p95, words in benchmark(pages, args.repeat):
+        print(f"{name[-50:]:<50} {parser_name:<11} {median:>10.2f} {p95:>9.2f} {words:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+"""Load-test driver for the WhatsApp webhook and RQ pipeline
+
+Two modes:
+
+    # 1. Start the local Twilio stand-in (records every outbound send)
+    python load_test_whatsapp.py stub --port 8099
+
+    # 2. Point the API + workers at the stand-in and replay traffic
+    #    (workers need TWILIO_API_BASE_URL=http://<stub-host>:8099 and
+    #     non-empty TWILIO_ACCOUNT_SID / TWILIO_AUTH_TOKEN values)
+    python load_test_whatsapp.py run --rate 2 --duration 60
+
+The driver posts form-encoded Twilio payloads to /webhook/whatsapp at a fixed
+rate, each from a unique sender number, samples the RQ queue depth and worker
+states while the run is in progress, then matches the stand-in's recorded sends
+back to the originating message to compute end-to-end latency (webhook receipt
+-> last chunk sent). Run the stub on the same host as the driver so both sides
+share a clock.
+"""
+
+import argparse
+import json
+import math
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DEFAULT_QUESTIONS = [
+    "How many players can a Below 40 chapter send in badminton?",
+    "What is the maximum participation for cricket?",
+    "Who won the last edition?",
+    "What is the schedule for 25th Dec?",
+    "Who are the sponsors of Sicilian Games?",
+    "Can one person play more than two events?",
+    "Hi",
+]
+
+
+# ---------------------------------------------------------------------------
+# Twilio stand-in
+# ---------------------------------------------------------------------------
+
+def run_stub(host: str, port: int) -> None:
+    """Run a minimal Twilio Messages API that records sends with timestamps"""
+    import uvicorn
+    from fastapi import FastAPI, Request
+    from fastapi.responses import JSONResponse
+
+    app = FastAPI(title="Twilio stand-in")
+    sends = []
+    lock = threading.Lock()
+
+    @app.post("/2010-04-01/Accounts/{account_sid}/Messages.json")
+    async def create_message(account_sid: str, request: Request):
+        form = await request.form()
+        received_at = time.time()
+        with lock:
+            sid = f"SM{len(sends):032d}"
+            sends.append({
+                "sid": sid,
+                "to": form.get("To"),
+                "from": form.get("From"),
+                "body": form.get("Body", ""),
+                "received_at": received_at,
+            })
+        return JSONResponse(
+            status_code=201,
+            content={
+                "sid": sid,
+                "account_sid": account_sid,
+                "to": form.get("To"),
+                "from": form.get("From"),
+                "body": form.get("Body", ""),
+                "status": "queued",
+            },
+        )
+
+    @app.get("/sends")
+    async def list_sends():
+        with lock:
+            return list(sends)
+
+    @app.delete("/sends")
+    async def reset_sends():
+        with lock:
+            sends.clear()
+        return {"status": "cleared"}
+
+    uvicorn.run(app, host=host, port=port, log_level="warning", ws="none")
+
+
+# ---------------------------------------------------------------------------
+# Load generator
+# ---------------------------------------------------------------------------
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile (values need not be sorted)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def sample_queue(redis_url: str, queue_name: str, interval: float, stop: threading.Event, samples: list) -> None:
+    """Record queue depth and busy/total worker counts until stopped"""
+    from redis import Redis
+    from rq import Queue, Worker
+
+    conn = Redis.from_url(redis_url, socket_timeout=5, socket_connect_timeout=5)
+    queue = Queue(queue_name, connection=conn)
+    started = time.time()
+    while not stop.is_set():
+        try:
+            workers = Worker.all(connection=conn)
+            busy = sum(1 for w in workers if w.get_state() == "busy")
+            samples.append({
+                "t": round(time.time() - started, 2),
+                "queue_depth": queue.count,
+                "busy_workers": busy,
+                "total_workers": len(workers),
+            })
+        except Exception as e:
+            print(f"Queue sampling failed: {e}")
+        stop.wait(interval)
+
+
+def post_webhook(webhook_url: str, sender: str, body: str) -> dict:
+    """Post a single Twilio-style form payload and time the webhook response"""
+    sent_at = time.time()
+    try:
+        resp = requests.post(
+            webhook_url,
+            data={"Body": body, "From": sender, "To": "whatsapp:+14155238886"},
+            timeout=30,
+        )
+        ok = resp.status_code == 200
+    except Exception as e:
+        print(f"Webhook post failed for {sender}: {e}")
+        ok = False
+    return {
+        "sender": sender,
+        "body": body,
+        "sent_at": sent_at,
+        "webhook_latency": time.time() - sent_at,
+        "ok": ok,
+    }
+
+
+def fetch_sends(stub_url: str) -> list[dict]:
+    resp = requests.get(f"{stub_url}/sends", timeout=10)
+    resp.raise_for_status()
+    return resp.json()
+
+
+def run_load(args) -> dict:
+    """Replay traffic at a fixed rate and build the latency/queue report"""
+    from src.config import Settings
+
+    settings = Settings.from_env()
+    questions = DEFAULT_QUESTIONS
+    if args.questions:
+        with open(args.questions, encoding="utf-8") as f:
+            questions = [line.strip() for line in f if line.strip()]
+
+    webhook_url = f"{args.url.rstrip('/')}/webhook/whatsapp"
+    stub_url = args.stub_url.rstrip("/")
+    requests.delete(f"{stub_url}/sends", timeout=10).raise_for_status()
+
+    samples: list[dict] = []
+    stop = threading.Event()
+    sampler = threading.Thread(
+        target=sample_queue,
+        args=(args.redis_url or settings.redis.url, args.queue, args.sample_interval, stop, samples),
+        daemon=True,
+    )
+    sampler.start()
+
+    total = max(1, int(args.rate * args.duration))
+    interval = 1.0 / args.rate
+    print(f"Sending {total} messages to {webhook_url} at {args.rate}/s")
+
+    run_started = time.time()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        futures = []
+        for i in range(total):
+            # Pace against the schedule rather than sleeping a fixed interval
+            delay = run_started + i * interval - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            sender = f"whatsapp:+1999{i:07d}"
+            futures.append(pool.submit(post_webhook, webhook_url, sender, questions[i % len(questions)]))
+        posts = [f.result() for f in futures]
+    send_window = time.time() - run_started
+
+    # Wait until every accepted message has produced at least one send and
+    # no further chunks arrive for a quiet period (or give up at the timeout)
+    expected = {p["sender"].replace("whatsapp:", "") for p in posts if p["ok"]}
+    drain_deadline = time.time() + args.drain_timeout
+    last_count, last_change = -1, time.time()
+    sends = []
+    while time.time() < drain_deadline:
+        sends = fetch_sends(stub_url)
+        answered = {s["to"].replace("whatsapp:", "") for s in sends if s.get("to")}
+        if len(sends) != last_count:
+            last_count, last_change = len(sends), time.time()
+        if expected <= answered and time.time() - last_change >= args.quiet_period:
+            break
+        time.sleep(0.5)
+    stop.set()
+    sampler.join(timeout=args.sample_interval + 5)
+
+    last_send_by_number: dict[str, float] = {}
+    chunks_by_number: dict[str, int] = {}
+    for s in sends:
+        number = (s.get("to") or "").replace("whatsapp:", "")
+        last_send_by_number[number] = max(last_send_by_number.get(number, 0.0), s["received_at"])
+        chunks_by_number[number] = chunks_by_number.get(number, 0) + 1
+
+    e2e = []
+    for p in posts:
+        number = p["sender"].replace("whatsapp:", "")
+        if p["ok"] and number in last_send_by_number:
+            e2e.append(last_send_by_number[number] - p["sent_at"])
+
+    completed_at = max(last_send_by_number.values(), default=run_started)
+    busy_ratios = [s["busy_workers"] / s["total_workers"] for s in samples if s["total_workers"]]
+    depths = [s["queue_depth"] for s in samples]
+    webhook_latencies = [p["webhook_latency"] for p in posts]
+
+    return {
+        "messages_sent": total,
+        "webhook_accepted": sum(1 for p in posts if p["ok"]),
+        "completed": len(e2e),
+        "target_rate": args.rate,
+        "achieved_send_rate": round(total / send_window, 3) if send_window else None,
+        "sustained_throughput": round(len(e2e) / (completed_at - run_started), 3) if e2e else 0.0,
+        "chunks_sent": len(sends),
+        "webhook_latency": {
+            "p50": round(percentile(webhook_latencies, 50), 3),
+            "p95": round(percentile(webhook_latencies, 95), 3),
+            "max": round(max(webhook_latencies, default=0.0), 3),
+        },
+        "end_to_end_latency": {
+            "p50": round(percentile(e2e, 50), 3),
+            "p90": round(percentile(e2e, 90), 3),
+            "p95": round(percentile(e2e, 95), 3),
+            "p99": round(percentile(e2e, 99), 3),
+            "max": round(max(e2e, default=0.0), 3),
+            "mean": round(statistics.mean(e2e), 3) if e2e else 0.0,
+        },
+        "queue_depth": {
+            "max": max(depths, default=0),
+            "mean": round(statistics.mean(depths), 2) if depths else 0,
+            "series": samples if args.include_series else None,
+        },
+        "worker_utilization": round(statistics.mean(busy_ratios), 3) if busy_ratios else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    stub = sub.add_parser("stub", help="Run the local Twilio stand-in")
+    stub.add_argument("--host", default="0.0.0.0")
+    stub.add_argument("--port", type=int, default=8099)
+
+    run = sub.add_parser("run", help="Replay WhatsApp traffic against the webhook")
+    run.add_argument("--url", default="http://localhost:8010", help="Base URL of the API")
+    run.add_argument("--stub-url", default="http://localhost:8099", help="Base URL of the Twilio stand-in")
+    run.add_argument("--redis-url", default=None, help="Redis URL (defaults to Settings.redis.url)")
+    run.add_argument("--queue", default="default", help="RQ queue to sample")
+    run.add_argument("--rate", type=float, default=1.0, help="Messages per second")
+    run.add_argument("--duration", type=float, default=30.0, help="Seconds of traffic to generate")
+    run.add_argument("--concurrency", type=int, default=32, help="Max in-flight webhook posts")
+    run.add_argument("--questions", default=None, help="File with one question per line")
+    run.add_argument("--sample-interval", type=float, default=1.0, help="Queue sampling interval (s)")
+    run.add_argument("--drain-timeout", type=float, default=600.0, help="Max wait for replies after sending (s)")
+    run.add_argument("--quiet-period", type=float, default=5.0, help="Seconds without new sends before stopping")
+    run.add_argument("--include-series", action="store_true", help="Include the raw queue samples in the report")
+    run.add_argument("--output", default=None, help="Write the JSON report to this file")
+
+    args = parser.parse_args()
+    if args.command == "stub":
+        run_stub(args.host, args.port)
+        return
+
+    report = run_load(args)
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        sys.exit(130)
@@ -0,0 +1,95 @@
+"""Minimal OpenAI-compatible chat endpoint for exercising LLM_BACKENDS failover locally
+
+    # Two stand-ins: a healthy one and one that fails 50% of requests slowly
+    python mock_llm_server.py --port 8101
+    python mock_llm_server.py --port 8102 --latency 3 --error-rate 0.5
+
+    # Point the API / workers at them
+    LLM_BACKENDS=flaky=http://localhost:8102/v1,healthy=http://localhost:8101/v1
+
+Every /v1/chat/completions request is answered after `--latency` seconds with
+a fixed assistant message (streamed when requested), or with HTTP 503 with
+probability `--error-rate`. The running error rate and latency can be changed
+at runtime with POST /control?latency=..&error_rate=.. to simulate an incident.
+It does not emulate tool calls or structured output; use it for latency and
+failover drills, not answer quality.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+
+
+def build_app(latency: float, error_rate: float, reply: str):
+    from fastapi import FastAPI, Request
+    from fastapi.responses import JSONResponse, StreamingResponse
+
+    app = FastAPI(title="LLM stand-in")
+    state = {"latency": latency, "error_rate": error_rate, "requests": 0, "errors": 0}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        state["requests"] += 1
+        await asyncio.sleep(state["latency"])
+        if random.random() < state["error_rate"]:
+            state["errors"] += 1
+            return JSONResponse({"error": {"message": "stand-in failure", "type": "server_error"}}, status_code=503)
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+        model = body.get("model", "stand-in")
+        if body.get("stream"):
+            async def events():
+                for i in range(0, len(reply), 8):
+                    chunk = {
+                        "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                        "choices": [{"index": 0, "delta": {"role": "assistant", "content": reply[i:i + 8]}, "finish_reason": None}],
+                    }
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                done = {
+                    "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                    "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                }
+                yield f"data: {json.dumps(done)}\n\ndata: [DONE]\n\n"
+            return StreamingResponse(events(), media_type="text/event-stream")
+
+        return {
+            "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        }
+
+    @app.post("/control")
+    async def control(latency: float = None, error_rate: float = None):
+        if latency is not None:
+            state["latency"] = latency
+        if error_rate is not None:
+            state["error_rate"] = error_rate
+        return state
+
+    @app.get("/stats")
+    async def stats():
+        return state
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8101)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds before each response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with HTTP 503")
+    parser.add_argument("--reply", default="OUT_OF_DOMAIN", help="assistant message content")
+    args = parser.parse_args()
+
+    import uvicorn
+    uvicorn.run(build_app(args.latency, args.error_rate, args.reply), host=args.host, port=args.port, log_level="warning", ws="none")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""Token-budgeted prompt assembly for the LLM nodes
+
+Each node declares the parts of its prompt (system prompt, schema, examples,
+history, query result, question) with a priority and a trim strategy. When the
+total exceeds the node's budget, the lowest-priority trimmable part is trimmed
+first until the prompt fits or only untrimmable parts are left. The token
+composition of every call is logged and the total recorded per node.
+"""
+
+import json
+import logging
+from dataclasses import dataclass, field
+from typing import Union
+
+from langchain_core.messages import BaseMessage, ToolMessage
+
+from src.utils import metrics
+from src.utils.tokens import count_tokens, tokenizer_name, truncate_tokens
+
+logger = logging.getLogger(__name__)
+
+CONTEXT_TOKEN_BUCKETS = (250, 500, 1000, 2000, 4000, 8000, 16000)
+
+MESSAGE_OVERHEAD_TOKENS = 4  # Role and delimiters per chat message
+
+# Trim strategies
+KEEP = "keep"          # Never trimmed
+DROP = "drop"          # Removed as a whole
+OLDEST = "oldest"      # Oldest messages removed first (tool calls stay with their results)
+TRUNCATE = "truncate"  # Text of the longest message cut down
+
+Message = Union[dict, BaseMessage]
+
+
+def _content_text(content) -> str:
+    if isinstance(content, str):
+        return content
+    return json.dumps(content, ensure_ascii=False)
+
+
+def message_tokens(message: Message) -> int:
+    """Tokens of one chat message, including tool call arguments"""
+    if isinstance(message, dict):
+        return MESSAGE_OVERHEAD_TOKENS + count_tokens(_content_text(message.get("content", "")))
+    tokens = MESSAGE_OVERHEAD_TOKENS + count_tokens(_content_text(message.content))
+    for tool_call in getattr(message, "tool_calls", None) or []:
+        tokens += count_tokens(tool_call.get("name", "")) + count_tokens(json.dumps(tool_call.get("args", {})))
+    return tokens
+
+
+def _with_content(message: Message, content: str) -> Message:
+    if isinstance(message, dict):
+        return {**message, "content": content}
+    return message.model_copy(update={"content": content})
+
+
+def _groups(messages: list[Message]) -> list[list[Message]]:
+    """Messages grouped so an AI tool call and its ToolMessages are removed together"""
+    groups: list[list[Message]] = []
+    for message in messages:
+        if isinstance(message, ToolMessage) and groups:
+            groups[-1].append(message)
+        else:
+            groups.append([message])
+    return groups
+
+
+@dataclass
+class ContextPart:
+    """A named slice of the prompt"""
+    name: str
+    messages: list[Message]
+    priority: int = 0      # Lower priorities are trimmed first
+    trim: str = KEEP
+    trimmed: bool = False
+
+    @property
+    def tokens(self) -> int:
+        return sum(message_tokens(m) for m in self.messages)
+
+
+@dataclass
+class ContextBuilder:
+    """Assembles one node's prompt within `budget` tokens
+
+    Parts are emitted in the order they are added.
+    """
+    node: str
+    budget: int
+    parts: list[ContextPart] = field(default_factory=list)
+
+    def add(self, name: str, messages: list[Message], priority: int = 0, trim: str = KEEP) -> "ContextBuilder":
+        if messages:
+            self.parts.append(ContextPart(name, list(messages), priority, trim))
+        return self
+
+    def _trim(self, part: ContextPart, excess: int) -> None:
+        part.trimmed = True
+        if part.trim == DROP:
+            part.messages = []
+        elif part.trim == OLDEST:
+            groups = _groups(part.messages)
+            while groups and excess > 0:
+                excess -= sum(message_tokens(m) for m in groups.pop(0))
+            part.messages = [m for group in groups for m in group]
+        elif part.trim == TRUNCATE:
+            index = max(range(len(part.messages)), key=lambda i: message_tokens(part.messages[i]))
+            message = part.messages[index]
+            text = _content_text(message["content"] if isinstance(message, dict) else message.content)
+            allowed = max(0, count_tokens(text) - excess)
+            part.messages[index] = _with_content(message, truncate_tokens(text, allowed))
+            if not allowed or message_tokens(part.messages[index]) >= message_tokens(message):
+                part.trim = DROP  # Nothing left to cut; drop it next round if still over budget
+
+    def build(self) -> list[Message]:
+        """Messages within budget (as far as trimmable parts allow); logs the composition"""
+        tokens = {id(part): part.tokens for part in self.parts}
+        total = sum(tokens.values())
+        while total > self.budget:
+            candidates = [p for p in self.parts if p.trim != KEEP and p.messages]
+            if not candidates:
+                logger.warning(f"[{self.node}] prompt is {total} tokens, over its {self.budget} budget after trimming")
+                break
+            part = min(candidates, key=lambda p: p.priority)
+            self._trim(part, total - self.budget)
+            tokens[id(part)] = part.tokens
+            total = sum(tokens.values())
+
+        composition = ", ".join(
+            f"{p.name}={tokens[id(p)]}" + ("(trimmed)" if p.trimmed else "") for p in self.parts
+        )
+        logger.info(
+            f"[{self.node}] context {total}/{self.budget} tokens ({tokenizer_name() or 'estimated'}): {composition}"
+        )
+        metrics.observe("context_tokens", total, CONTEXT_TOKEN_BUCKETS, node=self.node)
+        if any(p.trimmed for p in self.parts):
+            metrics.increment("context_trimmed", node=self.node)
+        return [m for part in self.parts for m in part.messages]
@@ -2,10 +2,11 @@
 
 import logging
 from typing import Optional
-from langgraph.graph import END, START, MessagesState, StateGraph
+from langgraph.graph import END, START, StateGraph
 from langgraph.prebuilt import ToolNode
 from src.tools import SQLToolkit
-from .nodes import AgentNodes
+from .nodes import AgentNodes, classification_route
+from .state import AgentState
 import os
 from langchain_core.runnables.graph import MermaidDrawMethod
 
@@ -30,13 +31,19 @@ class AgentGraphBuilder:
         self.conversation_manager = conversation_manager
         self.thread_id = thread_id
         self.max_check_attempts = int(os.getenv('MAX_CHECK_ATTEMPTS', '2'))
+        self.intent_routing = os.getenv('INTENT_ROUTING_ENABLED', 'True').lower() == 'true'
+        self.template_responses = os.getenv('TEMPLATE_RESPONSES_ENABLED', 'True').lower() == 'true'
+        self.speculative_schema = os.getenv('SPECULATIVE_SCHEMA', 'False').lower() == 'true'
+        self.race_web_search = os.getenv('WEB_SEARCH_RACE', 'False').lower() == 'true'
         self.nodes = AgentNodes(
             toolkit, 
             db_dialect, 
             max_check_attempts=self.max_check_attempts,
             conversation_manager=conversation_manager,
             thread_id=thread_id,
-           
+            intent_routing=self.intent_routing,
+            template_responses=self.template_responses,
+            race_web_search=self.race_web_search,
         )
         self.graph = None
         self.agent = None
@@ -45,14 +52,20 @@ class AgentGraphBuilder:
 
     def _build_graph(self) -> None:
         """Build the agent graph"""
-        builder = StateGraph(MessagesState)
+        builder = StateGraph(AgentState)
 
         # Add nodes
-        builder.add_node("fetch_conversation_history", self.nodes.fetch_conversation_history)
-        builder.add_node("classify_query", self.nodes.classify_query)  # Classification node
+        if self.speculative_schema:
+            builder.add_node("speculative_prefetch", self.nodes.speculative_prefetch)  # History + classification || schema
+        else:
+            builder.add_node("fetch_conversation_history", self.nodes.fetch_conversation_history)
+            builder.add_node("classify_query", self.nodes.classify_query)  # Classification node
         builder.add_node("answer_general", self.nodes.answer_general)  # General answer node
         builder.add_node("answer_from_previous_conversation", self.nodes.answer_from_previous_conversation)
         builder.add_node("web_search", self.nodes.web_search_node)  # Web search node
+        builder.add_node("match_intent", self.nodes.match_intent) # Parameterized SQL for known intents
+        builder.add_node("match_verified_example", self.nodes.match_verified_example) # Template match on verified examples
+        builder.add_node("apply_speculative_schema", self.nodes.apply_speculative_schema) # Schema fetched during classification
         builder.add_node("list_db_tables", self.nodes.list_tables) # List tables node
         builder.add_node("call_get_schema", self.nodes.call_get_schema_llm) # Call get schema node
         builder.add_node("get_schema", ToolNode([self.toolkit.get_schema_tool_obj()], name="get_schema")) # Get schema tool node for retrieving schema
@@ -71,26 +84,20 @@ class AgentGraphBuilder:
     
     
         # Start → classify first in 4 category and based on that which path need to follow(V3) 
-        builder.add_edge(START, "fetch_conversation_history")
-        builder.add_edge("fetch_conversation_history", "classify_query")
+        # Speculative mode: history + classification and schema retrieval run concurrently (V4)
+        if self.speculative_schema:
+            builder.add_edge(START, "speculative_prefetch")
+            classification_node = "speculative_prefetch"
+        else:
+            builder.add_edge(START, "fetch_conversation_history")
+            builder.add_edge("fetch_conversation_history", "classify_query")
+            classification_node = "classify_query"
         builder.add_conditional_edges(
-            "classify_query",
-            lambda state: (
-                "IN_DOMAIN_WITHIN_PREVIOUS_CONVERSATION"
-                if "IN_DOMAIN_WITHIN_PREVIOUS_CONVERSATION" in state["messages"][-1].content.upper()
-                else (
-                    "IN_DOMAIN_DB_QUERY"
-                    if "IN_DOMAIN_DB_QUERY" in state["messages"][-1].content.upper()
-                    else (
-                        "IN_DOMAIN_WEB_SEARCH"
-                        if "IN_DOMAIN_WEB_SEARCH" in state["messages"][-1].content.upper()
-                        else "OUT_OF_DOMAIN"
-                    )
-                )
-            ),
+            classification_node,
+            lambda state: state.get("route") or classification_route(state["messages"][-1].content),
             {
                 "IN_DOMAIN_WITHIN_PREVIOUS_CONVERSATION": "answer_from_previous_conversation",
-                "IN_DOMAIN_DB_QUERY": "list_db_tables",
+                "IN_DOMAIN_DB_QUERY": "match_intent",
                 "IN_DOMAIN_WEB_SEARCH": "web_search",
                 "OUT_OF_DOMAIN": "answer_general"
             }
@@ -102,6 +109,27 @@ class AgentGraphBuilder:
         builder.add_edge("web_search", END)
         
         
+        # Known intents (sport / chapter-size quota, limitations) run a prepared statement directly
+        builder.add_conditional_edges(
+            "match_intent",
+            self.nodes.after_fast_path,
+            {
+                "HIT": "generate_response",
+                "MISS": "match_verified_example",
+                "SPECULATIVE": "match_verified_example",
+            }
+        )
+        # Exact template match on a verified example skips schema lookup and SQL generation
+        builder.add_conditional_edges(
+            "match_verified_example",
+            self.nodes.after_fast_path,
+            {
+                "HIT": "generate_response",
+                "MISS": "list_db_tables",
+                "SPECULATIVE": "apply_speculative_schema",
+            }
+        )
+        builder.add_edge("apply_speculative_schema", "init_retry_count")
         builder.add_edge("list_db_tables", "call_get_schema")
         builder.add_edge("call_get_schema", "get_schema")
         builder.add_edge("get_schema", "init_retry_count")
@@ -113,10 +141,18 @@ class AgentGraphBuilder:
         {
             "VALID": "run_custom_query",
             "INVALID": "generate_query",
-            "ERROR": "generate_response",    # More than 2 times Invalid
+            "ERROR": "generate_response",    # Out of retries
         }
     )
-        builder.add_edge("run_custom_query", "generate_response")
+        # Retry on real execution errors (unknown column, syntax, ...) with the DB error fed back
+        builder.add_conditional_edges(
+            "run_custom_query",
+            self.nodes.after_run_query,
+            {
+                "RETRY": "generate_query",
+                "DONE": "generate_response",
+            }
+        )
         builder.add_edge("generate_response", END)
         self.agent = builder.compile()
         logger.info("Agent graph built successfully")
@@ -1,28 +1,97 @@
 """Agent node functions"""
 
+import asyncio
 import json
 import logging
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 from langchain.messages import AIMessage, HumanMessage, ToolMessage
-from langgraph.graph import MessagesState
 from src.tools import SQLToolkit
-from src.core.dependencies import get_redis_client
-from src.prompts.system_prompts import get_generate_query_prompt, get_check_query_prompt, get_classify_query_prompt, get_general_answer_prompt, get_generate_natural_response_prompt, get_answer_from_previous_convo_prompt, get_web_search_prompt
+from src.tools.intents import get_intent_router
+from src.tools.web_scraper import SITE_DOMAIN, get_topic_router
+from src.tools.site_crawler import crawl_urls, load_page_passages
+from src.tools.site_facts import LIST_KINDS, load_facts, render_fact_list, select_facts
+from src.core.site_index import Passage, SiteIndex, get_site_index
+from src.config import Settings
+from src.core.classify_batch import get_classify_batcher
+from src.core.dependencies import get_example_store
+from src.core.query_classifier import LABELS, get_query_classifier, log_sample
+from src.core.history import HISTORY_TOKEN_BUCKETS, format_history
+from src.core.llm_calls import get_llm_caller
+from src.core.model_router import estimate_complexity, get_model_router
+from src.tools.sql_validator import validate_sql
+from src.utils import metrics
+from src.prompts.system_prompts import get_generate_query_prompt, get_classify_query_prompt, get_general_answer_prompt, get_generate_natural_response_prompt, get_answer_from_previous_convo_prompt, get_web_search_prompt
+from .context_builder import DROP, OLDEST, TRUNCATE, ContextBuilder
+from .response_renderer import render_result
+from .schemas import GeneratedQuery
+from .state import AgentState
 import time
 from langgraph.graph import END
-import requests
-from bs4 import BeautifulSoup
+from langgraph.graph.message import add_messages
 import os
 from langchain_core.tools import tool
 
 logger = logging.getLogger(__name__)
 
+LATENCY_BUCKETS = (0.5, 1, 2, 4, 8, 16, 32)
+PROMPT_WORD_BUCKETS = (250, 500, 1000, 2000, 4000)
+
+# Shared by all graphs; a discarded speculative schema branch stops at its next step
+_speculation_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="speculative-schema")
+
+
+# classify_query's constrained output: one JSON object whose only field is the label enum
+CLASSIFY_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "classification",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {"route": {"type": "string", "enum": list(LABELS)}},
+            "required": ["route"],
+            "additionalProperties": False,
+        },
+    },
+}
+_ROUTE_PREFIX_RE = re.compile(r'\{\s*"route"\s*:\s*"([A-Za-z_]*)')
+
+
+def decisive_label(text: str) -> Optional[str]:
+    """The label a streamed classification prefix already commits to, else None
+
+    Accepts the constrained JSON form ({"route": "IN_DOMAIN_D...) and a bare
+    label. "IN_DOMAIN_D" is decisive, "IN_DOMAIN_" is not.
+    """
+    prefix = text.strip()
+    if prefix.startswith("{"):
+        match = _ROUTE_PREFIX_RE.match(prefix)
+        if not match:
+            return None
+        prefix = match.group(1)
+    prefix = prefix.upper()
+    if not prefix:
+        return None
+    candidates = [label for label in LABELS if label.startswith(prefix) or prefix.startswith(label)]
+    return candidates[0] if len(candidates) == 1 else None
+
+
+def classification_route(content: str) -> str:
+    """Map classify_query output to its route label"""
+    content = content.upper()
+    for label in ("IN_DOMAIN_WITHIN_PREVIOUS_CONVERSATION", "IN_DOMAIN_DB_QUERY", "IN_DOMAIN_WEB_SEARCH"):
+        if label in content:
+            return label
+    return "OUT_OF_DOMAIN"
 
 
 class AgentNodes:
     """Agent node functions"""
 
-    def __init__(self, toolkit: SQLToolkit, db_dialect: str, max_check_attempts: int,conversation_manager=None, thread_id: Optional[str] = None,):
+    def __init__(self, toolkit: SQLToolkit, db_dialect: str, max_check_attempts: int,conversation_manager=None, thread_id: Optional[str] = None, intent_routing: bool = True, template_responses: bool = True, race_web_search: bool = False):
         """Initialize agent nodes
         
         Args:
@@ -40,17 +109,35 @@ class AgentNodes:
         self.max_check_attempts = max_check_attempts
         self.llm_call = 1
         self.user_query = ""
-
-    def fetch_conversation_history(self, state: MessagesState):
-        """Fetch last 15 conversation messages and prepend them before the current query."""
+        self.example_store = get_example_store()
+        self.intent_router = get_intent_router(toolkit.db) if intent_routing else None
+        self.template_responses = template_responses
+        self.race_web_search = race_web_search
+        settings = Settings.from_env()
+        self.db_name = settings.database.db_name
+        self.site_crawl = settings.site_crawl
+        self.conversation_config = settings.conversation
+        self.context_config = settings.context
+        self.llm_caller = get_llm_caller()
+        self.model_router = get_model_router(settings.model_router, toolkit.models)
+        self.classifier_config = settings.query_classifier
+        self.classify_batcher = get_classify_batcher(settings.classify_batch)
+
+    def fetch_conversation_history(self, state: AgentState):
+        """Fetch the thread's rolling summary and its last (up to 15) unsummarized messages,
+        and prepend the messages before the current query."""
         start_time = time.time()
         logger.warning("************** FETCH CONVERSATION HISTORY ************** ")
         current_message = state["messages"][-1]
         new_messages = []
+        summary = ""
         if self.conversation_manager and self.thread_id:
-            history = self.conversation_manager.get_last_messages(
-                self.thread_id, limit=15
-            )
+            if self.conversation_config.summary_enabled:
+                summary, history = self.conversation_manager.get_history(self.thread_id, limit=15)
+            else:
+                history = self.conversation_manager.get_last_messages(
+                    self.thread_id, limit=15
+                )
             if history:
                 logger.info(f"Loaded {len(history)} messages from conversation history")
 
@@ -61,13 +148,14 @@ class AgentNodes:
                     elif msg["role"] == "assistant":
                         new_messages.append(AIMessage(content=msg["content"]))
         state["messages"] = new_messages
+        state["conversation_summary"] = summary
         logger.info(f"CURRENT USER QUERY: {current_message}")
         logger.critical(f"fetch conversation node completed in {time.time() - start_time:.2f} seconds")
         logger.info("---------------------"*4)
         return state
     
     # LLM CALL 01 
-    def classify_query(self, state: MessagesState):
+    def classify_query(self, state: AgentState):
         """Classify whether query is related to database or general question."""
         start_time = time.time()
         logger.warning("************** CLASSIFY QUERY **************")
@@ -88,228 +176,531 @@ class AgentNodes:
         current_query = messages[-1].content
         self.user_query = current_query
         logger.warning(f"Current query: {current_query}")
+        classifier = get_query_classifier(self.classifier_config)
+        if classifier:
+            label, confidence = classifier.predict(current_query, clean_previous_history)
+            if confidence >= self.classifier_config.min_confidence:
+                metrics.increment("query_classifier", outcome="local", label=label)
+                logger.info(f"Local classification: {label} ({confidence:.2f})")
+                logger.critical(f"classify_query node completed in {time.time() - start_time:.3f} seconds (local)")
+                logger.info("---------------------"*4)
+                return {"messages": [AIMessage(content=label)], "route": label}
+            metrics.increment("query_classifier", outcome="fallback", label=label)
+            logger.info(f"Local classification {label} below confidence ({confidence:.2f}), asking the LLM")
+
         llm_payload = {
             "system_message": system_message,
             "previous_conversation": clean_previous_history,
             "current_query": current_query
         }
 
-        messages_for_llm = [
-            {"role": "system", "content": llm_payload["system_message"]},
-            {
+        messages_for_llm = (
+            self._context("classify_query")
+            .add("system", [{"role": "system", "content": llm_payload["system_message"]}])
+            .add("history", [{
                 "role": "system",
-                "content": f"PREVIOUS CONVERSATION:\n{json.dumps(llm_payload['previous_conversation'], indent=2)}"
-            },
-            {
-                "role": "user",
-                "content": llm_payload["current_query"]
-            }
-        ]
-        llm = self.llm_without_reasoning
-        logger.critical(f"llm --> gpt-5-nano, resoning--> minimal")
-        response = llm.invoke(messages_for_llm)
-        decision = response.content.strip().upper()
+                "content": self._previous_conversation_block(
+                    state, llm_payload["previous_conversation"], node="classify_query"
+                )
+            }], trim=TRUNCATE)
+            .add("question", [{"role": "user", "content": llm_payload["current_query"]}])
+            .build()
+        )
+        decision = None
+        if self.classify_batcher:
+            decision = self.classify_batcher.classify(self.llm_without_reasoning, messages_for_llm)
+        if decision is None:
+            llm = self.llm_caller.limited(self.llm_without_reasoning, "classify_query")
+            if self.llm_caller.config.constrained_classification:
+                llm = llm.bind(response_format=CLASSIFY_RESPONSE_FORMAT)
+            logger.critical(f"llm --> gpt-5-nano, resoning--> minimal")
+            # Route on the first decisive tokens of the label instead of the whole response
+            decision, text = self.llm_caller.stream_until("classify_query", llm, messages_for_llm, decisive_label)
+        if decision is not None:
+            # Only labels the model actually committed to become training samples
+            log_sample(self.classifier_config, current_query, clean_previous_history, decision)
+        else:
+            logger.warning(f"Classification stream ended undecided: {text!r}")
+            decision = classification_route(text)
         logger.info(f"Classification result: {decision}")
-        logger.info(f"response content: {response}")
         logger.critical(f"classify_query node completed in {time.time() - start_time:.2f} seconds")
         logger.info("---------------------"*4)
-        return {"messages": [response]}
+        return {"messages": [AIMessage(content=decision)], "route": decision}
     
+    def _context(self, node: str) -> ContextBuilder:
+        """Prompt builder with the node's token budget (CONTEXT_BUDGETS)"""
+        return ContextBuilder(node, self.context_config.budget(node))
+
+    def _split_history(self, messages: list, question: Optional[str] = None) -> tuple[list, list]:
+        """(earlier conversation, messages from the current question on)
+
+        The incoming question is the first state message and is repeated as the
+        last fetched history message, so history is everything in between.
+        `question` defaults to the classified user_query.
+        """
+        question = self.user_query if question is None else question
+        for i in range(len(messages) - 1, -1, -1):
+            if messages[i].type == "human" and messages[i].content == question:
+                return messages[1:i], messages[i:]
+        return [], list(messages)
+
+    def _complexity(self, state: AgentState, question: Optional[str] = None) -> float:
+        """Complexity of the current question from its wording, selected tables and latest SQL"""
+        tables, sql = 0, None
+        question = self.user_query if question is None else question
+        current = self._split_history(state["messages"], question)[1]
+        for message in current:
+            for call in getattr(message, "tool_calls", None) or []:
+                if call.get("name") == "sql_db_schema":
+                    tables = len([t for t in str(call.get("args", {}).get("table_names", "")).split(",") if t.strip()])
+            metadata = getattr(message, "additional_kwargs", {}).get("metadata", {}) or {}
+            sql = metadata.get("sql_query") or sql
+        return estimate_complexity(question, tables, sql)
+
+    def _invoke_llm(self, node: str, default_llm, messages: list, state: AgentState, build=None, escalation: int = 0,
+                    question: Optional[str] = None):
+        """Invoke `node`'s LLM call under its limits
+
+        With LLM_ROUTER_ENABLED the model is picked by the request's complexity
+        (escalated `escalation` tiers) and a failed call is retried one tier up;
+        otherwise `default_llm` is used. `build` wraps the model (tools, structured output).
+        """
+        build = build or (lambda llm: llm)
+        if self.model_router is None:
+            return self.llm_caller.invoke(node, build(self.llm_caller.limited(default_llm, node)), messages)
+
+        complexity = self._complexity(state, question)
+        while True:
+            route = self.model_router.route(node, complexity, escalation)
+            call_start = time.time()
+            try:
+                response = self.llm_caller.invoke(node, build(self.llm_caller.limited(route.llm, node)), messages)
+            except Exception as e:
+                self.model_router.record(route, time.time() - call_start, "error")
+                if not self.model_router.can_escalate(route):
+                    raise
+                logger.warning(f"[{node}] {route.profile.name} failed ({e}), escalating")
+                escalation += 1
+                continue
+            self.model_router.record(route, time.time() - call_start, "ok")
+            return response
+
+    def _previous_conversation_block(self, state: AgentState, previous_conversation: list[dict], node: str) -> str:
+        """Rolling summary plus recent messages as compact JSON, within CONVERSATION_HISTORY_TOKENS"""
+        history, tokens = format_history(
+            state.get("conversation_summary") or "",
+            previous_conversation,
+            self.conversation_config.history_tokens,
+        )
+        metrics.observe("history_prompt_tokens", tokens, HISTORY_TOKEN_BUCKETS, node=node)
+        return (
+            'PREVIOUS CONVERSATION (JSON; "summary" covers older turns, "recent" are the latest messages verbatim):\n'
+            + history
+        )
+
+    def speculative_prefetch(self, state: AgentState):
+        """Run classification and schema retrieval concurrently.
+
+        The schema branch (list tables, schema LLM call, schema tool) only sees the
+        current question, so it can start before the classifier answers. It is only
+        started for a question without conversation history (a follow-up's schema
+        depends on the earlier turns), and not for questions the intent and
+        verified-example fast paths will answer. Its messages are kept in
+        `speculative_schema` for DB questions and dropped otherwise.
+        """
+        start_time = time.time()
+        logger.warning("************** SPECULATIVE PREFETCH **************")
+        question = state["messages"][-1]
+        history_update = self.fetch_conversation_history({**state})
+        merged = add_messages(state["messages"], history_update["messages"])
+        summary = history_update["conversation_summary"]
+
+        # The fetched history ends with the current question (saved before the graph runs)
+        earlier_turns = self._split_history(merged, question.content)[0]
+        schema_future, discarded = None, threading.Event()
+        if earlier_turns or summary:
+            metrics.increment("speculative_schema", outcome="skipped", reason="history")
+        elif not self._should_speculate(question.content):
+            metrics.increment("speculative_schema", outcome="skipped", reason="fast_path")
+        else:
+            schema_future = _speculation_executor.submit(self._prefetch_schema, question, discarded)
+
+        try:
+            classify_update = self.classify_query({**state, "messages": merged, "conversation_summary": summary})
+        except BaseException:
+            if schema_future is not None:
+                self._discard_speculation(schema_future, discarded)
+            raise
+        classify_elapsed = time.time() - start_time
+        update = {
+            "messages": history_update["messages"] + classify_update["messages"],
+            "conversation_summary": summary,
+            "speculative_schema": None,
+            "route": classify_update["route"],
+        }
+        if schema_future is None:
+            return update
+
+        if classify_update["route"] != "IN_DOMAIN_DB_QUERY":
+            self._discard_speculation(schema_future, discarded)
+            return update
+
+        try:
+            messages, schema_elapsed = schema_future.result()
+        except Exception as e:
+            logger.warning(f"Speculative schema retrieval failed, using sequential path: {e}")
+            metrics.increment("speculative_schema", outcome="failed")
+            return update
+        update["speculative_schema"] = {
+            "messages": messages,
+            "elapsed": schema_elapsed,
+            # Sequential cost is classify + schema; in parallel only the longer one is paid
+            "saved": min(classify_elapsed, schema_elapsed),
+        }
+        logger.critical(
+            f"speculative_prefetch node completed in {time.time() - start_time:.2f} seconds "
+            f"(classify {classify_elapsed:.2f}s, schema {schema_elapsed:.2f}s)"
+        )
+        logger.info("---------------------"*4)
+        return update
+
+    def _should_speculate(self, question: str) -> bool:
+        """Skip the schema branch for questions a fast path will answer"""
+        if self.intent_router and self.intent_router.match(question):
+            return False
+        if (self.example_store and self.example_store.config.template_match
+                and self.example_store.match_template(question)):
+            return False
+        return True
+
+    def _prefetch_schema(self, question, discarded: threading.Event):
+        """list_tables -> schema LLM call -> get_schema for the bare question
+
+        Works on locals only (classify_query owns user_query and llm_call meanwhile)
+        and stops between steps once `discarded` is set; returns None then.
+        """
+        start_time = time.time()
+        if discarded.is_set():
+            return None
+        tables = self.list_tables({"messages": [question]})["messages"]
+        if discarded.is_set():
+            return None
+        schema_call = self._select_schema({"messages": [question] + tables}, question.content)
+        if discarded.is_set():
+            return None
+        schema_tool = self.toolkit.get_schema_tool_obj()
+        tool_messages = [schema_tool.invoke(tool_call) for tool_call in schema_call.tool_calls]
+        return tables + [schema_call] + tool_messages, time.time() - start_time
+
+    def _discard_speculation(self, future, discarded: threading.Event) -> None:
+        """Drop a losing schema branch: cancel it if it hasn't started, else stop it at its next step"""
+        discarded.set()
+        if future.cancel():
+            metrics.increment("speculative_schema", outcome="cancelled")
+            return
+        # A running LLM call can't be interrupted; record the wasted work once it returns
+        future.add_done_callback(self._record_discarded_speculation)
+
+    def _record_discarded_speculation(self, future) -> None:
+        if future.exception() is not None:
+            metrics.increment("speculative_schema", outcome="failed")
+            return
+        result = future.result()
+        if result is None:
+            metrics.increment("speculative_schema", outcome="cancelled")
+            return
+        metrics.increment("speculative_schema", outcome="wasted")
+        metrics.observe("speculative_wasted_seconds", result[1])
+
+    def apply_speculative_schema(self, state: AgentState):
+        """Append the prefetched schema messages in place of list_tables/call_get_schema/get_schema"""
+        speculative = state["speculative_schema"]
+        logger.warning("************** APPLY SPECULATIVE SCHEMA **************")
+        metrics.increment("speculative_schema", outcome="used")
+        metrics.observe("speculative_saved_seconds", speculative["saved"])
+        return {"messages": speculative["messages"], "speculative_schema": None}
+
     # LLM CALL 02_C
-    def web_search_node(self, state: MessagesState):
-        """Search using LangChain's web search tool with optional domain filtering."""
+    def web_search_node(self, state: AgentState):
+        """Answer from siciliangames.com via crawled facts, direct scrape and/or LLM web search.
+
+        Sequential mode tries the facts extracted at crawl time first, then the
+        direct scrape, and falls back to web search on NOT_FOUND. Race mode starts them together, keeps the first acceptable
+        answer and cancels the others (their in-flight LLM requests are aborted).
+        """
         start_time = time.time()
         logger.warning("**************  WEB SEARCH NODE  ************** ")
         logger.warning("LLM call:" + str(self.llm_call))
         self.llm_call += 1
 
         user_query = self.user_query
-        domain = "siciliangames.com"
+        domain = SITE_DOMAIN
 
         # Build search query
         search_query = f"{user_query} site:{domain}" if domain else user_query
         logger.info(f"Query: {user_query}")
         logger.info(f"Domain filter: {domain}")
-        
-        # 1. DIRECT URL SCRAPING (Optimization)
-        # Map topics to specific URLs to skip search engine latency/flakiness
-        direct_urls = {
-            "schedule": "https://siciliangames.com/schedule.php",
-            "fixtures": "https://siciliangames.com/schedule.php",
-            "winner": "https://siciliangames.com/winners.php",
-            "sponsor": "https://siciliangames.com/index.php",
-            "partners": "https://siciliangames.com/index.php",
-            "owner": "https://siciliangames.com/about.php",
-            "organizer": "https://siciliangames.com/about.php",
-            "contact": "https://siciliangames.com/contact.php",
-            "register": "https://siciliangames.com/registration.php"
-        }
-
-        # Check if query matches any topic
-        target_url = None
-        for key, url in direct_urls.items():
-            if key in user_query.lower():
-                target_url = url
-                break
-        
-        if target_url:
-            logger.info(f"Targeting specific URL: {target_url}")
-            try:
-                # 1.1 Check Cache for this specific URL
-                redis_client = get_redis_client()
-                cache_key = f"web_scrape:{target_url}"
-                cached_content = None
-                if redis_client:
-                    cached_content = redis_client.get(cache_key)
-                
-                content_text = ""
-                if cached_content:
-                    logger.info("RETRIEVED URL CONTENT FROM CACHE")
-                    content_text = cached_content
-                else:
-                    logger.info("FETCHING URL CONTENT DIRECTLY")
-                    resp = requests.get(target_url, timeout=10)
-                    resp.raise_for_status()
-                    soup = BeautifulSoup(resp.content, 'html.parser')
-                    
-                    # Remove script/style
-                    for script in soup(["script", "style"]):
-                        script.decompose()
-                    
-                    content_text = soup.get_text(separator=' ', strip=True)
-                    # Limit content size to avoid token overflow (approx 1500 words)
-                    content_text = " ".join(content_text.split()[:2500])
-                    
-                    # Cache the scraped text
-                    if redis_client and content_text:
-                        redis_client.setex(cache_key, 86400, content_text) # 24h cache
-
-                # 1.2 Generate Answer from Content
-                if content_text:
-                    logger.info("Generate Answer from Scraped Content")
-                    # Use a simplified prompt for summarization
-                    scrape_prompt = f"""
-                    You are a helpful assistant. 
-                    The user asked: "{user_query}"
-                    
-                    Here is the content from {target_url}:
-                    {content_text}
-                    
-                    Answer the user's question using ONLY the provided content. 
-                    If the answer is found, format it nicely. 
-                    If the answer is NOT in the content, say "NOT_FOUND".
-                    """
-                    
-                    llm_response = self.llm.invoke([{"role": "user", "content": scrape_prompt}])
-                    answer = llm_response.content
-                    
-                    if "NOT_FOUND" not in answer:
-                         return {
-                            "messages": [
-                                AIMessage(
-                                    content=answer,
-                                    additional_kwargs={
-                                        "source": "direct_scrape",
-                                        "url": target_url,
-                                        "query": user_query
-                                    }
-                                )
-                            ]
-                        }
-                    else:
-                        logger.warning("Answer not found in scraped content, falling back to search")
 
-            except Exception as e:
-                logger.error(f"Direct scraping failed: {e}")
-                # Fallback to normal search
-
-        # 2. CHECK REDIS CACHE (for generic search)
-        def extract_answer_from_response(response):
-            content = getattr(response, "content", None)
-            if not content or not isinstance(content, list):
-                return ""
-
-            # Extract final "text" block
-            for block in content:
-                if isinstance(block, dict) and block.get("type") == "text":
-                    return block.get("text", "")
-
-            return ""
-
-        try:
-            # Prepare LLM with web search tool
-            llm = self.llm
-            tools = [{"type": "web_search_preview"}]
-            llm_with_tools = llm.bind_tools(tools)
-            
-            system_prompt = get_web_search_prompt()
-
-            # Execute LLM call
-            response = llm_with_tools.invoke(
-                [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": search_query}
-                ]
-            )
-            answer = extract_answer_from_response(response)
-            logger.info(f"LLM response: {response}")
-            
-            if not answer or "no_information_found" in answer.lower():
-                logger.warning("No meaningful information found from web search")
-                logger.critical(f"web_search_node completed in {time.time() - start_time:.2f} seconds")
-                logger.info("---------------------" * 4)
-
-                return {
-                    "messages": [
-                        AIMessage(
-                            content="Sorry, we couldn’t find any relevant information. Would you like to know more about Sicilian Games? Please ask if you have any relevant questions.",
-                            additional_kwargs={
-                                "source": "web_search",
-                                "query": user_query,
-                                "domain": domain
-                            }
-                        )
-                    ]
-                }
+        topic_router = get_topic_router()
+        topics = topic_router.match(user_query)
+        target_urls = topic_router.route(user_query)
+        if target_urls:
+            logger.info(f"Targeting specific URLs: {target_urls}")
+        strategies = {"web_search": lambda: self._web_search_answer(search_query)}
+        if target_urls:
+            strategies = {
+                "direct_scrape": lambda: self._direct_scrape_answer(user_query, target_urls),
+                **strategies,
+            }
+        if any(topic.facts for topic, _ in topics):
+            strategies = {
+                "page_facts": lambda: self._facts_answer(user_query, target_urls, topics),
+                **strategies,
+            }
 
-            logger.info(f"Web search result: {answer}")
-            logger.critical(f"web_search_node completed in {time.time() - start_time:.2f} seconds")
-            logger.info("---------------------" * 4)
+        mode = "race" if self.race_web_search and len(strategies) > 1 else "sequential"
+        winner, answer, error = asyncio.run(self._run_web_strategies(strategies, mode))
+        metrics.increment("web_search_wins", strategy=winner or "none", mode=mode)
+        logger.critical(f"web_search_node completed in {time.time() - start_time:.2f} seconds ({mode}, winner={winner})")
+        logger.info("---------------------" * 4)
 
+        if winner in ("page_facts", "direct_scrape"):
             return {
                 "messages": [
                     AIMessage(
                         content=answer,
                         additional_kwargs={
-                            "source": "web_search",
-                            "query": user_query,
-                            "domain": domain
+                            "source": winner,
+                            "url": target_urls[0],
+                            "urls": target_urls,
+                            "query": user_query
                         }
                     )
                 ]
             }
-
-        except Exception as e:
-            # error handling
-            logger.error(f"Error during web search: {str(e)}")
-            logger.critical(f"web_search_node completed in {time.time() - start_time:.2f} seconds")
-            logger.info("---------------------" * 4)
-
+        if winner == "web_search":
+            logger.info(f"Web search result: {answer}")
             return {
                 "messages": [
                     AIMessage(
-                        content="orry, we couldn’t find any relevant information. Would you like to know more about Sicilian Games? Please ask if you have any relevant questions",
+                        content=answer,
                         additional_kwargs={
                             "source": "web_search",
-                            "error": str(e),
-                            "query": user_query
+                            "query": user_query,
+                            "domain": domain
                         }
                     )
                 ]
+            }
+
+        logger.warning("No meaningful information found from web search")
+        additional_kwargs = {"source": "web_search", "query": user_query, "domain": domain}
+        if error:
+            additional_kwargs["error"] = error
+        return {
+            "messages": [
+                AIMessage(
+                    content="Sorry, we couldn’t find any relevant information. Would you like to know more about Sicilian Games? Please ask if you have any relevant questions.",
+                    additional_kwargs=additional_kwargs
+                )
+            ]
         }
 
+    async def _run_web_strategies(self, strategies: dict, mode: str):
+        """Run answer strategies in order (sequential) or concurrently (race).
+
+        Returns:
+            (winning strategy or None, answer, last error message)
+        """
+        started = time.time()
+        error = None
+
+        def record(strategy: str, outcome: str) -> None:
+            metrics.observe(
+                "web_search_strategy_seconds", time.time() - started, LATENCY_BUCKETS,
+                strategy=strategy, mode=mode, outcome=outcome,
+            )
+
+        if mode == "sequential":
+            for strategy, run in strategies.items():
+                started = time.time()
+                try:
+                    answer = await run()
+                except Exception as e:
+                    logger.error(f"{strategy} failed: {e}")
+                    error = str(e)
+                    record(strategy, "error")
+                    continue
+                record(strategy, "answer" if answer else "empty")
+                if answer:
+                    return strategy, answer, error
+            return None, None, error
+
+        tasks = {asyncio.create_task(run()): strategy for strategy, run in strategies.items()}
+        pending = set(tasks)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    strategy = tasks[task]
+                    if task.exception():
+                        logger.error(f"{strategy} failed: {task.exception()}")
+                        error = str(task.exception())
+                        record(strategy, "error")
+                    elif task.result():
+                        record(strategy, "answer")
+                        return strategy, task.result(), error
+                    else:
+                        record(strategy, "empty")
+            return None, None, error
+        finally:
+            for task in pending:
+                task.cancel()
+                record(tasks[task], "cancelled")
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+    async def _facts_answer(self, user_query: str, target_urls: list[str], topics: list) -> Optional[str]:
+        """Answer from the facts extracted at crawl time, or None if they don't cover the question"""
+        facts = await asyncio.to_thread(load_facts, target_urls)
+        kinds = [topic.facts for topic, _ in topics if topic.facts]
+        keywords = [keyword for topic, _ in topics for keyword in topic.keywords]
+        selected = select_facts(facts, user_query, kinds, self.site_crawl.facts_limit, ignore=keywords)
+        if not selected:
+            metrics.increment("web_facts", outcome="miss")
+            return None
+
+        # "Who are the sponsors?" needs every entry of one list and no LLM
+        if len(selected) == 1:
+            kind, entries = next(iter(selected.items()))
+            if kind in LIST_KINDS and entries == facts.get(kind):
+                metrics.increment("web_facts", outcome="lookup")
+                return render_fact_list(kind, entries)
+
+        facts_prompt = f"""
+        You are a helpful assistant for Sicilian Games.
+        The user asked: "{user_query}"
+
+        Here are the relevant facts as JSON:
+        {json.dumps(selected, ensure_ascii=False, separators=(",", ":"))}
+
+        Answer the user's question using ONLY these facts, warmly and concisely, with 1-2 emojis.
+        If the facts do not answer the question, say "NOT_FOUND".
+        """
+        metrics.observe("web_facts_prompt_words", len(facts_prompt.split()), PROMPT_WORD_BUCKETS)
+        llm = self.llm_caller.limited(self.llm_without_reasoning, "web_facts")
+        response = await self.llm_caller.ainvoke("web_facts", llm, [{"role": "user", "content": facts_prompt}])
+        answer = response.text
+        if not answer or "NOT_FOUND" in answer:
+            logger.warning("Answer not found in extracted facts")
+            metrics.increment("web_facts", outcome="not_found")
+            return None
+        metrics.increment("web_facts", outcome="prompt")
+        return answer
+
+    async def _page_passages(self, user_query: str, target_urls: list[str]) -> list[str]:
+        """The few passages of the routed pages most relevant to the question"""
+        k = self.site_crawl.top_k
+        # Refreshing the index may hit Redis and rebuild it; keep that off the event loop
+        site_index = await asyncio.to_thread(get_site_index, crawl_urls())
+        hits = site_index.search(user_query, k, urls=set(target_urls))
+        if hits:
+            metrics.increment("web_page_source", source="site_index")
+            return [passage.text for _, passage in hits]
+
+        # Not in the shared index yet (or no term overlap): rank these pages' passages on their own
+        page_index = SiteIndex()
+        passages = []
+        for url in target_urls:
+            passages.extend(Passage(url, text) for text in await asyncio.to_thread(load_page_passages, url))
+        page_index.build(passages)
+        hits = page_index.search(user_query, k)
+        metrics.increment("web_page_source", source="page_passages")
+        return [passage.text for _, passage in hits] or [passage.text for passage in passages[:k]]
+
+    async def _direct_scrape_answer(self, user_query: str, target_urls: list[str]) -> Optional[str]:
+        """Answer from the most relevant passages of the routed pages, or None if they don't have it"""
+        passages = await self._page_passages(user_query, target_urls)
+        if not passages:
+            return None
+        content_text = "\n\n".join(f"[{i}] {text}" for i, text in enumerate(passages, 1))
+
+        logger.info(f"Generate Answer from {len(passages)} Scraped Passages")
+        # Use a simplified prompt for summarization
+        scrape_prompt = f"""
+        You are a helpful assistant. 
+        The user asked: "{user_query}"
+        
+        Here are the most relevant excerpts from {", ".join(target_urls)}:
+        {content_text}
+        
+        Answer the user's question using ONLY the provided content. 
+        If the answer is found, format it nicely. 
+        If the answer is NOT in the content, say "NOT_FOUND".
+        """
+        metrics.observe("web_scrape_prompt_words", len(scrape_prompt.split()), PROMPT_WORD_BUCKETS)
+
+        # Stream to measure time-to-first-token; the answer is the merged chunks
+        await self.llm_caller.aadmit("direct_scrape", scrape_prompt)
+        request_start = time.time()
+        llm = self.llm_caller.limited(self.llm, "direct_scrape")
+
+        async def consume():
+            merged = None
+            async for chunk in llm.astream([{"role": "user", "content": scrape_prompt}]):
+                if merged is None:
+                    metrics.observe("web_scrape_ttft_seconds", time.time() - request_start, LATENCY_BUCKETS)
+                    merged = chunk
+                else:
+                    merged += chunk
+            return merged
+
+        try:
+            llm_response = await asyncio.wait_for(consume(), self.llm_caller.limits("direct_scrape").timeout)
+        except asyncio.TimeoutError:
+            self.llm_caller.record("direct_scrape", time.time() - request_start, "timeout")
+            raise
+        except Exception:
+            self.llm_caller.record("direct_scrape", time.time() - request_start, "error")
+            raise
+        self.llm_caller.record("direct_scrape", time.time() - request_start, "ok")
+        if llm_response is None:
+            return None
+        answer = llm_response.text
+        if not answer or "NOT_FOUND" in answer:
+            logger.warning("Answer not found in scraped content")
+            return None
+        return answer
+
+    async def _web_search_answer(self, search_query: str) -> Optional[str]:
+        """Answer from the LLM's web_search_preview tool, or None if nothing relevant"""
+        # Prepare LLM with web search tool
+        llm_with_tools = self.llm_caller.limited(self.llm, "web_search").bind_tools([{"type": "web_search_preview"}])
+        response = await self.llm_caller.ainvoke(
+            "web_search",
+            llm_with_tools,
+            [
+                {"role": "system", "content": get_web_search_prompt()},
+                {"role": "user", "content": search_query}
+            ]
+        )
+        logger.info(f"LLM response: {response}")
+
+        # Extract final "text" block
+        answer = ""
+        content = getattr(response, "content", None)
+        if content and isinstance(content, list):
+            for block in content:
+                if isinstance(block, dict) and block.get("type") == "text":
+                    answer = block.get("text", "")
+                    break
+
+        if not answer or "no_information_found" in answer.lower():
+            return None
+        return answer
+
     # LLM CALL 02_A
-    def answer_general(self, state: MessagesState):
+    def answer_general(self, state: AgentState):
         """Answer non-database related user questions normally."""
         start_time = time.time()
         logger.warning("************** GENERAL ANSWER **************")
@@ -323,13 +714,13 @@ class AgentNodes:
         if not user_msg:
             logger.error("No human message found in state")
             return {"messages": []}
-        llm = self.llm
-        messages_for_llm = [
-            {"role": "system", "content": 
-             get_general_answer_prompt()},
-            {"role": "user", "content": user_msg.content}
-        ]
-        response = llm.invoke(messages_for_llm)
+        messages_for_llm = (
+            self._context("answer_general")
+            .add("system", [{"role": "system", "content": get_general_answer_prompt()}])
+            .add("question", [{"role": "user", "content": user_msg.content}])
+            .build()
+        )
+        response = self._invoke_llm("answer_general", self.llm, messages_for_llm, state)
         logger.info(f"User current message: {user_msg.content}")
         logger.info(f"General answer response: {response.content}")
         logger.critical(f"answer_general node completed in {time.time() - start_time:.2f} seconds")
@@ -337,7 +728,7 @@ class AgentNodes:
         return {"messages": [response]}
     
     # LLM CALL 02_B (SAME SYS PROMPT FOR ALL)
-    def answer_from_previous_conversation(self, state: MessagesState):
+    def answer_from_previous_conversation(self, state: AgentState):
         """Classify whether query is related to database or general question."""
         start_time = time.time()
         logger.warning("**************  ANSWER FROM PREVIOUS CONVO ************** ")
@@ -362,19 +753,19 @@ class AgentNodes:
             "previous_conversation": clean_previous_history,
             "current_query": current_query
         }
-        messages_for_llm = [
-            {"role": "system", "content": llm_payload["system_message"]},
-            {
+        messages_for_llm = (
+            self._context("answer_from_previous_conversation")
+            .add("system", [{"role": "system", "content": llm_payload["system_message"]}])
+            .add("history", [{
                 "role": "system",
-                "content": f"PREVIOUS CONVERSATION:\n{json.dumps(llm_payload['previous_conversation'], indent=2)}"
-            },
-            {
-                "role": "user",
-                "content": llm_payload["current_query"]
-            }
-        ]
-        llm = self.llm
-        response = llm.invoke(messages_for_llm)
+                "content": self._previous_conversation_block(
+                    state, llm_payload["previous_conversation"], node="answer_from_previous_conversation"
+                )
+            }], trim=TRUNCATE)
+            .add("question", [{"role": "user", "content": llm_payload["current_query"]}])
+            .build()
+        )
+        response = self._invoke_llm("answer_from_previous_conversation", self.llm, messages_for_llm, state)
 
         
         logger.info(f"response content: {response}")
@@ -386,7 +777,7 @@ class AgentNodes:
 
 
 
-    def list_tables(self, state: MessagesState):
+    def list_tables(self, state: AgentState):
         """List available tables and load conversation history if available"""
         messages = []
         start_time = time.time()
@@ -409,101 +800,261 @@ class AgentNodes:
         logger.info("---------------------"*4)
         return {"messages": messages}
     
-    def init_retry_count(self, state: MessagesState):
-        state["retry_count"] = 0
-        return {"messages": []}
+    def match_intent(self, state: AgentState):
+        """Answer recognized sports_rules intents with a prepared parameterized statement.
+
+        Every DB question is counted under intent_routing (intent=none on a miss),
+        so the metric gives the share of traffic that avoids the LLM SQL path.
+        """
+        start_time = time.time()
+        logger.warning("************** MATCH INTENT **************")
+        if not self.intent_router:
+            return {"sql_source": None}
+
+        match = self.intent_router.match(self.user_query)
+        if not match:
+            metrics.increment("intent_routing", intent="none", outcome="miss")
+            return {"sql_source": None}
+
+        try:
+            result = self.toolkit.db.run(match.sql, parameters=match.parameters)
+        except Exception as e:
+            logger.warning(f"Intent {match.intent} SQL failed: {e}")
+            result = None
+        if not result:
+            logger.info(f"Intent {match.intent} returned nothing, falling back to LLM SQL generation")
+            metrics.increment("intent_routing", intent=match.intent, outcome="empty")
+            return {"sql_source": None}
+
+        logger.info(f"SQL QUERY RESULT (intent {match.intent}, {match.parameters}): {result}")
+        metrics.increment("intent_routing", intent=match.intent, outcome="hit")
+        logger.critical(f"match_intent node completed in {time.time() - start_time:.2f} seconds")
+        logger.info("---------------------"*4)
+        return {
+            "sql_source": f"intent:{match.intent}",
+            "messages": [{
+                "role": "assistant",
+                "content": str(result),
+                "metadata": {"sql_query": match.sql, "parameters": match.parameters}
+            }]
+        }
+
+    def match_verified_example(self, state: AgentState):
+        """Answer from a verified question -> SQL template without any LLM call.
+
+        On a template match the parameterized SQL is validated and executed here;
+        anything short of a non-empty result falls back to the full LLM SQL path.
+        """
+        start_time = time.time()
+        logger.warning("************** MATCH VERIFIED EXAMPLE **************")
+        if not self.example_store or not self.example_store.config.template_match:
+            return {"sql_source": None}
+
+        sql_query = self.example_store.match_template(self.user_query)
+        if not sql_query:
+            metrics.increment("verified_examples", outcome="miss")
+            return {"sql_source": None}
+
+        validation = validate_sql(sql_query, self.toolkit.db.get_usable_table_names(), self.db_name)
+        result = None
+        if validation.valid:
+            try:
+                result = self.toolkit.db.run(validation.sql)
+            except Exception as e:
+                logger.warning(f"Verified example SQL failed: {e}")
+        if not result:
+            logger.info("Template SQL returned nothing, falling back to LLM SQL generation")
+            metrics.increment("verified_examples", outcome="template_failed")
+            return {"sql_source": None}
+
+        logger.info(f"SQL QUERY RESULT (verified example): {result}")
+        metrics.increment("verified_examples", outcome="template_hit")
+        logger.critical(f"match_verified_example node completed in {time.time() - start_time:.2f} seconds")
+        logger.info("---------------------"*4)
+        return {
+            "sql_source": "verified_example",
+            "messages": [{
+                "role": "assistant",
+                "content": str(result),
+                "metadata": {"sql_query": validation.sql}
+            }]
+        }
+
+    def after_fast_path(self, state: AgentState):
+        """Skip LLM SQL generation when a fast path already produced the result"""
+        speculative = state.get("speculative_schema")
+        if state.get("sql_source"):
+            if speculative:
+                metrics.increment("speculative_schema", outcome="wasted")
+                metrics.observe("speculative_wasted_seconds", speculative["elapsed"])
+            return "HIT"
+        return "SPECULATIVE" if speculative else "MISS"
+
+    def init_retry_count(self, state: AgentState):
+        """Reset the typed SQL retry state for this question"""
+        return {"messages": [], "sql_attempts": 0, "sql_error": None}
   
     # LLM CALL 02_D
-    def call_get_schema_llm(self, state: MessagesState):
+    def call_get_schema_llm(self, state: AgentState):
         start_time = time.time()
         logger.warning("**************  RELAVANT TABLE FETCH (LLM TOOL CALL) ************** ")
         logger.warning("LLM call:" + str(self.llm_call))
         self.llm_call += 1
-        llm = self.llm
-        llm = llm.bind_tools([self.toolkit.get_schema_tool_obj()], tool_choice="any")
-        response = llm.invoke(state["messages"])
+        response = self._select_schema(state, self.user_query)
         logger.info(f"GET Schema LLM Response: {response}")
         logger.critical(f"call_get_schema_llm node completed in {time.time() - start_time:.2f} seconds")
         logger.info("---------------------"*4)
         return {"messages": [response]}
+
+    def _select_schema(self, state: AgentState, question: str) -> AIMessage:
+        """The schema tool call for `question`; touches no per-request attributes,
+        so the speculative branch can run it next to classify_query"""
+        schema_tool = self.toolkit.get_schema_tool_obj()
+        history, current = self._split_history(state["messages"], question)
+        messages = (
+            self._context("call_get_schema_llm")
+            .add("history", history, trim=OLDEST)
+            .add("question_and_tables", current)
+            .build()
+        )
+        return self._invoke_llm(
+            "call_get_schema_llm", self.llm, messages, state,
+            build=lambda llm: llm.bind_tools([schema_tool], tool_choice="any"),
+            question=question,
+        )
     
   
-    # LLM CALL 03_D
-    def generate_query(self, state: MessagesState):
-        """Generate SQL query from natural language"""
+    # LLM CALL 03_D (structured output, validated locally in check_query)
+    def generate_query(self, state: AgentState):
+        """Generate SQL query from natural language as structured output"""
         start_time = time.time()
         logger.warning("**************  GENERATE SQL QUERY ************** ")
         logger.warning("LLM call:" + str(self.llm_call))
         self.llm_call += 1
         system_message = {
             "role": "system",
-            "content": get_generate_query_prompt(self.db_dialect) + "\n\nReturn ONLY a SQL query. No explanations.",
+            "content": get_generate_query_prompt(self.db_dialect)
+            + "\n\nReturn the SQL query in `sql`, the tables it reads in `tables_used` "
+              "and your confidence between 0 and 1 in `confidence`. No explanations.",
         }
+        examples_message = None
+        if self.example_store:
+            examples = self.example_store.search(self.user_query)
+            if examples:
+                logger.info(f"Injecting {len(examples)} verified examples into the prompt")
+                examples_message = {
+                    "role": "system",
+                    "content": "VERIFIED EXAMPLES (questions answered correctly before):\n" + "\n\n".join(
+                        f"Q: {e.question}\nSQL: {e.sql_query}" for e in examples
+                    ),
+                }
+
+        # Schema = the get_schema tool call and its results; later messages are earlier SQL attempts
+        history, current = self._split_history(state["messages"])
+        schema_start = max((i for i, m in enumerate(current) if getattr(m, "tool_calls", None)), default=None)
+        schema_end = schema_start
+        if schema_start is not None:
+            schema_end = schema_start + 1
+            while schema_end < len(current) and current[schema_end].type == "tool":
+                schema_end += 1
+        context = (
+            self._context("generate_query")
+            .add("system", [system_message])
+            .add("examples", [examples_message] if examples_message else [], priority=1, trim=DROP)
+            .add("history", history, priority=0, trim=OLDEST)
+        )
+        if schema_start is None:
+            context.add("question_and_schema", current)
+        else:
+            context.add("question_and_tables", current[:schema_start])
+            context.add("schema", current[schema_start:schema_end], priority=3, trim=TRUNCATE)
+            context.add("attempts", current[schema_end:], priority=2, trim=OLDEST)
+
+        # On a retry, re-invoke the model with the concrete validation/DB error only
+        last_msg = state["messages"][-1]
+        metadata = getattr(last_msg, "additional_kwargs", {}).get("metadata", {}) or {}
+        if metadata.get("error"):
+            logger.info(f"Retrying SQL generation after error: {metadata['error']}")
+            context.add("retry", [{
+                "role": "user",
+                "content": (
+                    f"The previous SQL query failed.\nSQL: {metadata.get('sql_query')}\n"
+                    f"Error: {metadata['error']}\nReturn a corrected query."
+                ),
+            }])
+        messages = context.build()
 
-        llm = self.llm_without_reasoning
         logger.critical(f"llm --> gpt-5-nano, resoning--> minimal")
-        response = llm.invoke([system_message] + state["messages"])
+        # Every earlier attempt for this question failed validation or execution
+        generated = self._invoke_llm(
+            "generate_query", self.llm_without_reasoning, messages, state,
+            build=lambda llm: llm.with_structured_output(GeneratedQuery),
+            escalation=state.get("sql_attempts", 0),
+        )
         logger.info(f"Dialect: {self.db_dialect}")
         logger.info(f"SCHEMA FOR GENERATING SQL--->{state['messages'][-1].content}")
-        logger.info(f"Generated Query Response: {response}")
+        logger.info(f"Generated Query: {generated}")
         logger.critical(f"generate_query node completed in {time.time() - start_time:.2f} seconds")
         logger.info("---------------------"*4)
-        return {"messages": [response]}
+        return {
+            "sql_attempts": state.get("sql_attempts", 0) + 1,
+            "messages": [
+                AIMessage(
+                    content=generated.sql,
+                    additional_kwargs={
+                        "metadata": {
+                            "sql_query": generated.sql,
+                            "tables_used": generated.tables_used,
+                            "confidence": generated.confidence,
+                        }
+                    },
+                )
+            ]
+        }
 
-    # LLM CALL 04_D ( Adding SQL in metadata )
-    def check_query(self, state: MessagesState):
+    def check_query(self, state: AgentState):
         """
-        Validate SQL query WITHOUT calling any tool.
+        Validate SQL query locally (no LLM call).
         Returns:
             - content: "VALID" or "INVALID"
-            - metadata.sql_query: original SQL
+            - metadata.sql_query: cleaned SQL
+            - metadata.error: concrete reason when INVALID (fed back to generate_query)
         """
         start_time = time.time()
-        logger.warning("**************  CHECK QUERY ************** ")
-        logger.warning("LLM call:" + str(self.llm_call))
-        self.llm_call += 1
+        logger.warning("**************  CHECK QUERY (LOCAL) ************** ")
         last_msg = state["messages"][-1]
-        sql_query = last_msg.content.strip() if isinstance(last_msg.content, str) else None
-        
-        # IF SQL query is not available than return INVALID 
-        if not sql_query:
-            return {
-                "messages": [{
-                    "role": "assistant",
-                    "content": "INVALID",
-                    "metadata": {"sql_query": None}
-                }]
-            }
-        system_message = {
-            "role": "system",
-            "content": get_check_query_prompt(self.db_dialect)
-        }
-        user_message = { "role": "user", "content": sql_query }
-        llm = self.llm_without_reasoning
-        logger.critical(f"llm --> gpt-5-nano, resoning--> minimal")
-        response = llm.invoke([system_message, user_message])
-        verdict = response.content.strip().upper()
-        logger.info(f"SQL Query for Validation: {sql_query}")
-        logger.info(f"LLM Response: {response}")
-        logger.info(f"Final verdict {verdict}")
+        metadata = getattr(last_msg, "additional_kwargs", {}).get("metadata", {}) or {}
+        sql_query = metadata.get("sql_query")
+        if sql_query is None and isinstance(last_msg.content, str):
+            sql_query = last_msg.content
+
+        result = validate_sql(sql_query, self.toolkit.db.get_usable_table_names(), self.db_name)
+        verdict = "VALID" if result.valid else "INVALID"
+        logger.info(f"SQL Query for Validation: {result.sql}")
+        logger.info(f"Final verdict {verdict}" + (f" ({result.error})" if result.error else ""))
         logger.critical(f"check query node completed in {time.time() - start_time:.2f} seconds")
         logger.info("---------------------"*4)
 
-        if verdict.startswith("VALID"):
-            verdict = "VALID"
-        else:
-            verdict = "INVALID"
-
         return {
+            "sql_error": result.error,
             "messages": [{
                 "role": "assistant",
-                "content": verdict,              
-                "metadata": {"sql_query": sql_query}  # KEEP SQL FOR next node
+                "content": verdict,
+                "metadata": {"sql_query": result.sql or None, "error": result.error}  # KEEP SQL FOR next node
             }]
         }
 
     
-    def should_continue(self, state: MessagesState):
+    def _can_retry_sql(self, state: AgentState) -> bool:
+        """True while another SQL generation is allowed (1 initial attempt + max_check_attempts retries)"""
+        return state.get("sql_attempts", 0) <= self.max_check_attempts
+
+    def _record_sql_attempts(self, state: AgentState, outcome: str) -> None:
+        attempts = state.get("sql_attempts", 0)
+        logger.info(f"SQL path finished: outcome={outcome}, attempts={attempts}")
+        metrics.increment("sql_attempts", attempts=attempts, outcome=outcome)
+
+    def should_continue(self, state: AgentState):
         """
         Determine next step based on VALID/INVALID result
         and enforce max retry limit.
@@ -512,26 +1063,36 @@ class AgentNodes:
         last_msg = state["messages"][-1]
         verdict = last_msg.content.strip().upper()
         logger.warning("**************  SHOULD CONTINUE ************** ")
-        # Ensure retry counter exists
-        if "retry_count" not in state:
-            state["retry_count"] = 0
-            
-        logger.info(f"SHOULD_CONTINUE: Verdict='{verdict}', RetryCount={state['retry_count']}, Max={self.max_check_attempts}")
+        logger.info(f"SHOULD_CONTINUE: Verdict='{verdict}', Attempts={state.get('sql_attempts', 0)}, MaxRetries={self.max_check_attempts}")
 
         if verdict == "VALID":
-            state["retry_count"] = 0
             logger.info("SHOULD_CONTINUE: Decision=VALID")
-            return "VALID"         
+            return "VALID"
 
-        if state["retry_count"] >= self.max_check_attempts:
+        if not self._can_retry_sql(state):
             logger.info("SHOULD_CONTINUE: Decision=ERROR (Max retries reached)")
-            return "ERROR"      
+            self._record_sql_attempts(state, "invalid")
+            return "ERROR"
 
-        state["retry_count"] += 1
         logger.info("SHOULD_CONTINUE: Decision=INVALID (Retrying)")
-        return "INVALID"      
+        return "INVALID"
 
-    def run_query_custom(self, state: MessagesState):
+    def after_run_query(self, state: AgentState):
+        """
+        Retry SQL generation on a real execution error (unknown column, syntax, ...),
+        otherwise continue to the response.
+        """
+        if not state.get("sql_error"):
+            self._record_sql_attempts(state, "success")
+            return "DONE"
+        if self._can_retry_sql(state):
+            logger.info(f"AFTER_RUN_QUERY: Decision=RETRY ({state['sql_error']})")
+            return "RETRY"
+        logger.info("AFTER_RUN_QUERY: Decision=DONE (Max retries reached)")
+        self._record_sql_attempts(state, "db_error")
+        return "DONE"
+
+    def run_query_custom(self, state: AgentState):
             """
             Execute SQL query WITHOUT tool calls.
             SQL is taken from metadata.sql_query (attached in check_query or generate_query).
@@ -567,23 +1128,32 @@ class AgentNodes:
                     }]
         }
 
-            run_tool = self.toolkit.get_run_query_tool_obj()
-           
             try:
-                result = run_tool.run({"query":sql_query})
+                # Run against the database directly so real driver errors raise
+                # (the sql_db_query tool swallows them into an "Error: ..." string)
+                result = self.toolkit.db.run(sql_query)
                 logger.info(f"SQL QUERY RESULT: {result}")
                 logger.critical(f"run query node completed in {time.time() - start_time:.2f} seconds")
+                # A follow-up's SQL depends on earlier turns, so it isn't an example for the bare question
+                follow_up = self._split_history(state["messages"])[0] or state.get("conversation_summary")
+                if result and self.example_store and not follow_up:
+                    self.example_store.add_example(self.user_query, sql_query)
 
             except Exception as e:
+                # Prefer the driver message, e.g. (1054, "Unknown column 'x' in 'field list'")
+                error = str(getattr(e, "orig", None) or e).split("\n")[0]
+                logger.warning(f"SQL execution failed: {error}")
                 return {
+                    "sql_error": error,
                     "messages": [{
                         "role": "assistant",
-                        "content": f"ERROR executing SQL query: {str(e)}",
-                        "metadata": {"sql_query": sql_query}
+                        "content": f"ERROR executing SQL query: {error}",
+                        "metadata": {"sql_query": sql_query, "error": error}
                     }]
                 }
 
             return {
+                "sql_error": None,
                 "messages": [{
                     "role": "assistant",
                     "content": str(result),    # Pass raw result to generate_response
@@ -592,10 +1162,30 @@ class AgentNodes:
             }
 
     # LLM CALL 05_D
-    def generate_response(self, state: MessagesState):
+    def generate_response(self, state: AgentState):
         """Generate final answer to user based on query results"""
         start_time = time.time()
         logger.warning("************** Generate Response ************** ")
+        last_msg_obj = state["messages"][-1]
+        last_msg_content = state["messages"][-1].content
+        sql_query = None
+        metadata = {}
+
+        if hasattr(last_msg_obj, "additional_kwargs") and last_msg_obj.additional_kwargs:
+            metadata = last_msg_obj.additional_kwargs.get("metadata", {})
+            sql_query = metadata.get("sql_query")
+
+        # Simple result shapes (scalar, short list, chapter-size groups, no rows) skip the LLM
+        if self.template_responses and sql_query and not metadata.get("error"):
+            rendered = render_result(last_msg_content, sql_query)
+            if rendered:
+                metrics.increment("response_rendering", renderer="template", shape=rendered.shape)
+                logger.info(f"Rendered final Response ({rendered.shape}): {rendered.text}")
+                logger.critical(f"generate response node completed in {time.time() - start_time:.2f} seconds")
+                logger.info("---------------------"*4)
+                return {"messages": [AIMessage(content=rendered.text)]}
+        metrics.increment("response_rendering", renderer="llm")
+
         logger.warning("LLM call:" + str(self.llm_call))
         self.llm_call += 1
         system_message = {
@@ -603,25 +1193,19 @@ class AgentNodes:
             "content": get_generate_natural_response_prompt(),
         }
 
-        llm = self.llm_without_reasoning
         logger.critical(f"llm --> gpt-5-nano, resoning--> minimal")
-        last_msg_obj = state["messages"][-1]
-        last_msg_content = state["messages"][-1].content
-        sql_query = None
-
-        if hasattr(last_msg_obj, "additional_kwargs") and last_msg_obj.additional_kwargs:
-            metadata = last_msg_obj.additional_kwargs.get("metadata", {})
-            sql_query = metadata.get("sql_query")
         
-        llm_messages =  [
-                system_message,
-                {"role": "user", "content": last_msg_content},
-                {"role": "user", "content": sql_query},
-                {"role": "user", "content": self.user_query}
-        ] 
+        llm_messages = (
+            self._context("generate_response")
+            .add("system", [system_message])
+            .add("result", [{"role": "user", "content": last_msg_content}], trim=TRUNCATE)
+            .add("sql", [{"role": "user", "content": sql_query}])
+            .add("question", [{"role": "user", "content": self.user_query}])
+            .build()
+        )
 
 
-        response = llm.invoke(llm_messages)
+        response = self._invoke_llm("generate_response", self.llm_without_reasoning, llm_messages, state)
         logger.info(f"SQL query: {sql_query}")
         logger.info(f"Executed SQL Query Result: {last_msg_content}")
         logger.info(f"original user question: {self.user_query}")
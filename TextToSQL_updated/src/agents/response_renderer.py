@@ -0,0 +1,166 @@
+"""Deterministic WhatsApp-friendly rendering for common SQL result shapes
+
+Follows the style rules of get_generate_natural_response_prompt (friendly,
+compact, bullets only for lists, 1-2 emojis, no technical terms). Anything
+that isn't a simple shape returns None and goes to the LLM formatter.
+"""
+
+import ast
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+from src.tools.slots import CHAPTER_SIZES
+
+MAX_RESPONSE_CHARS = 1600
+MAX_LIST_ROWS = 15
+MAX_PAIR_ROWS = 10
+MAX_GROUP_ROWS = 12
+MAX_RECORD_COLUMNS = 6
+
+NO_ROWS_TEXT = (
+    "I couldn't find any matches for that 😕 "
+    "Try checking the sport or chapter name, or ask me in a different way."
+)
+
+_SELECT_LIST_RE = re.compile(r"^\s*SELECT\s+(?:DISTINCT\s+)?(.*?)\s+FROM\s", re.IGNORECASE | re.DOTALL)
+_ALIAS_RE = re.compile(r"\bAS\s+[`\"]?(\w+)[`\"]?\s*$", re.IGNORECASE)
+_IDENTIFIER_RE = re.compile(r"^(?:[`\"]?\w+[`\"]?\.)?[`\"]?(\w+)[`\"]?$")
+# Personal info is filtered by the LLM formatter, never rendered verbatim
+_SENSITIVE_COLUMN_RE = re.compile(r"phone|contact|mobile|email|address|t_?shirt|password", re.IGNORECASE)
+# "Singles - 5+5 (M+F), Doubles - 3+3 Teams (M+F)" reads better as bullets
+_EVENT_LIST_RE = re.compile(r"^[^,]+ - [^,]+(?:, [^,]+ - [^,]+)+$")
+
+
+@dataclass
+class RenderedResponse:
+    """Text produced by the renderer and the result shape it matched"""
+    text: str
+    shape: str
+
+
+def select_columns(sql_query: Optional[str]) -> Optional[list[Optional[str]]]:
+    """Output column names of a simple SELECT (None for unnamed expressions)"""
+    match = _SELECT_LIST_RE.match(sql_query or "")
+    if not match:
+        return None
+    items, depth, current = [], 0, ""
+    for char in match.group(1):
+        if char == "," and depth == 0:
+            items.append(current)
+            current = ""
+            continue
+        depth += char == "("
+        depth -= char == ")"
+        current += char
+    items.append(current)
+
+    columns = []
+    for item in (i.strip() for i in items):
+        if item == "*" or item.endswith(".*"):
+            return None
+        alias = _ALIAS_RE.search(item)
+        identifier = _IDENTIFIER_RE.match(item)
+        columns.append((alias or identifier).group(1).lower() if (alias or identifier) else None)
+    return columns
+
+
+def parse_rows(result: str) -> Optional[list[tuple]]:
+    """Parse SQLDatabase.run output ("" or a repr of a list of tuples)"""
+    if not result.strip():
+        return []
+    try:
+        rows = ast.literal_eval(result)
+    except (ValueError, SyntaxError):
+        return None
+    if not isinstance(rows, list) or not all(isinstance(r, tuple) for r in rows):
+        return None
+    return rows
+
+
+def _label(column: str) -> str:
+    return column.replace("_", " ").strip().capitalize()
+
+
+def _value(value) -> str:
+    if value is None or (isinstance(value, str) and not value.strip()):
+        return "Not specified"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+
+def _value_lines(value) -> list[str]:
+    text = _value(value)
+    if _EVENT_LIST_RE.match(text):
+        return [f"• {part.strip()}" for part in text.split(", ")]
+    return [f"• {text}"]
+
+
+def _render_chapter_groups(columns: list[str], rows: list[tuple]) -> str:
+    size_index = columns.index("chapter_size")
+    other = [i for i in range(len(columns)) if i != size_index]
+    # Columns repeated on every row (e.g. the sport) go in the intro line
+    constant = [
+        i for i in other
+        if len(rows) > 1 and len({r[i] for r in rows}) == 1 and len(_value(rows[0][i])) <= 40
+    ]
+    shown = [i for i in other if i not in constant]
+    if not shown:
+        shown, constant = constant, []
+
+    intro = "Here's what I found"
+    if constant:
+        intro += " for " + ", ".join(_value(rows[0][i]) for i in constant)
+    lines = [intro + " 🏅"]
+
+    order = {size: n for n, size in enumerate(CHAPTER_SIZES)}
+    for row in sorted(rows, key=lambda r: order.get(r[size_index], len(order))):
+        lines.append("")
+        lines.append(f"*{_value(row[size_index])}*")
+        for i in shown:
+            if len(shown) == 1:
+                lines.extend(_value_lines(row[i]))
+            else:
+                lines.append(f"• {_label(columns[i])}: {_value(row[i])}")
+    return "\n".join(lines)
+
+
+def render_result(result: str, sql_query: Optional[str]) -> Optional[RenderedResponse]:
+    """Render a raw SQL result for WhatsApp, or None if the LLM should phrase it"""
+    rows = parse_rows(result)
+    if rows is None:
+        return None
+    if not rows:
+        return RenderedResponse(NO_ROWS_TEXT, "no_rows")
+
+    width = len(rows[0])
+    if any(len(r) != width for r in rows):
+        return None
+    columns = select_columns(sql_query)
+    # Unnamed columns (SELECT *, expressions) can't be checked for personal info
+    if columns is None or len(columns) != width or not all(columns):
+        return None
+    if any(_SENSITIVE_COLUMN_RE.search(c) for c in columns):
+        return None
+
+    if len(rows) == 1 and width == 1:
+        text = f"Here's what I found 🏅\n{_label(columns[0])}: *{_value(rows[0][0])}*"
+        rendered = RenderedResponse(text, "scalar")
+    elif "chapter_size" in columns and len(rows) <= MAX_GROUP_ROWS:
+        rendered = RenderedResponse(_render_chapter_groups(columns, rows), "chapter_groups")
+    elif width == 1 and len(rows) <= MAX_LIST_ROWS:
+        lines = ["Here's what I found 🏅"] + [f"• {_value(r[0])}" for r in rows]
+        rendered = RenderedResponse("\n".join(lines), "list")
+    elif width == 2 and len(rows) <= MAX_PAIR_ROWS:
+        lines = ["Here's what I found 🏅"] + [f"• {_value(r[0])} - {_value(r[1])}" for r in rows]
+        rendered = RenderedResponse("\n".join(lines), "list")
+    elif len(rows) == 1 and width <= MAX_RECORD_COLUMNS:
+        lines = ["Here's what I found 🏅"] + [f"• {_label(c)}: {_value(v)}" for c, v in zip(columns, rows[0])]
+        rendered = RenderedResponse("\n".join(lines), "record")
+    else:
+        return None
+
+    if len(rendered.text) > MAX_RESPONSE_CHARS:
+        return None
+    return rendered
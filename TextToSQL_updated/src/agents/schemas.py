@@ -0,0 +1,10 @@
+"""Structured output schemas for agent LLM calls"""
+
+from pydantic import BaseModel, Field
+
+
+class GeneratedQuery(BaseModel):
+    """SQL generated for the user's question"""
+    sql: str = Field(description="A single read-only SELECT query for the user's question")
+    tables_used: list[str] = Field(description="Names of the tables the query reads from")
+    confidence: float = Field(description="Confidence between 0 and 1 that the query answers the question")
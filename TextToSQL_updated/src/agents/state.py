@@ -0,0 +1,18 @@
+"""Typed graph state for the agent"""
+
+from typing import Any, Optional
+from langgraph.graph import MessagesState
+
+
+class AgentState(MessagesState):
+    """MessagesState plus typed bookkeeping for the SQL path.
+
+    Keys must be declared here to survive between nodes; LangGraph drops
+    anything a node or edge writes that is not part of the state schema.
+    """
+    sql_attempts: int  # Number of SQL generations so far for this question
+    sql_error: Optional[str]  # Last validation or execution error, fed back to generate_query
+    sql_source: Optional[str]  # Set when a fast path (e.g. "verified_example") produced the result
+    conversation_summary: Optional[str]  # Rolling summary of the thread's older turns (see src/core/history.py)
+    speculative_schema: Optional[dict[str, Any]]  # Schema messages prefetched during classification (speculative mode)
+    route: Optional[str]  # classify_query label the graph routes on
@@ -27,5 +27,6 @@ def get_toolkit(
     return SQLToolkit(
         db_manager.get_database(), 
         llm_manager.get_model(),
-        llm_manager.get_model_without_reasoning()
+        llm_manager.get_model_without_reasoning(),
+        llm_manager.get_models(),
     )
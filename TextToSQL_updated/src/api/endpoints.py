@@ -1,5 +1,6 @@
 """FastAPI endpoints for Text-to-SQL service"""
 
+import asyncio
 import json
 from fastapi import FastAPI, HTTPException, Form, Request
 from pydantic import BaseModel
@@ -17,6 +18,11 @@ from src.config import Settings
 from src.core import DatabaseManager, LLMManager, ConversationManager
 from src.tools import SQLToolkit
 from src.agents import AgentGraphBuilder
+from src.utils import metrics
+from src.queue.tasks import enqueue_conversation_summary
+from src.core.dependencies import get_rq_queue
+from src.core.single_flight import get_single_flight, is_context_free
+from src.core.warmup import get_answer_cache, invalidate_answers, latest_report
 
 # Load environment variables
 load_dotenv()
@@ -73,13 +79,35 @@ async def root():
 async def health():
     """Detailed health check"""
     logger.debug("Health check endpoint called")
+    from src.core.dependencies import peek_llm_manager
+    # Never builds the LLM manager: the check stays cheap and can't fail on LLM configuration
+    llm_manager = peek_llm_manager()
     return {
         "status": "healthy",
         "service": "Text-to-SQL API",
-        "version": "1.0.0"
+        "version": "1.0.0",
+        "llm_backends": llm_manager.backend_health() if llm_manager else {},
     }
 
 
+@app.get("/metrics")
+async def get_metrics():
+    """Aggregated pipeline metrics shared by the API and workers"""
+    return metrics.snapshot()
+
+
+@app.get("/warmup")
+async def get_warmup_report():
+    """Latest answer warm-up run: answers warmed and coverage of the traffic since the run before"""
+    return latest_report() or {}
+
+
+@app.post("/warmup/invalidate")
+async def invalidate_warmed_answers():
+    """Drop all warmed answers, e.g. after the database behind them was updated"""
+    return {"invalidated": await asyncio.to_thread(invalidate_answers, "admin")}
+
+
 @app.on_event("startup")
 async def startup_event():
     """Initialize resources on startup"""
@@ -113,13 +141,21 @@ async def process_query(request: QueryRequest):
         # Get cached dependencies
         from src.api.dependencies import get_db_manager, get_llm_manager, get_toolkit
         
+        settings = Settings.from_env()
+        single_flight = get_single_flight(settings.single_flight)
+        answer_cache = get_answer_cache(settings.warmup)
+        context_free = True
+
         # Initialize conversation manager if thread_id is provided
         conversation_manager = None
         if request.thread_id:
-            # We still need settings for this one, or we can make it a dependency too
-            settings = Settings.from_env() 
             logger.info(f"Initializing conversation manager for thread: {request.thread_id}")
             conversation_manager = ConversationManager(settings)
+            if single_flight or answer_cache:
+                context_free = is_context_free(
+                    conversation_manager.get_last_messages(request.thread_id, limit=1),
+                    settings.single_flight.idle_seconds,
+                )
             # Save user message
             conversation_manager.save_message(request.thread_id, "user", request.question)
             logger.debug("User message saved to conversation thread")
@@ -139,33 +175,44 @@ async def process_query(request: QueryRequest):
         # Reuse the toolkit creation logic or get from dependency
         toolkit = get_toolkit(db_manager, llm_manager)
         
-        # Build agent graph with conversation memory
-        logger.info("4: Building agent graph")
-        agent_builder = AgentGraphBuilder(
-            toolkit, 
-            dialect, 
-            conversation_manager=conversation_manager,
-            thread_id=request.thread_id
-        )
-        # logger.debug("Agent graph built successfully")
-        
-        # Collect the response
-        logger.info("5: Executing agent stream")
-        messages = []
-        step_count = 0
-        async for step in agent_builder.astream(
-            {"messages": [{"role": "user", "content": request.question}]},
-            stream_mode="values",
-        ):
-            step_count += 1
-            messages.append(step["messages"][-1])
-            logger.debug(f"Agent step {step_count} completed")
-        
-        logger.info(f"Agent completed {step_count} steps")
-        
-        # Get the final response
-        final_message = messages[-1] if messages else None
-        result = final_message.content if final_message else "No response generated"
+        async def answer(memory, thread_id) -> str:
+            # Build agent graph with conversation memory
+            logger.info("4: Building agent graph")
+            agent_builder = AgentGraphBuilder(
+                toolkit, 
+                dialect, 
+                conversation_manager=memory,
+                thread_id=thread_id
+            )
+            # logger.debug("Agent graph built successfully")
+            
+            # Collect the response
+            logger.info("5: Executing agent stream")
+            messages = []
+            step_count = 0
+            async for step in agent_builder.astream(
+                {"messages": [{"role": "user", "content": request.question}]},
+                stream_mode="values",
+            ):
+                step_count += 1
+                messages.append(step["messages"][-1])
+                logger.debug(f"Agent step {step_count} completed")
+            
+            logger.info(f"Agent completed {step_count} steps")
+            
+            # Get the final response
+            final_message = messages[-1] if messages else None
+            return final_message.content if final_message else "No response generated"
+
+        # A warmed answer skips the graph entirely
+        result = await asyncio.to_thread(answer_cache.get, request.question) if answer_cache and context_free else None
+        if result is not None:
+            logger.info("Served a warmed answer")
+        elif single_flight and context_free:
+            # Identical concurrent questions share one run, computed without thread history
+            result = await single_flight.arun(request.question, lambda: answer(None, None))
+        else:
+            result = await answer(conversation_manager, request.thread_id)
         logger.debug(f"Final response generated: {len(result)} characters")
         
         # Save assistant response if using conversation memory
@@ -173,6 +220,7 @@ async def process_query(request: QueryRequest):
             conversation_manager.save_message(request.thread_id, "assistant", result)
             conversation_manager.close()
             logger.debug("Assistant response saved to conversation thread")
+            await asyncio.to_thread(enqueue_conversation_summary, get_rq_queue(), request.thread_id)
         
         elapsed_time = time.time() - start_time
         logger.info(f"Query processed successfully in {elapsed_time:.2f}s")
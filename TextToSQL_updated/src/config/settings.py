@@ -1,7 +1,7 @@
 """Configuration settings for the Text-to-SQL agent"""
 
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Optional
 
 
@@ -52,6 +52,7 @@ class TwilioConfig:
     account_sid: str
     auth_token: str
     from_number: str
+    api_base_url: Optional[str] = None  # Override for a local Twilio stand-in (load testing)
 
 
 @dataclass
@@ -71,6 +72,205 @@ class RedisConfig:
         return f"redis://{self.host}:{self.port}/{self.db}"
 
 
+@dataclass
+class ExampleStoreConfig:
+    """Verified question -> SQL example store configuration"""
+    enabled: bool = True
+    top_k: int = 3                  # Few-shot examples injected into generate_query
+    min_similarity: float = 0.3     # Cosine similarity floor for few-shot retrieval
+    template_match: bool = True     # Answer exact template matches without the LLM
+    max_examples: int = 2000        # Examples kept in memory
+    refresh_interval: int = 60      # Seconds between reloads from MySQL
+
+
+@dataclass
+class SiteCrawlConfig:
+    """Background siciliangames.com crawler configuration"""
+    enabled: bool = True
+    interval: int = 900             # Seconds between crawls (RQ scheduled job)
+    passage_words: int = 80         # Target passage size for the local index
+    passage_overlap: int = 20       # Words repeated between consecutive passages
+    top_k: int = 4                  # Passages given to the LLM per web question
+    timeout: float = 10.0           # Per-page request timeout
+    extract_facts: bool = True      # Extract structured facts from changed pages after each crawl
+    facts_limit: int = 12           # Max fact entries given to the LLM per web question
+    job_timeout: int = 1800         # Seconds the crawl job may run (RQ job_timeout; RQ's default is 180)
+
+
+@dataclass
+class ConversationConfig:
+    """Conversation history configuration for history-aware prompts"""
+    summary_enabled: bool = True    # Fold older turns into a rolling per-thread summary (RQ job)
+    recent_turns: int = 3           # Most recent user/assistant turns kept verbatim
+    history_tokens: int = 1200      # Token budget for the history block of a prompt
+    summary_words: int = 150        # Target length of the rolling summary
+
+
+DEFAULT_CONTEXT_BUDGETS = {
+    "classify_query": 2500,
+    "answer_general": 1500,
+    "answer_from_previous_conversation": 3000,
+    "call_get_schema_llm": 3000,
+    "generate_query": 8000,
+    "generate_response": 4000,
+}
+
+
+@dataclass
+class ContextConfig:
+    """Per-node prompt token budgets for the context builder"""
+    budgets: dict[str, int] = field(default_factory=lambda: dict(DEFAULT_CONTEXT_BUDGETS))
+    default_budget: int = 8000      # Nodes without their own budget
+
+    def budget(self, node: str) -> int:
+        return self.budgets.get(node, self.default_budget)
+
+
+@dataclass
+class LLMCallLimits:
+    """Deadline and output cap for one node's LLM call"""
+    timeout: float                  # Seconds before the call is abandoned (includes client retries)
+    max_tokens: Optional[int] = None  # Output cap; reasoning models count reasoning tokens too
+
+
+DEFAULT_LLM_CALL_LIMITS = {
+    "classify_query": LLMCallLimits(15, 64),  # One enum label; minimal reasoning leaves room to spare
+    "answer_general": LLMCallLimits(30, 1500),
+    "answer_from_previous_conversation": LLMCallLimits(30, 2000),
+    "call_get_schema_llm": LLMCallLimits(30, 2000),
+    "generate_query": LLMCallLimits(30, 2000),
+    "generate_response": LLMCallLimits(30, 1500),
+    "web_facts": LLMCallLimits(20, 1000),
+    "direct_scrape": LLMCallLimits(30, 2000),
+    "web_search": LLMCallLimits(45, None),
+    "classify_batch": LLMCallLimits(20, 1000),
+    "conversation_summary": LLMCallLimits(30, 600),
+    "page_facts": LLMCallLimits(60, None),
+}
+
+
+@dataclass
+class LLMCallsConfig:
+    """Per-node LLM deadlines, output caps and request hedging"""
+    limits: dict[str, LLMCallLimits] = field(default_factory=lambda: dict(DEFAULT_LLM_CALL_LIMITS))
+    default_timeout: float = 60.0   # Nodes without their own limits
+    hedging: bool = False           # Fire a duplicate request once a call outlives the node's p95
+    hedge_quantile: float = 0.95
+    hedge_min_samples: int = 20     # Latencies observed before a node is hedged
+    constrained_classification: bool = True  # classify_query answers with a JSON-schema enum (needs backend support)
+
+    def for_node(self, node: str) -> LLMCallLimits:
+        return self.limits.get(node) or LLMCallLimits(self.default_timeout)
+
+
+@dataclass
+class LLMCacheNode:
+    """Cache bounds of one node's LLM responses"""
+    ttl: int = 3600                 # Seconds an entry lives
+    max_entries: int = 5000         # Least recently used entries beyond this are evicted
+
+
+DEFAULT_LLM_CACHE_NODES = {
+    # Deterministic given their input; answer-writing nodes are left uncached
+    "classify_query": LLMCacheNode(3600, 5000),
+    "call_get_schema_llm": LLMCacheNode(3600, 2000),
+}
+
+
+@dataclass
+class LLMCacheConfig:
+    """Exact-match LLM response cache, enabled per node"""
+    enabled: bool = True
+    nodes: dict[str, LLMCacheNode] = field(default_factory=lambda: dict(DEFAULT_LLM_CACHE_NODES))
+
+
+@dataclass
+class QueryClassifierConfig:
+    """Local hashed n-gram classifier answering classify_query before the LLM"""
+    enabled: bool = False
+    model_path: str = "models/query_classifier.json"
+    min_confidence: float = 0.9     # Below this the LLM classifies the question
+    log_samples: bool = True        # Record LLM classifications as training data
+    max_samples: int = 50_000       # Most recent samples kept in Redis
+
+
+@dataclass
+class ClassifyBatchConfig:
+    """Micro-batching of classify_query LLM calls across the API and workers (Redis)"""
+    enabled: bool = False
+    window: float = 0.03            # Seconds a batch collects requests before it is sent
+    max_items: int = 16             # A batch is sent early once this many requests are queued
+    timeout: float = 10.0           # Seconds a request waits for its batch before classifying alone
+
+
+@dataclass
+class SingleFlightConfig:
+    """Coalescing of identical concurrent context-free questions (Redis)"""
+    enabled: bool = False
+    timeout: float = 120.0          # Seconds a follower waits for the leader before answering itself
+    result_ttl: int = 5             # Seconds a finished answer is still shared with late arrivals
+    idle_seconds: int = 0           # Threads idle this long count as context-free (0: only new threads)
+
+
+@dataclass
+class WarmupConfig:
+    """Scheduled pre-computation of answers to the most frequent context-free questions (RQ + Redis)"""
+    enabled: bool = False
+    hours: list[int] = field(default_factory=lambda: [6, 16])  # Local hours to run, at the start of peak windows
+    top_n: int = 50                 # Questions warmed per run
+    min_count: int = 3              # Times a question must have been asked to be warmed
+    lookback_days: int = 7          # History mined for frequent questions
+    answer_ttl: int = 3600          # Seconds a warmed answer is served (about one peak window)
+
+
+@dataclass
+class RateLimitConfig:
+    """Provider rate limits shared by the API and workers (Redis token buckets)"""
+    enabled: bool = False
+    requests_per_minute: int = 500
+    tokens_per_minute: int = 200_000
+    background_reserve: float = 0.3    # Share of both buckets background calls leave for interactive ones
+    max_wait_interactive: float = 10.0  # Seconds queued before sending anyway
+    max_wait_background: float = 300.0
+    completion_tokens: int = 500        # Output estimate for calls without max_tokens
+
+
+@dataclass
+class LLMBackend:
+    """One OpenAI-compatible endpoint in the failover pool"""
+    name: str
+    base_url: str
+    api_key: str
+
+
+@dataclass
+class LLMBackendsConfig:
+    """Interchangeable chat endpoints with health-scored failover"""
+    backends: list[LLMBackend] = field(default_factory=list)  # Empty: the default OpenAI endpoint only
+    failure_threshold: int = 3      # Consecutive failures that open a backend's circuit
+    open_seconds: float = 30.0      # Circuit open time before a probe request is let through
+    error_penalty: float = 4.0      # Score multiplier per unit of recent error rate
+
+
+@dataclass
+class ModelProfile:
+    """One model in the routing registry"""
+    name: str
+    model: str
+    tier: int                       # Capability rank; routing escalates to higher tiers
+    reasoning_effort: Optional[str] = None
+    latency: float = 2.0            # Expected seconds per call until latencies are observed
+    cost: float = 1.0               # Relative cost, breaks latency ties within a tier
+
+
+@dataclass
+class ModelRouterConfig:
+    """Complexity-based model routing for the SQL and answer nodes"""
+    enabled: bool = False
+    models: list[ModelProfile] = field(default_factory=list)  # Empty: the two configured LLMs
+    thresholds: list[float] = field(default_factory=lambda: [4.0, 8.0])  # Complexity floor of each tier above the lowest
+    node_min_tiers: dict[str, int] = field(default_factory=dict)  # Node -> lowest tier it may use
+
 
 @dataclass
 class Settings:
@@ -80,6 +280,19 @@ class Settings:
     llm_without_reasoning: LLMWithoutReasoningConfig
     twilio: TwilioConfig
     redis: RedisConfig
+    example_store: ExampleStoreConfig = field(default_factory=ExampleStoreConfig)
+    site_crawl: SiteCrawlConfig = field(default_factory=SiteCrawlConfig)
+    conversation: ConversationConfig = field(default_factory=ConversationConfig)
+    context: ContextConfig = field(default_factory=ContextConfig)
+    llm_calls: LLMCallsConfig = field(default_factory=LLMCallsConfig)
+    model_router: ModelRouterConfig = field(default_factory=ModelRouterConfig)
+    llm_backends: LLMBackendsConfig = field(default_factory=LLMBackendsConfig)
+    rate_limits: RateLimitConfig = field(default_factory=RateLimitConfig)
+    llm_cache: LLMCacheConfig = field(default_factory=LLMCacheConfig)
+    query_classifier: QueryClassifierConfig = field(default_factory=QueryClassifierConfig)
+    classify_batch: ClassifyBatchConfig = field(default_factory=ClassifyBatchConfig)
+    single_flight: SingleFlightConfig = field(default_factory=SingleFlightConfig)
+    warmup: WarmupConfig = field(default_factory=WarmupConfig)
     debug: bool = False
 
     @classmethod
@@ -96,8 +309,8 @@ class Settings:
         llm_config = LLMConfig(
             model=os.getenv("LLM_MODEL", "gpt-4o-mini"),
             temperature=float(os.getenv("LLM_TEMPERATURE", "0")),
-            max_tokens=None,
-            timeout=None,
+            max_tokens=int(os.getenv("LLM_MAX_TOKENS")) if os.getenv("LLM_MAX_TOKENS") else None,
+            timeout=float(os.getenv("LLM_TIMEOUT", "60")),
             max_retries=int(os.getenv("LLM_MAX_RETRIES", "2")),
             api_key=os.getenv("OPENAI_API_KEY", ""),
             reasoning_effort=os.getenv("LLM_REASONING_EFFORT", "low"),
@@ -107,8 +320,8 @@ class Settings:
         llm_without_reasoning_config = LLMWithoutReasoningConfig(
             model=os.getenv("LLM_WITHOUT_REASONING_MODEL", "gpt-4o-mini"),
             temperature=float(os.getenv("LLM_WITHOUT_REASONING_TEMPERATURE", "0")),
-            max_tokens=None,
-            timeout=None,
+            max_tokens=int(os.getenv("LLM_WITHOUT_REASONING_MAX_TOKENS")) if os.getenv("LLM_WITHOUT_REASONING_MAX_TOKENS") else None,
+            timeout=float(os.getenv("LLM_WITHOUT_REASONING_TIMEOUT", "60")),
             max_retries=int(os.getenv("LLM_WITHOUT_REASONING_MAX_RETRIES", "2")),
             api_key=os.getenv("OPENAI_API_KEY", ""),
             reasoning_effort=os.getenv("LLM_WITHOUT_REASONING_EFFORT", None),
@@ -119,6 +332,7 @@ class Settings:
             account_sid=os.getenv("TWILIO_ACCOUNT_SID", ""),
             auth_token=os.getenv("TWILIO_AUTH_TOKEN", ""),
             from_number=os.getenv("TWILIO_WHATSAPP_NUMBER", "whatsapp:+14155238886"),
+            api_base_url=os.getenv("TWILIO_API_BASE_URL"),
         )
 
         redis_config = RedisConfig(
@@ -131,11 +345,185 @@ class Settings:
             # socket_connect_timeout=int(os.getenv("REDIS_SOCKET_CONNECT_TIMEOUT", "5")),
         )
 
+        example_store_config = ExampleStoreConfig(
+            enabled=os.getenv("EXAMPLE_STORE_ENABLED", "True").lower() == "true",
+            top_k=int(os.getenv("EXAMPLE_STORE_TOP_K", "3")),
+            min_similarity=float(os.getenv("EXAMPLE_STORE_MIN_SIMILARITY", "0.3")),
+            template_match=os.getenv("EXAMPLE_TEMPLATE_MATCH", "True").lower() == "true",
+            max_examples=int(os.getenv("EXAMPLE_STORE_MAX_EXAMPLES", "2000")),
+            refresh_interval=int(os.getenv("EXAMPLE_STORE_REFRESH_INTERVAL", "60")),
+        )
+
+        site_crawl_config = SiteCrawlConfig(
+            enabled=os.getenv("SITE_CRAWL_ENABLED", "True").lower() == "true",
+            interval=int(os.getenv("SITE_CRAWL_INTERVAL", "900")),
+            passage_words=int(os.getenv("SITE_CRAWL_PASSAGE_WORDS", "80")),
+            passage_overlap=int(os.getenv("SITE_CRAWL_PASSAGE_OVERLAP", "20")),
+            top_k=int(os.getenv("SITE_CRAWL_TOP_K", "4")),
+            timeout=float(os.getenv("SITE_CRAWL_TIMEOUT", "10")),
+            extract_facts=os.getenv("SITE_CRAWL_EXTRACT_FACTS", "True").lower() == "true",
+            facts_limit=int(os.getenv("SITE_CRAWL_FACTS_LIMIT", "12")),
+            job_timeout=int(os.getenv("SITE_CRAWL_JOB_TIMEOUT", "1800")),
+        )
+
+        conversation_config = ConversationConfig(
+            summary_enabled=os.getenv("CONVERSATION_SUMMARY_ENABLED", "True").lower() == "true",
+            recent_turns=int(os.getenv("CONVERSATION_RECENT_TURNS", "3")),
+            history_tokens=int(os.getenv("CONVERSATION_HISTORY_TOKENS", "1200")),
+            summary_words=int(os.getenv("CONVERSATION_SUMMARY_WORDS", "150")),
+        )
+
+        # e.g. CONTEXT_BUDGETS="generate_query=6000,generate_response=3000"
+        context_budgets = dict(DEFAULT_CONTEXT_BUDGETS)
+        for item in os.getenv("CONTEXT_BUDGETS", "").split(","):
+            if "=" in item:
+                node, tokens = item.split("=", 1)
+                context_budgets[node.strip()] = int(tokens)
+        context_config = ContextConfig(
+            budgets=context_budgets,
+            default_budget=int(os.getenv("CONTEXT_DEFAULT_BUDGET", "8000")),
+        )
+
+        # e.g. LLM_NODE_LIMITS="classify_query=10:300,generate_query=30:1500" (seconds:max tokens)
+        llm_call_limits = dict(DEFAULT_LLM_CALL_LIMITS)
+        for item in os.getenv("LLM_NODE_LIMITS", "").split(","):
+            if "=" in item:
+                node, limits = item.split("=", 1)
+                timeout, _, max_tokens = limits.partition(":")
+                llm_call_limits[node.strip()] = LLMCallLimits(float(timeout), int(max_tokens) if max_tokens else None)
+        llm_calls_config = LLMCallsConfig(
+            limits=llm_call_limits,
+            default_timeout=float(os.getenv("LLM_DEFAULT_NODE_TIMEOUT", "60")),
+            hedging=os.getenv("LLM_HEDGING", "False").lower() == "true",
+            hedge_quantile=float(os.getenv("LLM_HEDGE_QUANTILE", "0.95")),
+            hedge_min_samples=int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20")),
+            constrained_classification=os.getenv("LLM_CONSTRAINED_CLASSIFICATION", "True").lower() == "true",
+        )
+
+        # e.g. LLM_MODELS="fast=gpt-4o-mini:0:1.5:1,mid=gpt-5-mini/minimal:1:4:3,reasoning=gpt-5/low:2:10:10"
+        # (name=model[/reasoning effort]:tier[:expected seconds[:relative cost]])
+        model_profiles = []
+        for item in os.getenv("LLM_MODELS", "").split(","):
+            if "=" in item:
+                name, spec = item.split("=", 1)
+                model, tier, *rest = spec.strip().split(":")
+                model, _, effort = model.partition("/")
+                model_profiles.append(ModelProfile(
+                    name=name.strip(),
+                    model=model,
+                    tier=int(tier),
+                    reasoning_effort=effort or None,
+                    latency=float(rest[0]) if rest else 2.0,
+                    cost=float(rest[1]) if len(rest) > 1 else 1.0,
+                ))
+        if not model_profiles:
+            model_profiles = [
+                ModelProfile("fast", llm_without_reasoning_config.model, 0,
+                             llm_without_reasoning_config.reasoning_effort, latency=2.0, cost=1.0),
+                ModelProfile("reasoning", llm_config.model, 1, llm_config.reasoning_effort, latency=8.0, cost=4.0),
+            ]
+        model_router_config = ModelRouterConfig(
+            enabled=os.getenv("LLM_ROUTER_ENABLED", "False").lower() == "true",
+            models=model_profiles,
+            thresholds=[float(t) for t in os.getenv("LLM_ROUTER_THRESHOLDS", "4,8").split(",") if t.strip()],
+            node_min_tiers={
+                node.strip(): int(tier)
+                for node, _, tier in (item.partition("=") for item in os.getenv("LLM_ROUTER_NODE_MIN_TIERS", "").split(","))
+                if tier
+            },
+        )
+
+        # e.g. LLM_BACKENDS="openai=https://api.openai.com/v1,backup=https://llm-proxy.internal/v1"
+        # (keys from LLM_BACKEND_<NAME>_API_KEY, default OPENAI_API_KEY)
+        llm_backends = []
+        for item in os.getenv("LLM_BACKENDS", "").split(","):
+            if "=" in item:
+                name, base_url = (part.strip() for part in item.split("=", 1))
+                llm_backends.append(LLMBackend(
+                    name=name,
+                    base_url=base_url.rstrip("/"),
+                    api_key=os.getenv(f"LLM_BACKEND_{name.upper()}_API_KEY", os.getenv("OPENAI_API_KEY", "")),
+                ))
+        llm_backends_config = LLMBackendsConfig(
+            backends=llm_backends,
+            failure_threshold=int(os.getenv("LLM_BACKEND_FAILURE_THRESHOLD", "3")),
+            open_seconds=float(os.getenv("LLM_BACKEND_OPEN_SECONDS", "30")),
+            error_penalty=float(os.getenv("LLM_BACKEND_ERROR_PENALTY", "4")),
+        )
+
+        rate_limit_config = RateLimitConfig(
+            enabled=os.getenv("LLM_RATE_LIMIT_ENABLED", "False").lower() == "true",
+            requests_per_minute=int(os.getenv("LLM_RATE_LIMIT_RPM", "500")),
+            tokens_per_minute=int(os.getenv("LLM_RATE_LIMIT_TPM", "200000")),
+            background_reserve=float(os.getenv("LLM_RATE_LIMIT_BACKGROUND_RESERVE", "0.3")),
+            max_wait_interactive=float(os.getenv("LLM_RATE_LIMIT_MAX_WAIT", "10")),
+            max_wait_background=float(os.getenv("LLM_RATE_LIMIT_MAX_WAIT_BACKGROUND", "300")),
+            completion_tokens=int(os.getenv("LLM_RATE_LIMIT_COMPLETION_TOKENS", "500")),
+        )
+
+        # e.g. LLM_CACHE_NODES="classify_query=3600:5000,generate_query=600:1000" (ttl seconds:max entries)
+        llm_cache_nodes = dict(DEFAULT_LLM_CACHE_NODES)
+        if os.getenv("LLM_CACHE_NODES") is not None:
+            llm_cache_nodes = {}
+            for item in os.getenv("LLM_CACHE_NODES", "").split(","):
+                if "=" in item:
+                    node, bounds = item.split("=", 1)
+                    ttl, _, max_entries = bounds.partition(":")
+                    llm_cache_nodes[node.strip()] = LLMCacheNode(int(ttl), int(max_entries) if max_entries else 5000)
+        llm_cache_config = LLMCacheConfig(
+            enabled=os.getenv("LLM_CACHE_ENABLED", "True").lower() == "true",
+            nodes=llm_cache_nodes,
+        )
+
+        query_classifier_config = QueryClassifierConfig(
+            enabled=os.getenv("QUERY_CLASSIFIER_ENABLED", "False").lower() == "true",
+            model_path=os.getenv("QUERY_CLASSIFIER_MODEL", "models/query_classifier.json"),
+            min_confidence=float(os.getenv("QUERY_CLASSIFIER_MIN_CONFIDENCE", "0.9")),
+            log_samples=os.getenv("QUERY_CLASSIFIER_LOG_SAMPLES", "True").lower() == "true",
+            max_samples=int(os.getenv("QUERY_CLASSIFIER_MAX_SAMPLES", "50000")),
+        )
+
+        classify_batch_config = ClassifyBatchConfig(
+            enabled=os.getenv("CLASSIFY_BATCH_ENABLED", "False").lower() == "true",
+            window=float(os.getenv("CLASSIFY_BATCH_WINDOW_MS", "30")) / 1000,
+            max_items=int(os.getenv("CLASSIFY_BATCH_MAX_ITEMS", "16")),
+            timeout=float(os.getenv("CLASSIFY_BATCH_TIMEOUT", "10")),
+        )
+
+        single_flight_config = SingleFlightConfig(
+            enabled=os.getenv("SINGLE_FLIGHT_ENABLED", "False").lower() == "true",
+            timeout=float(os.getenv("SINGLE_FLIGHT_TIMEOUT", "120")),
+            result_ttl=int(os.getenv("SINGLE_FLIGHT_RESULT_TTL", "5")),
+            idle_seconds=int(os.getenv("SINGLE_FLIGHT_IDLE_SECONDS", "0")),
+        )
+
+        warmup_config = WarmupConfig(
+            enabled=os.getenv("WARMUP_ENABLED", "False").lower() == "true",
+            hours=sorted({int(h) % 24 for h in os.getenv("WARMUP_HOURS", "6,16").split(",") if h.strip()}),
+            top_n=int(os.getenv("WARMUP_TOP_N", "50")),
+            min_count=int(os.getenv("WARMUP_MIN_COUNT", "3")),
+            lookback_days=int(os.getenv("WARMUP_LOOKBACK_DAYS", "7")),
+            answer_ttl=int(os.getenv("WARMUP_ANSWER_TTL", "3600")),
+        )
+
         return cls(
             database=db_config,
             llm=llm_config,
             llm_without_reasoning=llm_without_reasoning_config,
             twilio=twilio_config,
             redis=redis_config,
+            example_store=example_store_config,
+            site_crawl=site_crawl_config,
+            conversation=conversation_config,
+            context=context_config,
+            llm_calls=llm_calls_config,
+            model_router=model_router_config,
+            llm_backends=llm_backends_config,
+            rate_limits=rate_limit_config,
+            llm_cache=llm_cache_config,
+            query_classifier=query_classifier_config,
+            classify_batch=classify_batch_config,
+            single_flight=single_flight_config,
+            warmup=warmup_config,
             debug=os.getenv("DEBUG", "False").lower() == "true",
         )
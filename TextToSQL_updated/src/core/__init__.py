@@ -3,5 +3,6 @@
 from .database import DatabaseManager
 from .llm import LLMManager
 from .conversation import ConversationManager
+from .example_store import ExampleStore
 
-__all__ = ["DatabaseManager", "LLMManager", "ConversationManager"]
+__all__ = ["DatabaseManager", "LLMManager", "ConversationManager", "ExampleStore"]
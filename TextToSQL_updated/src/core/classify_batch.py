@@ -0,0 +1,199 @@
+"""Micro-batching of classify_query LLM calls across processes
+
+At peak, many /query requests and RQ jobs classify a question within the same
+few hundred milliseconds, and each pays a full request's overhead. With
+CLASSIFY_BATCH_ENABLED, a request is pushed onto a Redis queue instead. The
+first request to take the leader lock waits up to `window` (or until
+`max_items` are queued), pops the batch, and classifies it in one LLM call
+with indexed, enum-constrained outputs. Each label is then pushed to its
+request's result list, where the requester is blocked on BLPOP. While
+waiting, requests keep retrying the lock, so leftovers from a full batch are
+picked up by the next window. A request without a result after `timeout`
+(leader crash, malformed output) classifies itself as before.
+
+The leader sends the batch from a background thread, so its own wait is no
+longer than anyone else's.
+"""
+
+import contextvars
+import json
+import logging
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import redis
+
+from src.config.settings import ClassifyBatchConfig
+from src.core.dependencies import get_redis_client
+from src.core.llm_calls import get_llm_caller
+from src.core.query_classifier import LABELS
+from src.prompts.system_prompts import get_classify_batch_prompt
+from src.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+QUEUE_KEY = "classify_batch:queue"
+LEADER_KEY = "classify_batch:leader"
+RESULT_KEY = "classify_batch:result:{id}"
+RESULT_TTL = 60
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+WAIT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8)
+
+BATCH_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "classifications",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "routes": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "index": {"type": "integer"},
+                            "route": {"type": "string", "enum": list(LABELS)},
+                        },
+                        "required": ["index", "route"],
+                        "additionalProperties": False,
+                    },
+                },
+            },
+            "required": ["routes"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+_batch_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="classify-batch")
+
+
+def parse_routes(content: str, size: int) -> dict[int, str]:
+    """Index -> label from a batch response; malformed or out-of-range entries are left out"""
+    try:
+        routes = json.loads(content).get("routes", [])
+    except (ValueError, AttributeError):
+        return {}
+    labels = {}
+    for entry in routes if isinstance(routes, list) else []:
+        if isinstance(entry, dict) and entry.get("route") in LABELS and isinstance(entry.get("index"), int):
+            if 0 <= entry["index"] < size:
+                labels.setdefault(entry["index"], entry["route"])
+    return labels
+
+
+class ClassifyBatcher:
+    """Submits classifications to the shared batch queue and leads batches when free"""
+
+    def __init__(self, config: ClassifyBatchConfig, llm_caller=None):
+        self.config = config
+        self.llm_caller = llm_caller or get_llm_caller()
+
+    def classify(self, llm, messages: list[dict]) -> Optional[str]:
+        """Label for a classify_query prompt via the batch queue, or None to classify it alone
+
+        Args:
+            llm: Chat model to use if this request ends up leading a batch
+            messages: The single-request prompt (system prompt, context messages, question)
+        """
+        redis_client = get_redis_client()
+        if not redis_client:
+            return None
+        request_id = uuid.uuid4().hex
+        item = json.dumps({
+            "id": request_id,
+            "context": "\n".join(str(m["content"]) for m in messages[1:-1]),
+            "question": str(messages[-1]["content"]),
+        }, ensure_ascii=False)
+        result_key = RESULT_KEY.format(id=request_id)
+        start_time = time.time()
+        try:
+            redis_client.rpush(QUEUE_KEY, item)
+            while time.time() - start_time < self.config.timeout:
+                if redis_client.set(LEADER_KEY, request_id, nx=True, px=int(self.config.window * 1000) + 1000):
+                    self._lead(redis_client, request_id, llm)
+                popped = redis_client.blpop([result_key], timeout=max(self.config.window, 0.01))
+                if popped:
+                    label = popped[1]
+                    outcome = "batched" if label else "failed"
+                    metrics.increment("classify_batch", outcome=outcome)
+                    metrics.observe("classify_batch_wait_seconds", time.time() - start_time, WAIT_BUCKETS)
+                    return label or None
+            redis_client.lrem(QUEUE_KEY, 1, item)
+        except redis.RedisError as e:
+            logger.warning(f"Classification batching unavailable: {e}")
+            metrics.increment("classify_batch", outcome="error")
+            return None
+        logger.warning(f"No batch answered within {self.config.timeout:.0f}s, classifying alone")
+        metrics.increment("classify_batch", outcome="timeout")
+        return None
+
+    def _lead(self, redis_client, request_id: str, llm) -> None:
+        """Collect one window's requests and send them as a batch in the background"""
+        try:
+            window_end = time.time() + self.config.window
+            while time.time() < window_end and redis_client.llen(QUEUE_KEY) < self.config.max_items:
+                time.sleep(0.002)
+            pipe = redis_client.pipeline()
+            pipe.lrange(QUEUE_KEY, 0, self.config.max_items - 1)
+            pipe.ltrim(QUEUE_KEY, self.config.max_items, -1)
+            raw_items = pipe.execute()[0]
+        finally:
+            # Released before the LLM call, so the next window fills while this batch is in flight
+            if redis_client.get(LEADER_KEY) == request_id:
+                redis_client.delete(LEADER_KEY)
+        if raw_items:
+            items = [json.loads(raw) for raw in raw_items]
+            _batch_executor.submit(contextvars.copy_context().run, self._send, llm, items)
+
+    def _send(self, llm, items: list[dict]) -> None:
+        """Classify `items` in one call and scatter the labels ("" where none came back)"""
+        labels = {}
+        try:
+            labels = self.classify_items(llm, items)
+        except Exception as e:
+            logger.error(f"Batch classification of {len(items)} queries failed: {e}")
+        missing = len(items) - len(labels)
+        if missing:
+            logger.warning(f"Batch classification returned no label for {missing}/{len(items)} queries")
+        try:
+            pipe = get_redis_client().pipeline(transaction=False)
+            for index, item in enumerate(items):
+                result_key = RESULT_KEY.format(id=item["id"])
+                pipe.rpush(result_key, labels.get(index, ""))
+                pipe.expire(result_key, RESULT_TTL)
+            pipe.execute()
+        except Exception as e:
+            logger.error(f"Failed to deliver batch classifications: {e}")
+
+    def classify_items(self, llm, items: list[dict]) -> dict[int, str]:
+        """Index -> label for `items` ({"context", "question"}) from one LLM call"""
+        batch_llm = self.llm_caller.limited(llm, "classify_batch")
+        if self.llm_caller.config.constrained_classification:
+            batch_llm = batch_llm.bind(response_format=BATCH_RESPONSE_FORMAT)
+        payload = [{"index": i, "context": item["context"], "query": item["question"]} for i, item in enumerate(items)]
+        messages = [
+            {"role": "system", "content": get_classify_batch_prompt()},
+            {"role": "user", "content": json.dumps(payload, ensure_ascii=False)},
+        ]
+        start_time = time.time()
+        response = self.llm_caller.invoke("classify_batch", batch_llm, messages)
+        metrics.observe("classify_batch_size", len(items), BATCH_SIZE_BUCKETS)
+        logger.critical(f"classify_batch of {len(items)} queries completed in {time.time() - start_time:.2f} seconds")
+        return parse_routes(response.content, len(items))
+
+
+_classify_batcher: Optional[ClassifyBatcher] = None
+
+
+def get_classify_batcher(config: ClassifyBatchConfig) -> Optional[ClassifyBatcher]:
+    """Process-wide ClassifyBatcher, or None if batching is disabled"""
+    global _classify_batcher
+    if not config.enabled:
+        return None
+    if _classify_batcher is None:
+        _classify_batcher = ClassifyBatcher(config)
+    return _classify_batcher
@@ -4,7 +4,7 @@ import json
 import time
 import logging
 import pymysql
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from src.config import Settings
 
 logger = logging.getLogger(__name__)
@@ -56,13 +56,25 @@ class ConversationManager:
                     CREATE TABLE IF NOT EXISTS {self.table_name} (
                         thread_id VARCHAR(255) PRIMARY KEY,
                         conversation JSON NOT NULL,
+                        summary TEXT NULL,
+                        summarized_count INT NOT NULL DEFAULT 0,
                         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                         updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
                     )
                 """)
+                # Tables created before rolling summaries lack these columns
+                cursor.execute(
+                    "SELECT COLUMN_NAME FROM information_schema.COLUMNS WHERE TABLE_SCHEMA=DATABASE() AND TABLE_NAME=%s",
+                    (self.table_name,)
+                )
+                columns = {row['COLUMN_NAME'] for row in cursor.fetchall()}
+                if 'summary' not in columns:
+                    cursor.execute(f"ALTER TABLE {self.table_name} ADD COLUMN summary TEXT NULL")
+                if 'summarized_count' not in columns:
+                    cursor.execute(f"ALTER TABLE {self.table_name} ADD COLUMN summarized_count INT NOT NULL DEFAULT 0")
             self.conn.commit()
             logger.info(f"Table '{self.table_name}' is ready for use")
-            logger.debug(f"Table schema: thread_id (PK), conversation (JSON), created_at, updated_at")
+            logger.debug(f"Table schema: thread_id (PK), conversation (JSON), summary, summarized_count, created_at, updated_at")
         except Exception as e:
             logger.error(f"Failed to create table '{self.table_name}': {e}", exc_info=True)
             raise
@@ -103,6 +115,86 @@ class ConversationManager:
             logger.error(f"Error retrieving messages for thread_id {thread_id}: {e}", exc_info=True)
             return []
 
+    def get_history(self, thread_id: str, limit: Optional[int] = None) -> Tuple[str, List[Dict]]:
+        """Retrieve the rolling summary and the messages it does not cover yet
+
+        Args:
+            thread_id: Unique identifier for the conversation thread
+            limit: Max unsummarized messages to return (default: self.memory_limit)
+
+        Returns:
+            (summary or "", last unsummarized messages)
+        """
+        if limit is None:
+            limit = self.memory_limit
+
+        try:
+            with self.conn.cursor() as cursor:
+                cursor.execute(
+                    f"SELECT conversation, summary, summarized_count FROM {self.table_name} WHERE thread_id=%s",
+                    (thread_id,)
+                )
+                row = cursor.fetchone()
+            if row is None:
+                logger.info(f"No conversation found for thread_id: {thread_id}")
+                return "", []
+
+            history = json.loads(row['conversation'])
+            summarized = min(row['summarized_count'] or 0, len(history))
+            messages = history[summarized:][-limit:]
+            logger.info(
+                f"Retrieved summary of {summarized} and {len(messages)} of {len(history) - summarized} "
+                f"unsummarized messages for thread_id: {thread_id}"
+            )
+            return row['summary'] or "", messages
+
+        except Exception as e:
+            logger.error(f"Error retrieving history for thread_id {thread_id}: {e}", exc_info=True)
+            return "", []
+
+    def get_summary_state(self, thread_id: str) -> Optional[Dict]:
+        """Full conversation with its summary bookkeeping, for the summarization job
+
+        Returns:
+            Dict with conversation, summary and summarized_count, or None if the thread doesn't exist
+        """
+        with self.conn.cursor() as cursor:
+            cursor.execute(
+                f"SELECT conversation, summary, summarized_count FROM {self.table_name} WHERE thread_id=%s",
+                (thread_id,)
+            )
+            row = cursor.fetchone()
+        if row is None:
+            return None
+        return {
+            "conversation": json.loads(row['conversation']),
+            "summary": row['summary'] or "",
+            "summarized_count": row['summarized_count'] or 0,
+        }
+
+    def update_summary(self, thread_id: str, summary: str, summarized_count: int) -> bool:
+        """Store a rolling summary covering the first `summarized_count` messages
+
+        Never moves backwards, so a slower concurrent job can't overwrite a newer summary.
+
+        Returns:
+            True if the summary was stored
+        """
+        try:
+            with self.conn.cursor() as cursor:
+                # updated_at keeps tracking the last message, not summarization
+                updated = cursor.execute(
+                    f"UPDATE {self.table_name} SET summary=%s, summarized_count=%s, updated_at=updated_at "
+                    f"WHERE thread_id=%s AND summarized_count < %s",
+                    (summary, summarized_count, thread_id, summarized_count)
+                )
+            self.conn.commit()
+            return bool(updated)
+        except Exception as e:
+            logger.error(f"Error updating summary for thread {thread_id}: {e}", exc_info=True)
+            self.conn.rollback()
+            return False
+
     def save_message(self, thread_id: str, role: str, content: str) -> None:
         """Save a message to the conversation thread
         
@@ -212,6 +304,26 @@ class ConversationManager:
             logger.error(f"Error getting thread count: {e}")
             return 0
 
+    def get_conversations_since(self, since: str) -> List[List[Dict]]:
+        """Full message lists of threads with activity since a timestamp
+
+        Args:
+            since: "%Y-%m-%d %H:%M:%S" timestamp compared against updated_at
+
+        Returns:
+            One list of message dictionaries per thread
+        """
+        try:
+            with self.conn.cursor() as cursor:
+                cursor.execute(
+                    f"SELECT conversation FROM {self.table_name} WHERE updated_at >= %s",
+                    (since,)
+                )
+                return [json.loads(row['conversation']) for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"Error retrieving conversations since {since}: {e}", exc_info=True)
+            return []
+
     def close(self) -> None:
         """Close database connection"""
         if self.conn and self.conn.open:
@@ -3,10 +3,12 @@ Core dependency management module.
 Implements Singleton pattern for heavy resources.
 """
 import logging
+import time
 from typing import Optional
 from src.config import Settings
 from src.core.database import DatabaseManager
 from src.core.llm import LLMManager
+from src.core.example_store import ExampleStore
 
 logger = logging.getLogger(__name__)
 
@@ -36,23 +38,56 @@ def get_llm_manager() -> LLMManager:
         _llm_manager = LLMManager(settings)
     return _llm_manager
 
+def peek_llm_manager() -> Optional[LLMManager]:
+    """
+    The global LLMManager if it has been created, without creating it.
+    """
+    return _llm_manager
+
+_example_store: Optional[ExampleStore] = None
+_example_store_retry_after = 0.0
+
+def get_example_store() -> Optional[ExampleStore]:
+    """
+    Get or create the global ExampleStore instance.
+    Returns None when the store is disabled or MySQL is unavailable.
+    """
+    global _example_store, _example_store_retry_after
+    if _example_store is None and time.time() >= _example_store_retry_after:
+        settings = Settings.from_env()
+        if not settings.example_store.enabled:
+            return None
+        try:
+            logger.info("Initializing global ExampleStore instance")
+            _example_store = ExampleStore(settings)
+        except Exception as e:
+            logger.error(f"Failed to initialize ExampleStore: {e}")
+            _example_store = None
+            _example_store_retry_after = time.time() + 60
+    return _example_store
+
 def reset_dependencies():
     """
     Reset global dependencies (useful for testing)
     """
-    global _db_manager, _llm_manager
+    global _db_manager, _llm_manager, _example_store
     _db_manager = None
     _llm_manager = None
+    _example_store = None
     logger.info("Global dependencies reset")
 
 _redis_client = None
+_redis_retry_after = 0.0
+REDIS_RETRY_INTERVAL = 30  # seconds to wait before retrying a failed connection
 
 def get_redis_client():
     """
     Get or create the global Redis client instance.
+    Returns None if Redis is unavailable; reconnection is retried at most
+    every REDIS_RETRY_INTERVAL seconds so hot paths don't block on it.
     """
-    global _redis_client
-    if _redis_client is None:
+    global _redis_client, _redis_retry_after
+    if _redis_client is None and time.time() >= _redis_retry_after:
         try:
             import redis
             logger.info("Initializing global Redis client instance")
@@ -63,14 +98,18 @@ def get_redis_client():
                     port=settings.redis.port,
                     db=settings.redis.db,
                     password=settings.redis.password,
-                    decode_responses=True
+                    decode_responses=True,
+                    socket_timeout=5,
+                    socket_connect_timeout=5
                 )
             else:
                 _redis_client = redis.Redis(
                     host=settings.redis.host,
                     port=settings.redis.port,
                     db=settings.redis.db,
-                    decode_responses=True
+                    decode_responses=True,
+                    socket_timeout=5,
+                    socket_connect_timeout=5
                 )
             # Test connection
             _redis_client.ping()
@@ -78,4 +117,23 @@ def get_redis_client():
         except Exception as e:
             logger.error(f"Failed to initialize Redis client: {e}")
             _redis_client = None
+            _redis_retry_after = time.time() + REDIS_RETRY_INTERVAL
     return _redis_client
+
+
+_rq_queue = None
+
+
+def get_rq_queue():
+    """
+    Get or create the global RQ queue on one shared Redis connection.
+    RQ stores pickled jobs, so it can't share the decoded get_redis_client().
+    """
+    global _rq_queue
+    if _rq_queue is None:
+        from redis import Redis
+        from rq import Queue
+        settings = Settings.from_env()
+        logger.info("Initializing global RQ queue")
+        _rq_queue = Queue(connection=Redis.from_url(settings.redis.url, socket_timeout=10, socket_connect_timeout=10))
+    return _rq_queue
@@ -0,0 +1,346 @@
+"""Verified question -> SQL example store with nearest-neighbor retrieval"""
+
+import hashlib
+import logging
+import math
+import re
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Optional
+
+import pymysql
+
+from src.config import Settings
+from src.tools.slots import (
+    CHAPTER_SIZE_PATTERN,
+    CHAPTER_SIZES,
+    chapter_size_from_phrase,
+    find_chapter_size,
+    normalize_question,
+)
+
+logger = logging.getLogger(__name__)
+
+_SQL_LITERAL_RE = re.compile(r"'((?:[^'\\]|\\.|'')*)'")
+_TEXT_SLOT_PATTERN = r"([\w][\w\s\-']{0,59}?)"
+_MAX_SLOT_WORDS = 4
+
+
+@dataclass
+class VerifiedExample:
+    """A question whose SQL executed successfully"""
+    question: str
+    sql_query: str
+    hits: int = 1
+
+
+@dataclass
+class QuestionTemplate:
+    """A verified question generalized over its slot values.
+
+    `pattern` full-matches normalized questions of the same shape; each capture
+    group fills the SQL placeholder at the same position in `slot_kinds`.
+    """
+    pattern: re.Pattern
+    slot_kinds: list[str]  # "chapter_size" or "text", in capture-group order
+    slot_ids: list[int]    # placeholder index for each capture group
+    sql_template: str
+    example: VerifiedExample
+
+    def fill(self, normalized_question: str) -> Optional[str]:
+        """Return the SQL for `normalized_question`, or None if it doesn't fit the template"""
+        match = self.pattern.fullmatch(normalized_question)
+        if not match:
+            return None
+        sql = self.sql_template
+        for group, kind, slot_id in zip(match.groups(), self.slot_kinds, self.slot_ids):
+            if kind == "chapter_size":
+                value = chapter_size_from_phrase(group)
+                if value is None:
+                    return None
+            else:
+                value = group.strip()
+                if not value or len(value.split()) > _MAX_SLOT_WORDS:
+                    return None
+            sql = sql.replace(_placeholder(slot_id), value.replace("'", "''"))
+        return sql
+
+
+def _placeholder(slot_id: int) -> str:
+    return f"__SLOT{slot_id}__"
+
+
+def build_template(example: VerifiedExample) -> QuestionTemplate:
+    """Generalize a verified example over the SQL literals that appear in its question
+
+    A literal becomes a slot when it is a chapter size named in the question
+    (via any synonym) or when its text (minus LIKE wildcards) occurs verbatim in
+    the question. Everything else stays fixed, so a question without slots only
+    matches itself.
+    """
+    normalized = normalize_question(example.question)
+    spans: list[tuple[int, int, str, int]] = []  # (start, end, kind, slot_id)
+    slot_by_value: dict[str, int] = {}
+    sql_parts = []
+    last = 0
+
+    def overlaps(start: int, end: int) -> bool:
+        return any(start < s_end and s_start < end for s_start, s_end, _, _ in spans)
+
+    for literal in _SQL_LITERAL_RE.finditer(example.sql_query):
+        content = literal.group(1)
+        core = content.strip("%")
+        core_key = core.lower()
+        prefix = content[: len(content) - len(content.lstrip("%"))]
+        suffix = content[len(content.rstrip("%")):]
+        replacement = None
+
+        if core_key in slot_by_value:
+            # Same value used twice in the SQL, reuse its slot
+            replacement = prefix + _placeholder(slot_by_value[core_key]) + suffix
+        elif content in CHAPTER_SIZES:
+            found = find_chapter_size(normalized)
+            if found and found[0] == content and not overlaps(found[1], found[2]):
+                slot_id = len(slot_by_value)
+                slot_by_value[core_key] = slot_id
+                spans.append((found[1], found[2], "chapter_size", slot_id))
+                replacement = _placeholder(slot_id)
+        elif core and len(core.split()) <= _MAX_SLOT_WORDS:
+            found = re.search(rf"(?<!\w){re.escape(core_key)}(?!\w)", normalized)
+            if found and not overlaps(found.start(), found.end()):
+                slot_id = len(slot_by_value)
+                slot_by_value[core_key] = slot_id
+                spans.append((found.start(), found.end(), "text", slot_id))
+                replacement = prefix + _placeholder(slot_id) + suffix
+
+        if replacement is not None:
+            sql_parts.append(example.sql_query[last:literal.start(1)])
+            sql_parts.append(replacement)
+            last = literal.end(1)
+
+    sql_parts.append(example.sql_query[last:])
+
+    pattern_parts = []
+    slot_kinds, slot_ids = [], []
+    position = 0
+    for start, end, kind, slot_id in sorted(spans):
+        pattern_parts.append(re.escape(normalized[position:start]))
+        pattern_parts.append(f"({CHAPTER_SIZE_PATTERN})" if kind == "chapter_size" else _TEXT_SLOT_PATTERN)
+        slot_kinds.append(kind)
+        slot_ids.append(slot_id)
+        position = end
+    pattern_parts.append(re.escape(normalized[position:]))
+
+    return QuestionTemplate(
+        pattern=re.compile("".join(pattern_parts), re.IGNORECASE),
+        slot_kinds=slot_kinds,
+        slot_ids=slot_ids,
+        sql_template="".join(sql_parts),
+        example=example,
+    )
+
+
+class ExampleIndex:
+    """In-memory TF-IDF cosine index over normalized questions (unigrams + bigrams)"""
+
+    def __init__(self):
+        self._vectors: list[dict[str, float]] = []
+        self._examples: list[VerifiedExample] = []
+        self._idf: dict[str, float] = {}
+        self._document_frequency: Counter = Counter()
+
+    @staticmethod
+    def _terms(text: str) -> list[str]:
+        words = normalize_question(text).split()
+        return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+    def _vectorize(self, text: str) -> dict[str, float]:
+        counts = Counter(self._terms(text))
+        vector = {t: c * self._idf.get(t, 0.0) for t, c in counts.items()}
+        norm = math.sqrt(sum(v * v for v in vector.values()))
+        return {t: v / norm for t, v in vector.items()} if norm else {}
+
+    @staticmethod
+    def _idf_weight(total: int, df: int) -> float:
+        return math.log((1 + total) / (1 + df)) + 1
+
+    def build(self, examples: list[VerifiedExample]) -> None:
+        document_frequency = Counter()
+        for example in examples:
+            document_frequency.update(set(self._terms(example.question)))
+        total = len(examples)
+        self._document_frequency = document_frequency
+        self._idf = {t: self._idf_weight(total, df) for t, df in document_frequency.items()}
+        self._examples = list(examples)
+        self._vectors = [self._vectorize(e.question) for e in examples]
+
+    def add(self, example: VerifiedExample) -> None:
+        """Index one new example without re-vectorizing the others
+
+        Only the new example's terms are re-weighted; build() re-weights everything.
+        """
+        terms = set(self._terms(example.question))
+        self._document_frequency.update(terms)
+        total = len(self._examples) + 1
+        for term in terms:
+            self._idf[term] = self._idf_weight(total, self._document_frequency[term])
+        self._examples.append(example)
+        self._vectors.append(self._vectorize(example.question))
+
+    def search(self, question: str, k: int = 3, min_score: float = 0.0) -> list[tuple[float, VerifiedExample]]:
+        query = self._vectorize(question)
+        if not query:
+            return []
+        scored = []
+        for vector, example in zip(self._vectors, self._examples):
+            score = sum(weight * vector.get(term, 0.0) for term, weight in query.items())
+            if score >= min_score:
+                scored.append((score, example))
+        scored.sort(key=lambda item: (item[0], item[1].hits), reverse=True)
+        return scored[:k]
+
+
+class ExampleStore:
+    """Persists verified question/SQL pairs in MySQL and serves them from memory"""
+
+    def __init__(self, settings: Settings):
+        """Initialize example store
+
+        Args:
+            settings: Application settings containing database and example-store configuration
+        """
+        logger.info("Initializing ExampleStore")
+        self.settings = settings
+        self.config = settings.example_store
+        self.conn = None
+        self.table_name = "verified_sql_examples"
+        self._lock = threading.RLock()
+        self._examples: dict[str, VerifiedExample] = {}
+        self._templates: dict[str, QuestionTemplate] = {}  # question hash -> template, most used first
+        self._index = ExampleIndex()
+        self._loaded_at = 0.0
+        self._connect()
+        self._ensure_table_exists()
+        self.reload()
+        logger.info(f"ExampleStore initialized with {len(self._examples)} examples")
+
+    def _connect(self) -> None:
+        """Establish MySQL connection"""
+        self.conn = pymysql.connect(
+            host=self.settings.database.host,
+            user=self.settings.database.user,
+            password=self.settings.database.password,
+            database=self.settings.database.db_name,
+            port=self.settings.database.port,
+            charset='utf8mb4',
+            cursorclass=pymysql.cursors.DictCursor,
+            autocommit=True,
+        )
+
+    def _ensure_table_exists(self) -> None:
+        """Create verified_sql_examples table if it doesn't exist"""
+        with self.conn.cursor() as cursor:
+            cursor.execute(f"""
+                CREATE TABLE IF NOT EXISTS {self.table_name} (
+                    question_hash CHAR(64) PRIMARY KEY,
+                    question TEXT NOT NULL,
+                    sql_query TEXT NOT NULL,
+                    hits INT NOT NULL DEFAULT 1,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+                )
+            """)
+
+    @staticmethod
+    def _hash(question: str) -> str:
+        return hashlib.sha256(normalize_question(question).encode("utf-8")).hexdigest()
+
+    def _rebuild(self) -> None:
+        ranked = sorted(self._examples.items(), key=lambda item: item[1].hits, reverse=True)
+        self._index.build([example for _, example in ranked])
+        self._templates = {question_hash: build_template(example) for question_hash, example in ranked}
+
+    def reload(self) -> None:
+        """Load the most-used examples from MySQL and rebuild the index"""
+        with self._lock:
+            try:
+                self.conn.ping(reconnect=True)
+                with self.conn.cursor() as cursor:
+                    cursor.execute(
+                        f"SELECT question_hash, question, sql_query, hits FROM {self.table_name} "
+                        f"ORDER BY hits DESC, updated_at DESC LIMIT %s",
+                        (self.config.max_examples,)
+                    )
+                    rows = cursor.fetchall()
+                self._examples = {
+                    row["question_hash"]: VerifiedExample(row["question"], row["sql_query"], row["hits"])
+                    for row in rows
+                }
+                self._rebuild()
+                self._loaded_at = time.time()
+                logger.debug(f"Loaded {len(self._examples)} verified SQL examples")
+            except Exception as e:
+                logger.error(f"Failed to load verified SQL examples: {e}", exc_info=True)
+
+    def _maybe_reload(self) -> None:
+        # Pick up examples captured by other processes (API / workers)
+        if time.time() - self._loaded_at > self.config.refresh_interval:
+            self.reload()
+
+    def add_example(self, question: str, sql_query: str) -> None:
+        """Record a question whose SQL executed successfully
+
+        Updates the in-memory index and templates for this example only; the
+        periodic reload re-ranks and re-weights the whole set.
+        """
+        question_hash = self._hash(question)
+        with self._lock:
+            try:
+                self.conn.ping(reconnect=True)
+                with self.conn.cursor() as cursor:
+                    cursor.execute(
+                        f"INSERT INTO {self.table_name} (question_hash, question, sql_query) VALUES (%s, %s, %s) "
+                        f"ON DUPLICATE KEY UPDATE sql_query=VALUES(sql_query), hits=hits+1",
+                        (question_hash, question, sql_query)
+                    )
+                example = self._examples.get(question_hash)
+                if example:
+                    # Same normalized question, so its index vector is unchanged
+                    example.sql_query = sql_query
+                    example.hits += 1
+                else:
+                    example = self._examples[question_hash] = VerifiedExample(question, sql_query)
+                    self._index.add(example)
+                self._templates[question_hash] = build_template(example)
+                logger.info(f"Captured verified SQL example (hits={example.hits}): {question[:80]}")
+            except Exception as e:
+                logger.error(f"Failed to save verified SQL example: {e}", exc_info=True)
+
+    def search(self, question: str, k: Optional[int] = None) -> list[VerifiedExample]:
+        """Top-k most similar verified examples for few-shot prompting"""
+        with self._lock:
+            self._maybe_reload()
+            results = self._index.search(
+                question, k or self.config.top_k, self.config.min_similarity
+            )
+        return [example for _, example in results]
+
+    def match_template(self, question: str) -> Optional[str]:
+        """SQL for an exact template match (same question shape, new slot values), else None"""
+        normalized = normalize_question(question)
+        with self._lock:
+            self._maybe_reload()
+            for template in self._templates.values():
+                sql = template.fill(normalized)
+                if sql:
+                    logger.info(f"Template match on verified example: {template.example.question[:80]}")
+                    return sql
+        return None
+
+    def close(self) -> None:
+        """Close database connection"""
+        if self.conn and self.conn.open:
+            self.conn.close()
+            logger.info("Closed example store database connection")
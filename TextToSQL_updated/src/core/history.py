@@ -0,0 +1,87 @@
+"""Bounded conversation history for history-aware prompts
+
+Older turns of a thread are folded into a rolling summary by an RQ job after
+each turn (`summarize_thread`); prompts carry that summary plus the most recent
+messages verbatim as compact JSON, trimmed to a token budget (`format_history`).
+"""
+
+import json
+import logging
+from typing import Optional
+
+from src.config.settings import ConversationConfig
+from src.core.llm_calls import get_llm_caller
+from src.prompts.system_prompts import get_conversation_summary_prompt
+from src.utils import metrics
+from src.utils.tokens import count_tokens
+
+logger = logging.getLogger(__name__)
+
+HISTORY_TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000)
+
+_MIN_CLIPPED_CHARS = 80
+
+
+def format_history(summary: str, messages: list[dict], token_budget: int) -> tuple[str, int]:
+    """Compact JSON history block within `token_budget` tokens
+
+    The oldest verbatim messages are dropped first; the last exchange is kept
+    and, if it alone is over budget, its longest message is clipped.
+
+    Returns:
+        (JSON text, tokens)
+    """
+    payload = {"summary": summary} if summary else {}
+    recent = [{"role": m["role"], "content": m["content"]} for m in messages]
+    while True:
+        payload["recent"] = recent
+        text = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+        tokens = count_tokens(text)
+        if tokens <= token_budget or not recent:
+            return text, tokens
+        if len(recent) > 2:
+            recent = recent[1:]
+            continue
+        longest = max(range(len(recent)), key=lambda i: len(recent[i]["content"]))
+        content = recent[longest]["content"]
+        # ~4 characters per token; the loop re-checks the real count
+        keep = max(_MIN_CLIPPED_CHARS, len(content) - (tokens - token_budget) * 4 - 1)
+        if keep >= len(content) - 1:
+            return text, tokens
+        recent = [*recent]
+        recent[longest] = {**recent[longest], "content": content[:keep] + "…"}
+
+
+def summarize_thread(conversation_manager, thread_id: str, llm, config: ConversationConfig) -> Optional[str]:
+    """Fold the messages older than the last `recent_turns` turns into the thread's summary
+
+    Only messages added since the previous summary are sent, together with that
+    summary, so each run costs one small LLM call.
+
+    Returns:
+        "summarized", "up_to_date" or None if the thread doesn't exist
+    """
+    state = conversation_manager.get_summary_state(thread_id)
+    if state is None:
+        return None
+
+    conversation = state["conversation"]
+    fold_until = len(conversation) - config.recent_turns * 2
+    new_messages = conversation[state["summarized_count"]:fold_until]
+    if not new_messages:
+        return "up_to_date"
+
+    new_text = json.dumps(
+        [{"role": m["role"], "content": m["content"]} for m in new_messages],
+        ensure_ascii=False, separators=(",", ":"),
+    )
+    llm_caller = get_llm_caller()
+    response = llm_caller.invoke("conversation_summary", llm_caller.limited(llm, "conversation_summary"), [
+        {"role": "system", "content": get_conversation_summary_prompt(config.summary_words)},
+        {"role": "user", "content": f"CURRENT SUMMARY:\n{state['summary'] or '(none)'}\n\nNEW MESSAGES:\n{new_text}"},
+    ])
+    summary = response.content.strip()
+    if conversation_manager.update_summary(thread_id, summary, fold_until):
+        metrics.observe("conversation_summary_tokens", count_tokens(summary), HISTORY_TOKEN_BUCKETS)
+        logger.info(f"Summarized {len(new_messages)} messages of thread {thread_id} ({fold_until} total)")
+    return "summarized"
@@ -1,6 +1,7 @@
 """LLM management module"""
 
 import logging
+import httpx
 from langchain_openai import ChatOpenAI
 from src.config import Settings
 import os
@@ -17,9 +18,29 @@ class LLMManager:
         self.settings = settings
         self.model: ChatOpenAI = None
         self.model_without_reasoning: ChatOpenAI = None
+        self.models: dict[str, ChatOpenAI] = {}
+        self.backend_pool = None
+        self._client_kwargs = self._backend_client_kwargs()
         self._initialize()
+        self._initialize_registry()
         logger.info("LLMManager initialized successfully")
 
+    def _backend_client_kwargs(self) -> dict:
+        """ChatOpenAI arguments routing every model through the LLM_BACKENDS failover pool"""
+        if not self.settings.llm_backends.backends:
+            return {}
+        # Imported here: llm_backends -> metrics -> dependencies -> this module
+        from src.core.llm_backends import AsyncFailoverTransport, BackendPool, FailoverTransport
+
+        self.backend_pool = BackendPool(self.settings.llm_backends)
+        logger.info(f"LLM backends: {', '.join(f'{b.name}={b.base_url}' for b in self.backend_pool.backends)}")
+        return {
+            # Each backend's key is set by the transport on every request
+            "base_url": self.backend_pool.primary.base_url,
+            "http_client": httpx.Client(transport=FailoverTransport(self.backend_pool)),
+            "http_async_client": httpx.AsyncClient(transport=AsyncFailoverTransport(self.backend_pool)),
+        }
+
     def _initialize(self) -> None:
         """Initialize the LLM model"""
         try:
@@ -34,7 +55,7 @@ class LLMManager:
                 max_retries=self.settings.llm.max_retries,
                 api_key=self.settings.llm.api_key,
                 reasoning_effort=self.settings.llm.reasoning_effort,
-            
+                **self._client_kwargs,
             )
             logger.critical(f"Successfully initialized LLM: {self.settings.llm.model}")
             logger.critical(f"LLM reasoning effort: {self.settings.llm.reasoning_effort}")
@@ -50,6 +71,7 @@ class LLMManager:
                     max_retries=self.settings.llm_without_reasoning.max_retries,
                     api_key=self.settings.llm_without_reasoning.api_key,
                     reasoning_effort=self.settings.llm_without_reasoning.reasoning_effort,
+                    **self._client_kwargs,
                 )
                 logger.critical(f"Successfully initialized LLM without reasoning: {self.settings.llm_without_reasoning.model}")
                 logger.critical(f"LLM without reasoning reasoning effort: {self.settings.llm_without_reasoning.reasoning_effort}")
@@ -58,10 +80,43 @@ class LLMManager:
             logger.error(f"Failed to initialize LLM: {e}", exc_info=True)
             raise
 
+    def _initialize_registry(self) -> None:
+        """Create the routing registry's models, reusing the two clients above where they match"""
+        existing = {
+            (self.settings.llm.model, self.settings.llm.reasoning_effort): self.model,
+        }
+        if self.model_without_reasoning is not None:
+            existing[(self.settings.llm_without_reasoning.model, self.settings.llm_without_reasoning.reasoning_effort)] = self.model_without_reasoning
+        base = self.settings.llm_without_reasoning or self.settings.llm
+        for profile in self.settings.model_router.models:
+            model = existing.get((profile.model, profile.reasoning_effort))
+            if model is None:
+                logger.info(f"Initializing routed LLM {profile.name}: {profile.model} (reasoning effort {profile.reasoning_effort})")
+                model = ChatOpenAI(
+                    model=profile.model,
+                    temperature=base.temperature,
+                    max_tokens=base.max_tokens,
+                    timeout=base.timeout,
+                    max_retries=base.max_retries,
+                    api_key=base.api_key,
+                    reasoning_effort=profile.reasoning_effort,
+                    **self._client_kwargs,
+                )
+                existing[(profile.model, profile.reasoning_effort)] = model
+            self.models[profile.name] = model
+
     def get_model(self) -> ChatOpenAI:
         """Get the LLM model instance"""
         return self.model
 
     def get_model_without_reasoning(self) -> ChatOpenAI:
         """Get the LLM model without reasoning instance"""
-        return self.model_without_reasoning
\ No newline at end of file
+        return self.model_without_reasoning
+
+    def get_models(self) -> dict[str, ChatOpenAI]:
+        """Get the routing registry's models by profile name"""
+        return self.models
+
+    def backend_health(self) -> dict:
+        """Health of the LLM_BACKENDS pool, empty when a single endpoint is used"""
+        return self.backend_pool.snapshot() if self.backend_pool else {}
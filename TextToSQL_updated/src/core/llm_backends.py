@@ -0,0 +1,235 @@
+"""Health-scored failover across interchangeable OpenAI-compatible endpoints
+
+The pool plugs into ChatOpenAI as an httpx transport, so every call (tool
+binding, structured output, streaming, per-node copies) goes through it
+unchanged. Each request is sent to the healthiest backend, scored by its
+moving-average latency and error rate. On a connection error, timeout or a
+retryable status (429/5xx), the request fails over to the next backend before
+the SDK sees an error. After `failure_threshold` consecutive failures, a
+backend's circuit opens for `open_seconds`. Then a single probe request is let
+through: success closes the circuit, failure reopens it.
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import httpx
+
+from src.config.settings import LLMBackend, LLMBackendsConfig
+from src.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS = frozenset({408, 429, 500, 502, 503, 504})
+HEALTH_ALPHA = 0.2           # Weight of the newest request in the moving averages
+DEFAULT_LATENCY = 1.0        # Seconds assumed for a backend without successful requests yet
+LATENCY_BUCKETS = (0.25, 0.5, 1, 2, 4, 8, 16, 32)
+
+# Same pool sizes as the OpenAI SDK's own client
+CONNECTION_LIMITS = httpx.Limits(max_connections=1000, max_keepalive_connections=100)
+
+
+@dataclass
+class BackendHealth:
+    """Rolling health of one backend"""
+    latency: Optional[float] = None   # Seconds to response headers (successful requests)
+    error_rate: float = 0.0
+    last_failure: float = 0.0
+    consecutive_failures: int = 0
+    open_until: float = 0.0           # Circuit open until this time (0: closed)
+    probing: bool = False             # A half-open probe is in flight
+
+
+class BackendPool:
+    """Orders backends by health and tracks each request's outcome"""
+
+    def __init__(self, config: LLMBackendsConfig):
+        self.config = config
+        self.backends = config.backends
+        self.health = {b.name: BackendHealth() for b in self.backends}
+        self._lock = threading.Lock()
+
+    @property
+    def primary(self) -> LLMBackend:
+        """The backend ChatOpenAI is configured with; requests are rewritten from its URL"""
+        return self.backends[0]
+
+    def score(self, backend: LLMBackend) -> float:
+        """Expected cost of sending a request to `backend`; lower is better
+
+        The error rate halves every `open_seconds` without new failures, so a
+        recovered backend wins traffic back even while others stay healthy.
+        """
+        health = self.health[backend.name]
+        latency = DEFAULT_LATENCY if health.latency is None else health.latency
+        error_rate = health.error_rate * 0.5 ** ((time.time() - health.last_failure) / self.config.open_seconds)
+        return latency * (1 + self.config.error_penalty * error_rate)
+
+    def candidates(self) -> list[LLMBackend]:
+        """Backends to try for one request, best first
+
+        Closed circuits are ordered by score. An open circuit whose cooldown has
+        passed gets one probe request, tried first. When every circuit is open,
+        they are all tried anyway, soonest to reopen first.
+        """
+        now = time.time()
+        with self._lock:
+            closed, probes, still_open = [], [], []
+            for backend in self.backends:
+                health = self.health[backend.name]
+                if not health.open_until:
+                    closed.append(backend)
+                elif health.open_until <= now and not health.probing:
+                    health.probing = True
+                    probes.append(backend)
+                else:
+                    still_open.append(backend)
+            closed.sort(key=self.score)
+            if closed or probes:
+                return probes + closed
+            return sorted(still_open, key=lambda b: self.health[b.name].open_until)
+
+    def record(self, backend: LLMBackend, elapsed: float, ok: bool) -> None:
+        """Fold one request's outcome into the backend's health, opening or closing its circuit"""
+        with self._lock:
+            health = self.health[backend.name]
+            was_probe, health.probing = health.probing, False
+            if ok:
+                health.latency = elapsed if health.latency is None else (
+                    HEALTH_ALPHA * elapsed + (1 - HEALTH_ALPHA) * health.latency
+                )
+                health.error_rate *= 1 - HEALTH_ALPHA
+                health.consecutive_failures = 0
+                if health.open_until:
+                    health.open_until = 0.0
+                    logger.warning(f"LLM backend {backend.name} recovered, circuit closed")
+                    metrics.increment("llm_backend_circuit", backend=backend.name, state="closed")
+            else:
+                health.error_rate = HEALTH_ALPHA + (1 - HEALTH_ALPHA) * health.error_rate
+                health.last_failure = time.time()
+                health.consecutive_failures += 1
+                if was_probe or health.consecutive_failures >= self.config.failure_threshold:
+                    if not health.open_until or was_probe:
+                        logger.warning(
+                            f"LLM backend {backend.name} circuit open for {self.config.open_seconds:.0f}s "
+                            f"after {health.consecutive_failures} consecutive failures"
+                        )
+                        metrics.increment("llm_backend_circuit", backend=backend.name, state="open")
+                    health.open_until = time.time() + self.config.open_seconds
+        outcome = "ok" if ok else "failed"
+        metrics.increment("llm_backend_requests", backend=backend.name, outcome=outcome)
+        metrics.observe("llm_backend_seconds", elapsed, LATENCY_BUCKETS, backend=backend.name, outcome=outcome)
+
+    def release(self, backends: list[LLMBackend]) -> None:
+        """End half-open probes among `backends` that got no outcome (cancelled, unexpected error, never sent)"""
+        with self._lock:
+            for backend in backends:
+                self.health[backend.name].probing = False
+
+    def snapshot(self) -> dict:
+        """Current health per backend (for /health)"""
+        now = time.time()
+        with self._lock:
+            return {
+                b.name: {
+                    "score": round(self.score(b), 3),
+                    "latency": self.health[b.name].latency,
+                    "error_rate": round(self.health[b.name].error_rate, 3),
+                    "circuit": "open" if self.health[b.name].open_until > now else (
+                        "half_open" if self.health[b.name].open_until else "closed"
+                    ),
+                }
+                for b in self.backends
+            }
+
+    def request_for(self, request: httpx.Request, backend: LLMBackend) -> httpx.Request:
+        """`request` (addressed to the primary backend) re-addressed to `backend`"""
+        url = str(request.url)
+        path = url[len(self.primary.base_url):] if url.startswith(self.primary.base_url) else request.url.raw_path.decode()
+        headers = request.headers.copy()
+        headers.pop("host", None)
+        headers["authorization"] = f"Bearer {backend.api_key}"
+        return httpx.Request(
+            request.method, backend.base_url + path,
+            headers=headers, content=request.content, extensions=request.extensions,
+        )
+
+
+def _failed_over(backend: LLMBackend, reason: str) -> None:
+    logger.warning(f"LLM backend {backend.name} failed ({reason}), failing over")
+    metrics.increment("llm_backend_failovers", backend=backend.name)
+
+
+class FailoverTransport(httpx.BaseTransport):
+    """Sync httpx transport sending each request to the pool's healthiest backend"""
+
+    def __init__(self, pool: BackendPool, transport: Optional[httpx.BaseTransport] = None):
+        self.pool = pool
+        self.transport = transport or httpx.HTTPTransport(limits=CONNECTION_LIMITS)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        request.read()
+        candidates = self.pool.candidates()
+        try:
+            for i, backend in enumerate(candidates):
+                last = i == len(candidates) - 1
+                start_time = time.time()
+                try:
+                    response = self.transport.handle_request(self.pool.request_for(request, backend))
+                except httpx.TransportError as e:
+                    self.pool.record(backend, time.time() - start_time, ok=False)
+                    if last:
+                        raise
+                    _failed_over(backend, repr(e))
+                    continue
+                ok = response.status_code not in RETRYABLE_STATUS
+                self.pool.record(backend, time.time() - start_time, ok=ok)
+                if ok or last:
+                    return response
+                response.close()
+                _failed_over(backend, f"HTTP {response.status_code}")
+        finally:
+            self.pool.release(candidates)
+        raise httpx.ConnectError("No LLM backend configured")
+
+    def close(self) -> None:
+        self.transport.close()
+
+
+class AsyncFailoverTransport(httpx.AsyncBaseTransport):
+    """Async counterpart of FailoverTransport, sharing the same pool health"""
+
+    def __init__(self, pool: BackendPool, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.pool = pool
+        self.transport = transport or httpx.AsyncHTTPTransport(limits=CONNECTION_LIMITS)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await request.aread()
+        candidates = self.pool.candidates()
+        try:
+            for i, backend in enumerate(candidates):
+                last = i == len(candidates) - 1
+                start_time = time.time()
+                try:
+                    response = await self.transport.handle_async_request(self.pool.request_for(request, backend))
+                except httpx.TransportError as e:
+                    self.pool.record(backend, time.time() - start_time, ok=False)
+                    if last:
+                        raise
+                    _failed_over(backend, repr(e))
+                    continue
+                ok = response.status_code not in RETRYABLE_STATUS
+                self.pool.record(backend, time.time() - start_time, ok=ok)
+                if ok or last:
+                    return response
+                await response.aclose()
+                _failed_over(backend, f"HTTP {response.status_code}")
+        finally:
+            self.pool.release(candidates)
+        raise httpx.ConnectError("No LLM backend configured")
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
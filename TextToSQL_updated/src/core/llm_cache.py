@@ -0,0 +1,141 @@
+"""Exact-match cache of LLM responses per node
+
+A response is stored under a hash of (model, node, rendered messages), so a
+repeated prompt, e.g. a first-turn question classified before, is answered
+from Redis instead of the provider. Only nodes listed in LLM_CACHE_NODES are
+cached, each with its own TTL and entry bound. A per-node sorted set of last
+access times evicts the least recently used entries beyond the bound.
+
+AI messages (including tool calls) and pydantic structured outputs are
+cacheable; anything else is passed through uncached.
+"""
+
+import hashlib
+import importlib
+import json
+import logging
+import time
+from typing import Any, Optional
+
+from langchain_core.messages import AIMessage, BaseMessage, message_to_dict, messages_from_dict
+from pydantic import BaseModel
+
+from src.config.settings import LLMCacheConfig
+from src.core.dependencies import get_redis_client
+from src.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+ENTRY_KEY = "llm_cache:{node}:{digest}"
+LRU_KEY = "llm_cache:lru:{node}"  # Sorted set: digest -> last access time
+
+
+def _model_id(runnable) -> str:
+    """Model name and reasoning effort behind a (possibly bound or structured) chat model"""
+    current = runnable
+    for _ in range(5):
+        name = getattr(current, "model_name", None)
+        if isinstance(name, str):
+            return f"{name}/{getattr(current, 'reasoning_effort', None)}"
+        current = getattr(current, "bound", None) or getattr(current, "first", None)
+        if current is None:
+            break
+    return type(runnable).__name__
+
+
+def _render(message) -> dict:
+    """Stable form of a prompt message (tool call ids are random, so they are left out)"""
+    if isinstance(message, dict):
+        return {"role": message.get("role"), "content": message.get("content")}
+    if isinstance(message, BaseMessage):
+        rendered = {"role": message.type, "content": message.content}
+        tool_calls = getattr(message, "tool_calls", None)
+        if tool_calls:
+            rendered["tool_calls"] = [{"name": c.get("name"), "args": c.get("args")} for c in tool_calls]
+        return rendered
+    return {"content": str(message)}
+
+
+def _serialize(response) -> Optional[str]:
+    if isinstance(response, AIMessage):
+        return json.dumps({"message": message_to_dict(response)})
+    if isinstance(response, BaseModel):
+        cls = type(response)
+        return json.dumps({"model": f"{cls.__module__}:{cls.__qualname__}", "data": response.model_dump()})
+    return None
+
+
+def _deserialize(payload: str) -> Any:
+    data = json.loads(payload)
+    if "message" in data:
+        message = messages_from_dict([data["message"]])[0]
+        # LangGraph replaces state messages with the same id; a cached reply is a new message
+        message.id = None
+        return message
+    module, _, name = data["model"].partition(":")
+    return getattr(importlib.import_module(module), name).model_validate(data["data"])
+
+
+class LLMCache:
+    """Redis-backed exact-match response cache for the nodes configured in LLMCacheConfig"""
+
+    def __init__(self, config: LLMCacheConfig):
+        self.config = config
+
+    def key(self, node: str, runnable, messages) -> Optional[str]:
+        """Cache digest of a call, or None if the node isn't cached"""
+        if not self.config.enabled or node not in self.config.nodes:
+            return None
+        rendered = messages if isinstance(messages, str) else [_render(m) for m in messages]
+        payload = json.dumps(
+            {"model": _model_id(runnable), "node": node, "messages": rendered},
+            ensure_ascii=False, sort_keys=True, default=str,
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, node: str, digest: Optional[str]) -> Any:
+        """Cached response, or None on a miss"""
+        if digest is None:
+            return None
+        redis_client = get_redis_client()
+        if not redis_client:
+            return None
+        try:
+            payload = redis_client.get(ENTRY_KEY.format(node=node, digest=digest))
+            if payload is None:
+                metrics.increment("llm_cache", node=node, outcome="miss")
+                return None
+            redis_client.zadd(LRU_KEY.format(node=node), {digest: time.time()})
+            response = _deserialize(payload)
+        except Exception as e:
+            logger.warning(f"LLM cache read failed for {node}: {e}")
+            metrics.increment("llm_cache", node=node, outcome="error")
+            return None
+        logger.info(f"[{node}] LLM cache hit")
+        metrics.increment("llm_cache", node=node, outcome="hit")
+        return response
+
+    def put(self, node: str, digest: Optional[str], response) -> None:
+        """Store a response, evicting the node's least recently used entries beyond its bound"""
+        if digest is None:
+            return
+        payload = _serialize(response)
+        redis_client = get_redis_client()
+        if payload is None or not redis_client:
+            return
+        bounds = self.config.nodes[node]
+        lru_key = LRU_KEY.format(node=node)
+        try:
+            pipe = redis_client.pipeline()
+            pipe.set(ENTRY_KEY.format(node=node, digest=digest), payload, ex=bounds.ttl)
+            pipe.zadd(lru_key, {digest: time.time()})
+            # Entries that expired by TTL only leave the sorted set once they age out here
+            pipe.zremrangebyscore(lru_key, 0, time.time() - bounds.ttl)
+            pipe.zcard(lru_key)
+            size = pipe.execute()[-1]
+            if size > bounds.max_entries:
+                evicted = [d for d, _ in redis_client.zpopmin(lru_key, size - bounds.max_entries)]
+                redis_client.delete(*(ENTRY_KEY.format(node=node, digest=d) for d in evicted))
+                metrics.increment("llm_cache_evictions", len(evicted), node=node)
+        except Exception as e:
+            logger.warning(f"LLM cache write failed for {node}: {e}")
@@ -0,0 +1,310 @@
+"""Deadlines, output caps and hedged requests for the agent's LLM calls
+
+Every AgentNodes LLM call goes through `LLMCaller.invoke` / `ainvoke` with
+the node's name. The caller applies that node's `max_tokens` and per-request
+timeout, abandons the call once the node's deadline passes, and optionally
+hedges: if the call has not returned after the node's recent p95 latency, a
+duplicate request is fired and whichever finishes first wins. Sync losers run
+to completion in the background (the provider call can't be interrupted);
+async losers are cancelled. Before a request is sent, its estimated tokens
+are taken from the shared provider rate limits (src/core/rate_limits.py).
+Nodes configured in LLM_CACHE_NODES are answered from the exact-match
+response cache (src/core/llm_cache.py) when the same prompt was seen before.
+`stream_until` serves label-style outputs, closing the stream once the
+answer is decided.
+"""
+
+import asyncio
+import contextvars
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Optional
+
+from langchain_core.messages import AIMessage
+
+from src.config import Settings
+from src.config.settings import LLMCallLimits, LLMCallsConfig
+from src.core.llm_cache import LLMCache
+from src.core.rate_limits import RateLimiter
+from src.utils import metrics
+from src.utils.tokens import count_tokens
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.5, 1, 2, 4, 8, 16, 32)
+LATENCY_WINDOW = 200  # Recent latencies per node used for the hedge delay
+
+# Sized for concurrent API requests; a saturated pool would eat into node deadlines
+_executor = ThreadPoolExecutor(max_workers=64, thread_name_prefix="llm-call")
+
+
+class LLMTimeoutError(TimeoutError):
+    """An LLM call outlived its node's deadline"""
+
+
+def _prompt_tokens(messages) -> int:
+    """Token estimate of a prompt given as a string or a list of dict / LangChain messages"""
+    if isinstance(messages, str):
+        return count_tokens(messages)
+    total = 0
+    for message in messages:
+        content = message.get("content", "") if isinstance(message, dict) else getattr(message, "content", message)
+        total += 4 + count_tokens(content if isinstance(content, str) else str(content))
+    return total
+
+
+def _reported_tokens(response) -> Optional[int]:
+    usage = getattr(response, "usage_metadata", None)
+    return usage.get("total_tokens") if usage else None
+
+
+class LLMCaller:
+    """Runs LLM calls under per-node limits, recording latency and hedge statistics"""
+
+    def __init__(self, config: LLMCallsConfig, rate_limiter: Optional[RateLimiter] = None,
+                 cache: Optional[LLMCache] = None):
+        self.config = config
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+        self._latencies: dict[str, deque] = {}
+        self._limited: dict[tuple[int, str], tuple] = {}  # (id(llm), node) -> (llm, limited copy)
+        self._lock = threading.Lock()
+
+    def limits(self, node: str) -> LLMCallLimits:
+        return self.config.for_node(node)
+
+    def limited(self, llm, node: str):
+        """`llm` with the node's max_tokens and request timeout applied
+
+        Works on ChatOpenAI-style models (copied, sharing their HTTP clients);
+        other runnables are returned unchanged.
+        """
+        if not hasattr(llm, "model_copy") or "max_tokens" not in getattr(type(llm), "model_fields", {}):
+            return llm
+        key = (id(llm), node)
+        with self._lock:
+            cached = self._limited.get(key)
+            # Holding `llm` keeps its id from being reused by another model
+            if cached is None or cached[0] is not llm:
+                limits = self.limits(node)
+                cached = (llm, llm.model_copy(update={
+                    "max_tokens": limits.max_tokens or llm.max_tokens,
+                    "model_kwargs": {**llm.model_kwargs, "timeout": limits.timeout},
+                }))
+                self._limited[key] = cached
+            return cached[1]
+
+    def estimate_tokens(self, node: str, messages) -> int:
+        """Prompt tokens plus the node's output cap (or the configured output estimate)"""
+        completion = self.limits(node).max_tokens
+        if completion is None:
+            completion = self.rate_limiter.config.completion_tokens if self.rate_limiter else 0
+        return _prompt_tokens(messages) + completion
+
+    def admit(self, node: str, messages) -> int:
+        """Wait for the shared rate limits to admit one call; returns its token estimate"""
+        tokens = self.estimate_tokens(node, messages)
+        if self.rate_limiter:
+            self.rate_limiter.acquire(tokens)
+        return tokens
+
+    async def aadmit(self, node: str, messages) -> int:
+        tokens = self.estimate_tokens(node, messages)
+        if self.rate_limiter:
+            await self.rate_limiter.aacquire(tokens)
+        return tokens
+
+    def settle(self, estimated: int, response) -> None:
+        """Correct the rate limits with the tokens the provider reported for a call"""
+        actual = _reported_tokens(response)
+        if self.rate_limiter and actual is not None:
+            self.rate_limiter.settle(estimated, actual)
+
+    def _cached(self, node: str, runnable, messages) -> tuple[Optional[str], object]:
+        """(cache digest, cached response or None)"""
+        if self.cache is None:
+            return None, None
+        digest = self.cache.key(node, runnable, messages)
+        return digest, self.cache.get(node, digest)
+
+    def _may_hedge(self, node: str, tokens: int) -> bool:
+        if self.rate_limiter is None or self.rate_limiter.try_acquire(tokens):
+            return True
+        metrics.increment("llm_hedges", node=node, outcome="rate_limited")
+        return False
+
+    def hedge_delay(self, node: str) -> Optional[float]:
+        """Seconds after which a duplicate request is fired, or None if not hedging"""
+        if not self.config.hedging:
+            return None
+        latencies = sorted(self._latencies.get(node, ()))
+        if len(latencies) < self.config.hedge_min_samples:
+            return None
+        delay = latencies[int(self.config.hedge_quantile * (len(latencies) - 1))]
+        return delay if delay < self.limits(node).timeout else None
+
+    def record(self, node: str, elapsed: float, outcome: str) -> None:
+        """Record one call's latency (successful calls feed the hedge delay)"""
+        if outcome == "ok":
+            with self._lock:
+                self._latencies.setdefault(node, deque(maxlen=LATENCY_WINDOW)).append(elapsed)
+        metrics.increment("llm_calls", node=node, outcome=outcome)
+        metrics.observe("llm_call_seconds", elapsed, LATENCY_BUCKETS, node=node, outcome=outcome)
+
+    def invoke(self, node: str, runnable, messages):
+        """Invoke `runnable` within the node's deadline, hedging after its p95 if enabled
+
+        Pass `limited(llm, node)` (or a runnable built from it) to also cap
+        output tokens and the provider request timeout.
+        """
+        digest, cached = self._cached(node, runnable, messages)
+        if cached is not None:
+            return cached
+        timeout = self.limits(node).timeout
+        tokens = self.admit(node, messages)
+        start_time = time.time()
+
+        def submit():
+            # Each request runs in a copy of the caller's context (tracing, callbacks)
+            return _executor.submit(contextvars.copy_context().run, runnable.invoke, messages)
+
+        requests = {submit(): "primary"}
+        delay = self.hedge_delay(node)
+        if delay is not None:
+            done, _ = wait(requests, timeout=delay)
+            if not done and self._may_hedge(node, tokens):
+                requests[submit()] = "hedge"
+                metrics.increment("llm_hedges", node=node, outcome="fired")
+                logger.warning(f"[{node}] no response after {delay:.2f}s (p95), hedging")
+
+        pending = set(requests)
+        error: Optional[BaseException] = None
+        while pending:
+            remaining = timeout - (time.time() - start_time)
+            done, pending = wait(pending, timeout=max(0.0, remaining), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                if future.exception() is not None:
+                    error = future.exception()
+                    continue
+                self.record(node, time.time() - start_time, "ok")
+                if len(requests) > 1:
+                    metrics.increment("llm_hedges", node=node, outcome=f"{requests[future]}_won")
+                self.settle(tokens, future.result())
+                if digest:
+                    self.cache.put(node, digest, future.result())
+                return future.result()
+
+        elapsed = time.time() - start_time
+        if error is not None and not pending:
+            self.record(node, elapsed, "error")
+            raise error
+        self.record(node, elapsed, "timeout")
+        raise LLMTimeoutError(f"{node} LLM call exceeded its {timeout:.0f}s deadline")
+
+    def stream_until(self, node: str, runnable, messages, decide: Callable[[str], Optional[str]]) -> tuple[Optional[str], str]:
+        """Stream `runnable` and stop as soon as `decide(text so far)` returns a value
+
+        For short, constrained outputs (labels) the answer is usually decided by
+        its first few tokens, so the stream is closed there instead of waiting
+        for the rest. The node's deadline is checked between chunks; the
+        request timeout from `limited` bounds the wait for each chunk.
+
+        Returns:
+            (decided value or None if the stream ended undecided, streamed text)
+        """
+        digest, cached = self._cached(node, runnable, messages)
+        if cached is not None:
+            return decide(cached.content), cached.content
+        timeout = self.limits(node).timeout
+        self.admit(node, messages)
+        start_time = time.time()
+        text, value = "", None
+        stream = runnable.stream(messages)
+        try:
+            for chunk in stream:
+                text += chunk.content if isinstance(chunk.content, str) else ""
+                value = decide(text)
+                if value is not None:
+                    break
+                if time.time() - start_time > timeout:
+                    self.record(node, time.time() - start_time, "timeout")
+                    raise LLMTimeoutError(f"{node} LLM call exceeded its {timeout:.0f}s deadline")
+        except LLMTimeoutError:
+            raise
+        except Exception:
+            self.record(node, time.time() - start_time, "error")
+            raise
+        finally:
+            stream.close()  # Drops the HTTP response, so the provider stops generating
+        self.record(node, time.time() - start_time, "ok")
+        metrics.increment("llm_streams", node=node, outcome="decided" if value is not None else "undecided")
+        if digest and value is not None:
+            self.cache.put(node, digest, AIMessage(content=text))
+        return value, text
+
+    async def ainvoke(self, node: str, runnable, messages):
+        """Async `invoke`; the losing or timed-out requests are cancelled
+
+        Redis work (cache, rate limits) runs in threads, off the event loop.
+        """
+        digest, cached = await asyncio.to_thread(self._cached, node, runnable, messages)
+        if cached is not None:
+            return cached
+        timeout = self.limits(node).timeout
+        tokens = await self.aadmit(node, messages)
+        start_time = time.time()
+        tasks = {asyncio.ensure_future(runnable.ainvoke(messages)): "primary"}
+        delay = self.hedge_delay(node)
+        if delay is not None:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done and await asyncio.to_thread(self._may_hedge, node, tokens):
+                tasks[asyncio.ensure_future(runnable.ainvoke(messages))] = "hedge"
+                metrics.increment("llm_hedges", node=node, outcome="fired")
+                logger.warning(f"[{node}] no response after {delay:.2f}s (p95), hedging")
+
+        pending = set(tasks)
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                remaining = timeout - (time.time() - start_time)
+                done, pending = await asyncio.wait(pending, timeout=max(0.0, remaining), return_when=FIRST_COMPLETED)
+                if not done:
+                    break
+                for task in done:
+                    if task.exception() is not None:
+                        error = task.exception()
+                        continue
+                    self.record(node, time.time() - start_time, "ok")
+                    if len(tasks) > 1:
+                        metrics.increment("llm_hedges", node=node, outcome=f"{tasks[task]}_won")
+                    await asyncio.to_thread(self.settle, tokens, task.result())
+                    if digest:
+                        await asyncio.to_thread(self.cache.put, node, digest, task.result())
+                    return task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+        elapsed = time.time() - start_time
+        if error is not None and not pending:
+            self.record(node, elapsed, "error")
+            raise error
+        self.record(node, elapsed, "timeout")
+        raise LLMTimeoutError(f"{node} LLM call exceeded its {timeout:.0f}s deadline")
+
+
+_llm_caller: Optional[LLMCaller] = None
+
+
+def get_llm_caller() -> LLMCaller:
+    """Process-wide LLMCaller, so latency history survives across requests"""
+    global _llm_caller
+    if _llm_caller is None:
+        settings = Settings.from_env()
+        _llm_caller = LLMCaller(settings.llm_calls, RateLimiter(settings.rate_limits), LLMCache(settings.llm_cache))
+    return _llm_caller
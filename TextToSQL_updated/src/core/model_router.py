@@ -0,0 +1,121 @@
+"""Complexity-based routing across the configured LLMs
+
+Each request gets a cheap complexity estimate (question length, analytic
+wording, tables in the selected schema, joins in the SQL so far). The router
+maps it to the lowest tier whose threshold it reaches, picks the fastest model
+of that tier by observed latency, and moves up one tier per escalation
+(a failed SQL attempt, a timeout or an error from the previous model).
+"""
+
+import logging
+import re
+import threading
+from dataclasses import dataclass
+from typing import Optional
+
+from src.config.settings import ModelProfile, ModelRouterConfig
+from src.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.5, 1, 2, 4, 8, 16, 32)
+LATENCY_ALPHA = 0.2  # Weight of the newest call in a model's latency average
+
+ANALYTIC_WORDS = frozenset({
+    "compare", "comparison", "versus", "vs", "each", "per", "every", "rank", "ranking", "top",
+    "average", "avg", "total", "most", "least", "between", "trend", "percentage", "ratio", "difference",
+})
+_WORD = re.compile(r"[a-z0-9]+")
+_JOIN = re.compile(r"\bjoin\b", re.IGNORECASE)
+
+
+def estimate_complexity(question: str, tables: int = 0, sql: Optional[str] = None) -> float:
+    """Rough difficulty score of a request; ~0-3 for lookups, 8+ for multi-table analytics"""
+    words = _WORD.findall(question.lower())
+    score = min(len(words) / 10, 3.0)
+    score += sum(1 for word in set(words) if word in ANALYTIC_WORDS)
+    score += max(0, tables - 1)
+    if sql:
+        score += 1.5 * len(_JOIN.findall(sql))
+    return round(score, 2)
+
+
+@dataclass
+class Route:
+    """The model chosen for one call"""
+    node: str
+    profile: ModelProfile
+    llm: object
+    escalation: int
+    reason: str  # "complexity", "min_tier" or "escalated"
+
+
+class ModelRouter:
+    """Chooses a model per call from the registry and learns each model's latency"""
+
+    def __init__(self, config: ModelRouterConfig, models: dict):
+        self.config = config
+        self.profiles = [p for p in config.models if p.name in models]
+        self.models = models
+        self.tiers = sorted({p.tier for p in self.profiles})
+        self._latency: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def expected_latency(self, profile: ModelProfile) -> float:
+        return self._latency.get(profile.name, profile.latency)
+
+    def _tier_index(self, node: str, complexity: float) -> tuple[int, str]:
+        index = sum(1 for threshold in self.config.thresholds if complexity >= threshold)
+        index = min(index, len(self.tiers) - 1)
+        min_tier = self.config.node_min_tiers.get(node)
+        if min_tier is not None:
+            floor = next((i for i, tier in enumerate(self.tiers) if tier >= min_tier), len(self.tiers) - 1)
+            if floor > index:
+                return floor, "min_tier"
+        return index, "complexity"
+
+    def route(self, node: str, complexity: float, escalation: int = 0) -> Route:
+        """Fastest model of the tier for this complexity, `escalation` tiers up"""
+        index, reason = self._tier_index(node, complexity)
+        if escalation:
+            index, reason = min(index + escalation, len(self.tiers) - 1), "escalated"
+        tier = self.tiers[index]
+        profile = min(
+            (p for p in self.profiles if p.tier == tier),
+            key=lambda p: (self.expected_latency(p), p.cost),
+        )
+        logger.info(
+            f"[{node}] routed to {profile.name} ({profile.model}, tier {tier}) "
+            f"complexity={complexity} escalation={escalation}"
+        )
+        metrics.increment("model_routes", node=node, model=profile.name, reason=reason)
+        return Route(node, profile, self.models[profile.name], escalation, reason)
+
+    def can_escalate(self, route: Route) -> bool:
+        return route.profile.tier < self.tiers[-1]
+
+    def record(self, route: Route, elapsed: float, outcome: str) -> None:
+        """Feed one call's latency into its model's average (failures count at full elapsed time)"""
+        name = route.profile.name
+        with self._lock:
+            previous = self._latency.get(name)
+            self._latency[name] = elapsed if previous is None else (
+                LATENCY_ALPHA * elapsed + (1 - LATENCY_ALPHA) * previous
+            )
+        metrics.observe("model_call_seconds", elapsed, LATENCY_BUCKETS, model=name, outcome=outcome)
+
+
+_model_router: Optional[ModelRouter] = None
+
+
+def get_model_router(config: ModelRouterConfig, models: dict) -> Optional[ModelRouter]:
+    """Process-wide ModelRouter (so latencies accumulate across requests), or None if disabled"""
+    global _model_router
+    if not config.enabled or not models:
+        return None
+    if _model_router is None or _model_router.models is not models:
+        _model_router = ModelRouter(config, models)
+    if not _model_router.profiles:
+        logger.error("Model routing is enabled but no LLM_MODELS profile has a model; routing disabled")
+        return None
+    return _model_router
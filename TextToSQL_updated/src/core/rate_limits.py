@@ -0,0 +1,189 @@
+"""Provider rate limits shared by the API and every RQ worker
+
+Two token buckets, one for requests per minute and one for tokens per minute,
+live in a single Redis hash. Every process takes from them before an LLM call.
+The hash is updated in a WATCH/MULTI transaction, so concurrent processes never
+over-draw it. A call that doesn't fit is queued locally, sleeping for the
+refill time, instead of going out to collect a 429.
+
+Calls run with a priority taken from the `llm_priority` context. Background
+jobs (summaries, crawl-time extraction) may only use the part of each bucket
+above `background_reserve`, which leaves headroom for interactive requests.
+After `max_wait_*` the call is sent anyway and its cost is still deducted, so
+the debt delays the calls that follow.
+"""
+
+import asyncio
+import contextvars
+import logging
+import random
+import time
+from contextlib import contextmanager
+
+import redis
+
+from src.config.settings import RateLimitConfig
+from src.core.dependencies import get_redis_client
+from src.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+BUCKET_KEY = "llm_rate:buckets"
+BUCKET_TTL = 300  # A bucket idle this long is full again anyway
+WAIT_BUCKETS = (0.1, 0.5, 1, 2, 5, 10, 30, 60, 300)
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+
+_priority: contextvars.ContextVar[str] = contextvars.ContextVar("llm_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def llm_priority(priority: str):
+    """Run the enclosed LLM calls with `priority` (INTERACTIVE or BACKGROUND)"""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> str:
+    return _priority.get()
+
+
+class RateLimiter:
+    """Takes requests and tokens from the shared buckets, waiting for refills"""
+
+    def __init__(self, config: RateLimitConfig):
+        self.config = config
+
+    def _take(self, redis_client, tokens: int, reserve: float, force: bool = False) -> float:
+        """Take one request and `tokens` if they fit above `reserve` (or `force`)
+
+        Returns:
+            0 when taken, else the seconds until they would fit
+        """
+        rpm, tpm = self.config.requests_per_minute, self.config.tokens_per_minute
+        # A call bigger than the usable bucket could never fit; let it through once the bucket is full
+        tokens = min(tokens, tpm * (1 - reserve))
+        with redis_client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(BUCKET_KEY)
+                    requests_level, tokens_level, updated = pipe.hmget(BUCKET_KEY, "requests", "tokens", "ts")
+                    now = time.time()
+                    elapsed = now - float(updated) if updated else 0.0
+                    requests_level = min(rpm, float(requests_level if requests_level is not None else rpm) + elapsed * rpm / 60)
+                    tokens_level = min(tpm, float(tokens_level if tokens_level is not None else tpm) + elapsed * tpm / 60)
+
+                    wait = max(
+                        (1 + reserve * rpm - requests_level) * 60 / rpm,
+                        (tokens + reserve * tpm - tokens_level) * 60 / tpm,
+                        0.0,
+                    )
+                    if wait == 0 or force:
+                        requests_level -= 1
+                        tokens_level -= tokens
+                    pipe.multi()
+                    pipe.hset(BUCKET_KEY, mapping={"requests": requests_level, "tokens": tokens_level, "ts": now})
+                    pipe.expire(BUCKET_KEY, BUCKET_TTL)
+                    pipe.execute()
+                    return 0.0 if force else wait
+                except redis.WatchError:
+                    continue
+
+    def acquire(self, tokens: int, priority: str = None) -> float:
+        """Block until one request and `tokens` fit (at most the priority's max wait)
+
+        Returns:
+            Seconds waited
+        """
+        if not self.config.enabled:
+            return 0.0
+        redis_client = get_redis_client()
+        if not redis_client:
+            return 0.0
+        priority = priority or current_priority()
+        reserve, max_wait = self._policy(priority)
+        start_time = time.time()
+        outcome = "immediate"
+        try:
+            while True:
+                waited = time.time() - start_time
+                wait = self._take(redis_client, tokens, reserve, force=waited >= max_wait)
+                if wait == 0:
+                    break
+                outcome = "waited"
+                time.sleep(min(wait, max_wait - waited) + random.uniform(0, 0.05))
+        except redis.RedisError as e:
+            # Fail open: without Redis every process falls back to the provider's own limits
+            logger.debug(f"Rate limiter unavailable: {e}")
+            return time.time() - start_time
+        return self._record(priority, outcome, start_time, max_wait)
+
+    async def aacquire(self, tokens: int, priority: str = None) -> float:
+        """Async `acquire`; the event loop keeps running while the call is queued"""
+        if not self.config.enabled:
+            return 0.0
+        redis_client = get_redis_client()
+        if not redis_client:
+            return 0.0
+        priority = priority or current_priority()
+        reserve, max_wait = self._policy(priority)
+        start_time = time.time()
+        outcome = "immediate"
+        try:
+            while True:
+                waited = time.time() - start_time
+                # The WATCH/MULTI round trips run off the event loop
+                wait = await asyncio.to_thread(self._take, redis_client, tokens, reserve, waited >= max_wait)
+                if wait == 0:
+                    break
+                outcome = "waited"
+                await asyncio.sleep(min(wait, max_wait - waited) + random.uniform(0, 0.05))
+        except redis.RedisError as e:
+            logger.debug(f"Rate limiter unavailable: {e}")
+            return time.time() - start_time
+        return self._record(priority, outcome, start_time, max_wait)
+
+    def try_acquire(self, tokens: int, priority: str = None) -> bool:
+        """Take one request and `tokens` only if they fit right now (used for hedged duplicates)"""
+        if not self.config.enabled:
+            return True
+        redis_client = get_redis_client()
+        if not redis_client:
+            return True
+        reserve, _ = self._policy(priority or current_priority())
+        try:
+            return self._take(redis_client, tokens, reserve) == 0
+        except redis.RedisError:
+            return True
+
+    def settle(self, estimated: int, actual: int) -> None:
+        """Return (or charge) the difference between a call's estimated and reported tokens"""
+        if not self.config.enabled or estimated == actual:
+            return
+        redis_client = get_redis_client()
+        if not redis_client:
+            return
+        try:
+            redis_client.hincrbyfloat(BUCKET_KEY, "tokens", estimated - actual)
+        except redis.RedisError as e:
+            logger.debug(f"Rate limiter unavailable: {e}")
+
+    def _policy(self, priority: str) -> tuple[float, float]:
+        if priority == BACKGROUND:
+            return self.config.background_reserve, self.config.max_wait_background
+        return 0.0, self.config.max_wait_interactive
+
+    def _record(self, priority: str, outcome: str, start_time: float, max_wait: float) -> float:
+        waited = time.time() - start_time
+        if outcome == "waited" and waited >= max_wait:
+            outcome = "gave_up"
+            logger.warning(f"LLM rate limit: sending {priority} call after waiting {waited:.1f}s")
+        elif outcome == "waited":
+            logger.info(f"LLM rate limit: {priority} call waited {waited:.2f}s")
+        metrics.increment("llm_rate_limit", priority=priority, outcome=outcome)
+        metrics.observe("llm_rate_wait_seconds", waited, WAIT_BUCKETS, priority=priority)
+        return waited
@@ -0,0 +1,164 @@
+"""Single-flight coalescing of identical context-free questions
+
+When an announcement goes out, dozens of users ask the same question within
+seconds, and each would run the full graph. With SINGLE_FLIGHT_ENABLED, the
+first request for a normalized question takes a Redis lock and computes the
+answer. Concurrent identical requests from the API or any worker poll for the
+leader's result instead. The result stays readable for `result_ttl` seconds,
+so near-simultaneous late arrivals share it too. If the leader fails, the
+lock is released without a result, and a waiting request takes over.
+Followers that wait longer than `timeout` compute the answer themselves.
+
+Only questions without thread-specific context are coalesced: requests
+without a thread, new threads, and threads idle for `idle_seconds`. The
+shared answer is computed without conversation history.
+"""
+
+import asyncio
+import hashlib
+import logging
+import time
+import uuid
+from typing import Awaitable, Callable, Optional
+
+import redis
+
+from src.config.settings import SingleFlightConfig
+from src.core.dependencies import get_redis_client
+from src.tools.slots import normalize_question
+from src.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+LOCK_KEY = "single_flight:lock:{digest}"
+RESULT_KEY = "single_flight:result:{digest}"
+POLL_INTERVAL = 0.05
+WAIT_BUCKETS = (0.1, 0.5, 1, 2, 5, 10, 30, 60, 120)
+
+_LEAD = object()  # _poll outcome: this request is now the leader
+
+
+def is_context_free(last_messages: list[dict], idle_seconds: int, now: Optional[float] = None) -> bool:
+    """Whether a thread whose latest saved messages are `last_messages` has no context to answer from
+
+    `now` is the time of the question (default: now), for judging past questions.
+    """
+    if not last_messages:
+        return True
+    if idle_seconds <= 0:
+        return False
+    try:
+        last_time = time.mktime(time.strptime(last_messages[-1].get("timestamp", ""), "%Y-%m-%d %H:%M:%S"))
+    except (TypeError, ValueError):
+        return False
+    return (time.time() if now is None else now) - last_time >= idle_seconds
+
+
+class SingleFlight:
+    """Runs one computation per normalized question at a time across processes"""
+
+    def __init__(self, config: SingleFlightConfig):
+        self.config = config
+
+    @staticmethod
+    def digest(question: str) -> str:
+        return hashlib.sha256(normalize_question(question).encode("utf-8")).hexdigest()
+
+    def _poll(self, redis_client, digest: str, token: str):
+        """One step: the shared result, _LEAD if the lock was taken, else None (keep waiting)"""
+        result = redis_client.get(RESULT_KEY.format(digest=digest))
+        if result is not None:
+            return result
+        if redis_client.set(LOCK_KEY.format(digest=digest), token, nx=True, px=int(self.config.timeout * 1000)):
+            return _LEAD
+        return None
+
+    def _publish(self, redis_client, digest: str, token: str, result: Optional[str]) -> None:
+        """Share the leader's result (if any) and release the lock"""
+        try:
+            if result is not None:
+                redis_client.set(RESULT_KEY.format(digest=digest), result, ex=self.config.result_ttl)
+            lock_key = LOCK_KEY.format(digest=digest)
+            if redis_client.get(lock_key) == token:
+                redis_client.delete(lock_key)
+        except redis.RedisError as e:
+            logger.warning(f"Single-flight publish failed: {e}")
+
+    def _record(self, outcome: str, start_time: float) -> None:
+        metrics.increment("single_flight", outcome=outcome)
+        if outcome == "shared":
+            metrics.observe("single_flight_wait_seconds", time.time() - start_time, WAIT_BUCKETS)
+            logger.info(f"Single-flight: shared a concurrent answer after {time.time() - start_time:.2f}s")
+
+    def run(self, question: str, compute: Callable[[], str]) -> str:
+        """`compute()`'s answer, shared with concurrent identical questions"""
+        redis_client = get_redis_client()
+        if not redis_client:
+            return compute()
+        digest, token, start_time = self.digest(question), uuid.uuid4().hex, time.time()
+        try:
+            while time.time() - start_time < self.config.timeout:
+                outcome = self._poll(redis_client, digest, token)
+                if outcome is _LEAD:
+                    break
+                if outcome is not None:
+                    self._record("shared", start_time)
+                    return outcome
+                time.sleep(POLL_INTERVAL)
+            else:
+                self._record("timeout", start_time)
+                return compute()
+        except redis.RedisError as e:
+            logger.warning(f"Single-flight unavailable: {e}")
+            return compute()
+
+        self._record("leader", start_time)
+        result = None
+        try:
+            result = compute()
+            return result
+        finally:
+            self._publish(redis_client, digest, token, result)
+
+    async def arun(self, question: str, compute: Callable[[], Awaitable[str]]) -> str:
+        """Async `run`; waiting doesn't block the event loop"""
+        redis_client = get_redis_client()
+        if not redis_client:
+            return await compute()
+        digest, token, start_time = self.digest(question), uuid.uuid4().hex, time.time()
+        try:
+            while time.time() - start_time < self.config.timeout:
+                outcome = await asyncio.to_thread(self._poll, redis_client, digest, token)
+                if outcome is _LEAD:
+                    break
+                if outcome is not None:
+                    self._record("shared", start_time)
+                    return outcome
+                await asyncio.sleep(POLL_INTERVAL)
+            else:
+                self._record("timeout", start_time)
+                return await compute()
+        except redis.RedisError as e:
+            logger.warning(f"Single-flight unavailable: {e}")
+            return await compute()
+
+        self._record("leader", start_time)
+        result = None
+        try:
+            result = await compute()
+            return result
+        finally:
+            await asyncio.to_thread(self._publish, redis_client, digest, token, result)
+
+
+_single_flight: Optional[SingleFlight] = None
+
+
+def get_single_flight(config: SingleFlightConfig) -> Optional[SingleFlight]:
+    """Process-wide SingleFlight, or None if coalescing is disabled"""
+    global _single_flight
+    if not config.enabled:
+        return None
+    if _single_flight is None:
+        _single_flight = SingleFlight(config)
+    return _single_flight
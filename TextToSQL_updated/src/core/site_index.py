@@ -0,0 +1,129 @@
+"""In-process BM25 index over crawled siciliangames.com passages"""
+
+import json
+import logging
+import math
+import re
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Collection, NamedTuple, Optional
+
+from src.core.dependencies import get_redis_client
+from src.tools.site_crawler import PASSAGES_KEY, VERSION_KEY
+
+logger = logging.getLogger(__name__)
+
+VERSION_CHECK_INTERVAL = 30  # Seconds between checks for a newer crawl
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are at be by can for from how i in is it me of on or our the to was we what when where which "
+    "who will with you".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS]
+
+
+@dataclass
+class Passage:
+    """A chunk of one crawled page"""
+    url: str
+    text: str
+
+
+class _Snapshot(NamedTuple):
+    """One built index; replaced as a whole so searches never see a half-built one"""
+    passages: tuple[Passage, ...]
+    postings: dict[str, tuple[tuple[int, int], ...]]  # term -> ((passage id, term frequency), ...)
+    lengths: tuple[int, ...]
+    avg_length: float
+
+
+_EMPTY = _Snapshot((), {}, (), 0.0)
+
+
+class SiteIndex:
+    """BM25 inverted index, rebuilt from Redis whenever the crawl version changes"""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._snapshot = _EMPTY
+        self._version: Optional[str] = None
+        self._checked_at = 0.0
+
+    def __len__(self) -> int:
+        return len(self._snapshot.passages)
+
+    def build(self, passages: list[Passage]) -> None:
+        postings: dict[str, list[tuple[int, int]]] = {}
+        lengths = []
+        for passage_id, passage in enumerate(passages):
+            terms = tokenize(passage.text)
+            lengths.append(len(terms))
+            for term, frequency in Counter(terms).items():
+                postings.setdefault(term, []).append((passage_id, frequency))
+        self._snapshot = _Snapshot(
+            tuple(passages),
+            {term: tuple(entries) for term, entries in postings.items()},
+            tuple(lengths),
+            sum(lengths) / len(lengths) if lengths else 0.0,
+        )
+
+    def refresh(self, urls: list[str]) -> None:
+        """Reload passages for `urls` if the crawler has stored a newer version"""
+        if time.time() - self._checked_at < VERSION_CHECK_INTERVAL:
+            return
+        with self._lock:
+            self._checked_at = time.time()
+            redis_client = get_redis_client()
+            if not redis_client:
+                return
+            try:
+                version = redis_client.get(VERSION_KEY)
+                if version is None or version == self._version:
+                    return
+                passages = []
+                for url, raw in zip(urls, redis_client.mget([PASSAGES_KEY.format(url=u) for u in urls])):
+                    passages.extend(Passage(url, text) for text in json.loads(raw or "[]"))
+                self.build(passages)
+                self._version = version
+                logger.info(f"Site index rebuilt: {len(passages)} passages (crawl version {version})")
+            except Exception as e:
+                logger.error(f"Failed to refresh site index: {e}")
+
+    def search(self, query: str, k: int = 3, urls: Optional[Collection[str]] = None) -> list[tuple[float, Passage]]:
+        """Top-k passages for `query`, optionally restricted to some pages"""
+        snapshot = self._snapshot
+        total = len(snapshot.passages)
+        if not total:
+            return []
+        scores: dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = snapshot.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for passage_id, frequency in postings:
+                if urls and snapshot.passages[passage_id].url not in urls:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * snapshot.lengths[passage_id] / (snapshot.avg_length or 1))
+                scores[passage_id] = scores.get(passage_id, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + norm)
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [(score, snapshot.passages[passage_id]) for passage_id, score in ranked]
+
+_site_index: Optional[SiteIndex] = None
+
+
+def get_site_index(urls: list[str]) -> SiteIndex:
+    """Process-wide SiteIndex, refreshed from the latest crawl"""
+    global _site_index
+    if _site_index is None:
+        _site_index = SiteIndex()
+    _site_index.refresh(urls)
+    return _site_index
@@ -0,0 +1,198 @@
+"""Pre-warmed answers to the most frequent context-free questions
+
+Ahead of each peak window (WARMUP_HOURS), the scheduled `warm_answers` job
+mines conversation_threads for the context-free questions asked most often
+over the last `lookback_days`. It then runs each one through the agent graph
+without history, and stores the answers here for `answer_ttl` seconds.
+Running the graph also refreshes the per-node LLM response cache and the
+verified SQL examples for those questions. The API and workers serve a warmed
+answer to a context-free question before doing anything else.
+
+Questions are context-free under the same rule as single-flight coalescing
+(SINGLE_FLIGHT_IDLE_SECONDS), and are matched by the same normalized digest.
+
+Warmed answers are dropped when a site crawl finds changed pages, and on
+POST /warmup/invalidate (for example after a database update), so an answer
+warmed before an announcement isn't served after it.
+
+Each run also reports coverage: the share of the questions asked since the
+previous run that were answered from that run's warmed entries.
+"""
+
+import json
+import logging
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Iterable, NamedTuple, Optional
+
+import redis
+
+from src.config.settings import WarmupConfig
+from src.core.dependencies import get_redis_client
+from src.core.single_flight import SingleFlight, is_context_free
+from src.tools.slots import normalize_question
+from src.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+ANSWER_KEY = "answer_cache:{digest}"
+LAST_RUN_KEY = "warmup:last_run"      # {"run_at", "answer_ttl", "digests"} of the latest run
+REPORT_KEY = "warmup:report"          # Latest run's report
+SCHEDULED_KEY = "warmup:scheduled"    # Set while a warm-up job is scheduled
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+class AskedQuestion(NamedTuple):
+    question: str
+    asked_at: float
+    context_free: bool
+
+
+def asked_questions(conversations: Iterable[list[dict]], since: float, idle_seconds: int) -> list[AskedQuestion]:
+    """User questions asked at or after `since` in the given threads, oldest first"""
+    asked = []
+    for conversation in conversations:
+        for i, message in enumerate(conversation):
+            if message.get("role") != "user" or not message.get("content"):
+                continue
+            try:
+                asked_at = time.mktime(time.strptime(message.get("timestamp", ""), TIMESTAMP_FORMAT))
+            except (TypeError, ValueError):
+                continue
+            if asked_at >= since:
+                context_free = is_context_free(conversation[max(i - 1, 0):i], idle_seconds, now=asked_at)
+                asked.append(AskedQuestion(message["content"], asked_at, context_free))
+    return sorted(asked, key=lambda q: q.asked_at)
+
+
+def top_questions(asked: Iterable[AskedQuestion], n: int, min_count: int) -> list[tuple[str, int]]:
+    """The `n` most frequent context-free questions (by normalized form) with their counts
+
+    Each is represented by its most common original wording.
+    """
+    counts, wordings = Counter(), {}
+    for q in asked:
+        if q.context_free:
+            key = normalize_question(q.question)
+            counts[key] += 1
+            wordings.setdefault(key, Counter())[q.question.strip()] += 1
+    return [
+        (wordings[key].most_common(1)[0][0], count)
+        for key, count in counts.most_common(n)
+        if count >= min_count
+    ]
+
+
+def coverage_report(asked: list[AskedQuestion], last_run: dict) -> dict:
+    """How many of `asked` were context-free and matched a live entry from `last_run`"""
+    digests = set(last_run.get("digests", []))
+    expires_at = min(last_run.get("run_at", 0) + last_run.get("answer_ttl", 0),
+                     last_run.get("invalidated_at", float("inf")))
+    context_free = [q for q in asked if q.context_free]
+    covered = sum(1 for q in context_free if q.asked_at < expires_at and SingleFlight.digest(q.question) in digests)
+    return {
+        "questions": len(asked),
+        "context_free": len(context_free),
+        "covered": covered,
+        "coverage": round(covered / len(asked), 4) if asked else None,
+        "context_free_coverage": round(covered / len(context_free), 4) if context_free else None,
+    }
+
+
+def next_run_delay(hours: list[int], now: Optional[float] = None) -> float:
+    """Seconds until the next of the local `hours` (at least a minute away)"""
+    now = time.time() if now is None else now
+    today = datetime.fromtimestamp(now).replace(minute=0, second=0, microsecond=0)
+    for days in (0, 1):
+        for hour in sorted(hours):
+            run_at = (today + timedelta(days=days)).replace(hour=hour).timestamp()
+            if run_at - now > 60:
+                return run_at - now
+    return 86400.0
+
+
+class AnswerCache:
+    """Warmed answers by normalized question digest"""
+
+    def __init__(self, config: WarmupConfig):
+        self.config = config
+
+    def get(self, question: str) -> Optional[str]:
+        """Warmed answer to a context-free question, or None"""
+        redis_client = get_redis_client()
+        if not redis_client:
+            return None
+        try:
+            raw = redis_client.get(ANSWER_KEY.format(digest=SingleFlight.digest(question)))
+        except redis.RedisError as e:
+            logger.warning(f"Answer cache unavailable: {e}")
+            return None
+        metrics.increment("answer_cache", outcome="hit" if raw else "miss")
+        if not raw:
+            return None
+        logger.info(f"Answer cache hit for: {question[:100]}")
+        return json.loads(raw)["answer"]
+
+    def put(self, question: str, answer: str) -> str:
+        """Store a warmed answer; returns its digest"""
+        digest = SingleFlight.digest(question)
+        entry = {"question": question, "answer": answer, "warmed_at": time.strftime(TIMESTAMP_FORMAT)}
+        get_redis_client().set(ANSWER_KEY.format(digest=digest), json.dumps(entry, ensure_ascii=False),
+                               ex=self.config.answer_ttl)
+        return digest
+
+    def last_run(self) -> Optional[dict]:
+        raw = get_redis_client().get(LAST_RUN_KEY)
+        return json.loads(raw) if raw else None
+
+    def record_run(self, run_at: float, digests: list[str], report: dict) -> None:
+        """Remember this run's entries for the next coverage report, and publish the report"""
+        redis_client = get_redis_client()
+        redis_client.set(LAST_RUN_KEY, json.dumps({"run_at": run_at, "answer_ttl": self.config.answer_ttl,
+                                                   "digests": digests}))
+        redis_client.set(REPORT_KEY, json.dumps(report, ensure_ascii=False))
+
+
+def invalidate_answers(reason: str) -> int:
+    """Drop every warmed answer (the data behind them changed); returns how many were dropped"""
+    redis_client = get_redis_client()
+    if not redis_client:
+        return 0
+    try:
+        keys = list(redis_client.scan_iter(match=ANSWER_KEY.format(digest="*"), count=500))
+        if keys:
+            redis_client.delete(*keys)
+        raw = redis_client.get(LAST_RUN_KEY)
+        if raw:
+            # Coverage stops counting the dropped entries from now on
+            last_run = json.loads(raw)
+            last_run.setdefault("invalidated_at", time.time())
+            redis_client.set(LAST_RUN_KEY, json.dumps(last_run))
+    except redis.RedisError as e:
+        logger.error(f"Failed to invalidate warmed answers: {e}")
+        return 0
+    if keys:
+        logger.warning(f"Invalidated {len(keys)} warmed answers ({reason})")
+    metrics.increment("answer_cache_invalidations", reason=reason)
+    return len(keys)
+
+
+def latest_report() -> Optional[dict]:
+    """The most recent warm-up report, if any"""
+    redis_client = get_redis_client()
+    raw = redis_client.get(REPORT_KEY) if redis_client else None
+    return json.loads(raw) if raw else None
+
+
+_answer_cache: Optional[AnswerCache] = None
+
+
+def get_answer_cache(config: WarmupConfig) -> Optional[AnswerCache]:
+    """Process-wide AnswerCache, or None if warm-up is disabled"""
+    global _answer_cache
+    if not config.enabled:
+        return None
+    if _answer_cache is None:
+        _answer_cache = AnswerCache(config)
+    return _answer_cache
@@ -38,6 +38,15 @@ def get_classify_query_prompt() -> str:
     
     """
 
+def get_classify_batch_prompt() -> str:
+    """Get the system prompt for classifying several independent queries in one call"""
+    return get_classify_query_prompt() + """
+    ### BATCH
+    You receive a JSON list of independent queries. Each item has an "index", its own "context" (that user's previous conversation) and the "query".
+    Classify every query on its own, using only its own context. Never let one item influence another.
+    Return {"routes": [{"index": <index>, "route": "<CATEGORY>"}, ...]} with exactly one entry per item.
+    """
+
 def get_general_answer_prompt() -> str:
     """Get the system prompt for general conversation"""
     return """
@@ -126,6 +135,23 @@ def get_answer_from_previous_convo_prompt() -> str:
       Remember: Your primary task is to understand the context from previous conversations and provide intelligent, context-aware responses that feel natural and helpful.
        """
 
+def get_conversation_summary_prompt(max_words: int) -> str:
+    """Get the system prompt for folding new messages into a thread's rolling summary"""
+    return f"""
+      You maintain a running summary of a chat between a user and the Sicilian Games AI assistant.
+
+      You receive the CURRENT SUMMARY and NEW MESSAGES as JSON. Return an updated summary that merges both, in at most {max_words} words.
+
+      Keep:
+      - What the user asked about (sports, chapters, teams, players, dates, events)
+      - The concrete facts the assistant answered with (names, dates, times, scores, counts)
+      - Anything the assistant could NOT answer
+      - Open follow-up threads the user may refer back to ("they", "that match")
+
+      Drop greetings, pleasantries, emojis and formatting. Write plain sentences, oldest topics first. Return only the summary text.
+      """
+
+
 def get_web_search_prompt() -> str:
     """Get the system prompt for web search"""
     return """
@@ -200,6 +226,26 @@ def get_web_search_prompt() -> str:
       
     """
 
+
+def get_page_facts_prompt() -> str:
+    """Get the system prompt for extracting structured facts from a crawled page"""
+    return """
+      You extract structured facts from the text of a Sicilian Games web page. The text was scraped from HTML, so table cells and list items appear on separate lines.
+
+      Extract every:
+      - schedule entry: sport, event/category/round, teams or chapters playing, date, time, venue
+      - winner: sport, event/category, position (Winner, Runner Up, Gold, Silver, Bronze, ...), winner name or team, chapter
+      - sponsor: name and sponsorship tier or role (e.g. Title Partner)
+      - contact: person or desk name, role, phone number, email
+
+      Rules:
+      - Copy values exactly as written on the page (dates, times, names); do not reformat or translate them
+      - Leave a field empty when the page does not state it; NEVER guess or infer values
+      - Return empty lists for kinds the page does not contain
+      - Ignore navigation menus, footers, cookie notices and other boilerplate
+      """
+
+
 # Text to SQL Prompt 
 def get_generate_query_prompt(dialect: str) -> str:
     """Get the system prompt for query generation"""
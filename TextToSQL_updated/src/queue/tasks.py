@@ -1,16 +1,30 @@
 import logging
 import json
 import time
+from datetime import timedelta
+from rq import Queue, get_current_job
 from twilio.rest import Client
 from src.config import Settings
 from src.core import DatabaseManager, LLMManager, ConversationManager
 from src.tools import SQLToolkit
 from src.agents import AgentGraphBuilder
+from src.tools.site_crawler import SCHEDULED_KEY, crawl_site, crawl_urls
+from src.tools.site_facts import refresh_site_facts
+from src.core.history import summarize_thread
+from src.core.rate_limits import BACKGROUND, llm_priority
+from src.core.single_flight import get_single_flight, is_context_free
+from src.core.warmup import (
+    SCHEDULED_KEY as WARMUP_SCHEDULED_KEY, TIMESTAMP_FORMAT, AnswerCache, asked_questions,
+    coverage_report, get_answer_cache, invalidate_answers, next_run_delay, top_questions,
+)
+from src.utils import metrics
 
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+SUMMARY_PENDING_KEY = "conversation_summary:pending:{thread_id}"  # set while a summary job is queued
+
 
 def split_message(message: str, max_length: int = 1400) -> list[str]:
     """
@@ -61,6 +75,9 @@ def send_whatsapp_message(to_number: str, message: str):
             settings.twilio.account_sid,
             settings.twilio.auth_token
         )
+        if settings.twilio.api_base_url:
+            # Route sends to a local Twilio stand-in (see load_test_whatsapp.py)
+            client.api.base_url = settings.twilio.api_base_url
 
         # Check message length and send accordingly
         if len(message) <= 1400:
@@ -96,6 +113,51 @@ def send_whatsapp_message(to_number: str, message: str):
         )
         return None
 
+def build_toolkit():
+    """SQLToolkit over the cached database and LLM managers, and the SQL dialect"""
+    from src.core.dependencies import get_db_manager, get_llm_manager
+    
+    logger.info("Getting cached DatabaseManager")
+    db_manager = get_db_manager()
+    db = db_manager.get_database()
+    dialect = db_manager.get_dialect()
+    
+    logger.info("Getting cached LLMManager")
+    llm_manager = get_llm_manager()
+    llm = llm_manager.get_model()
+    llm_without_reasoning = llm_manager.get_model_without_reasoning()
+    
+    return SQLToolkit(db, llm, llm_without_reasoning, llm_manager.get_models()), dialect
+
+
+def run_agent(toolkit, dialect: str, question: str, memory=None, thread_id=None) -> str:
+    """Run the agent graph on a question and return the final message"""
+    # Build agent
+    agent_builder = AgentGraphBuilder(
+        toolkit, 
+        dialect,
+        conversation_manager=memory,
+        thread_id=thread_id
+    )
+    
+    # Execute agent
+    messages = []
+    step_count = 0
+    
+    for step in agent_builder.stream(
+        {"messages": [{"role": "user", "content": question}]},
+        stream_mode="values",
+    ):
+        step_count += 1
+        messages.append(step["messages"][-1])
+
+    logger.info(f"Agent completed {step_count} steps")
+    
+    # Get response
+    final_message = messages[-1] if messages else None
+    return final_message.content if final_message else "Sorry, I couldn't process your question."
+
+
 def process_whatsapp_message(body: str, from_number: str, to_number: str):
     """
     Background task to process WhatsApp message and send response.
@@ -111,52 +173,32 @@ def process_whatsapp_message(body: str, from_number: str, to_number: str):
         conversation_manager = ConversationManager(settings)
         thread_id = from_number
         
+        single_flight = get_single_flight(settings.single_flight)
+        answer_cache = get_answer_cache(settings.warmup)
+        context_free = (single_flight is not None or answer_cache is not None) and is_context_free(
+            conversation_manager.get_last_messages(thread_id, limit=1),
+            settings.single_flight.idle_seconds,
+        )
+
         # Save user message
         conversation_manager.save_message(thread_id, "user", body)
         
-        # Initialize components (using cached dependencies)
-        from src.core.dependencies import get_db_manager, get_llm_manager
-        
-        logger.info("Getting cached DatabaseManager")
-        db_manager = get_db_manager()
-        db = db_manager.get_database()
-        dialect = db_manager.get_dialect()
-        
-        logger.info("Getting cached LLMManager")
-        llm_manager = get_llm_manager()
-        llm = llm_manager.get_model()
-        llm_without_reasoning = llm_manager.get_model_without_reasoning()
-        
-        toolkit = SQLToolkit(db, llm, llm_without_reasoning)
-        
-        # Build agent
-        agent_builder = AgentGraphBuilder(
-            toolkit, 
-            dialect,
-            conversation_manager=conversation_manager,
-            thread_id=thread_id
-        )
-        
-        # Execute agent
-        messages = []
-        step_count = 0
-        
-        for step in agent_builder.stream(
-            {"messages": [{"role": "user", "content": body}]},
-            stream_mode="values",
-        ):
-            step_count += 1
-            messages.append(step["messages"][-1])
-
-        logger.info(f"Agent completed {step_count} steps")
-        
-        # Get response
-        final_message = messages[-1] if messages else None
-        result = final_message.content if final_message else "Sorry, I couldn't process your question."
+        # A warmed answer skips the graph entirely
+        result = answer_cache.get(body) if answer_cache and context_free else None
+        if result is None:
+            toolkit, dialect = build_toolkit()
+            if single_flight and context_free:
+                # Identical concurrent questions share one run, computed without thread history
+                result = single_flight.run(body, lambda: run_agent(toolkit, dialect, body))
+            else:
+                result = run_agent(toolkit, dialect, body, conversation_manager, thread_id)
         
         # Save assistant response
         conversation_manager.save_message(thread_id, "assistant", result)
         conversation_manager.close()
+        job = get_current_job()
+        if job:
+            enqueue_conversation_summary(Queue(job.origin, connection=job.connection), thread_id)
         
         # Send response via Twilio
         user_number = from_number.replace("whatsapp:", "")
@@ -178,3 +220,185 @@ def process_whatsapp_message(body: str, from_number: str, to_number: str):
             pass
             
         return False
+
+
+def summarize_conversation(thread_id: str):
+    """
+    Background task: fold a thread's older turns into its rolling summary.
+    """
+    start_time = time.time()
+    settings = Settings.from_env()
+    job = get_current_job()
+    if job:
+        # Turns saved from now on need another run
+        job.connection.delete(SUMMARY_PENDING_KEY.format(thread_id=thread_id))
+
+    from src.core.dependencies import get_llm_manager
+    conversation_manager = ConversationManager(settings)
+    try:
+        with llm_priority(BACKGROUND):
+            outcome = summarize_thread(
+                conversation_manager,
+                thread_id,
+                get_llm_manager().get_model_without_reasoning(),
+                settings.conversation,
+            )
+        metrics.increment("conversation_summaries", outcome=outcome or "missing")
+        logger.critical(f"Conversation summary for {thread_id} completed in {time.time() - start_time:.2f}s ({outcome})")
+        return outcome
+    except Exception as e:
+        metrics.increment("conversation_summaries", outcome="error")
+        logger.error(f"Conversation summary failed for {thread_id}: {e}", exc_info=True)
+        return None
+    finally:
+        conversation_manager.close()
+
+
+def enqueue_conversation_summary(queue: Queue, thread_id: str) -> bool:
+    """
+    Queue summarize_conversation for a thread after a turn, unless one is
+    already waiting. Failures are logged and never affect the reply.
+    """
+    settings = Settings.from_env()
+    if not settings.conversation.summary_enabled:
+        return False
+    try:
+        if not queue.connection.set(SUMMARY_PENDING_KEY.format(thread_id=thread_id), 1, nx=True, ex=300):
+            return False
+        queue.enqueue(summarize_conversation, thread_id, job_timeout='2m')
+        return True
+    except Exception as e:
+        logger.warning(f"Could not enqueue conversation summary for {thread_id}: {e}")
+        return False
+
+
+def crawl_siciliangames():
+    """
+    Scheduled task: refresh the crawled siciliangames.com pages and the facts
+    extracted from changed ones, then reschedule itself SITE_CRAWL_INTERVAL
+    seconds later.
+    """
+    settings = Settings.from_env()
+    try:
+        outcomes = crawl_site(settings)
+        if outcomes and settings.site_crawl.extract_facts:
+            from src.core.dependencies import get_llm_manager
+            with llm_priority(BACKGROUND):
+                refresh_site_facts(crawl_urls(), get_llm_manager().get_model_without_reasoning())
+        if outcomes.get("modified") and settings.warmup.enabled:
+            # Answers warmed from the old pages would be stale
+            invalidate_answers("site_changed")
+        return outcomes
+    except Exception as e:
+        logger.error(f"Site crawl failed: {e}", exc_info=True)
+        return None
+    finally:
+        job = get_current_job()
+        if job and settings.site_crawl.enabled:
+            interval = settings.site_crawl.interval
+            Queue(job.origin, connection=job.connection).enqueue_in(
+                timedelta(seconds=interval), crawl_siciliangames,
+                job_timeout=settings.site_crawl.job_timeout,
+            )
+            # Lets ensure_site_crawl_scheduled see the chain is alive
+            job.connection.set(SCHEDULED_KEY, job.id, ex=interval * 3)
+            logger.info(f"Next site crawl in {interval}s")
+
+
+def ensure_site_crawl_scheduled(queue: Queue) -> bool:
+    """
+    Start the crawl chain unless one is already queued or scheduled.
+    Safe to call from every worker on startup.
+    """
+    settings = Settings.from_env()
+    if not settings.site_crawl.enabled:
+        return False
+    if not queue.connection.set(SCHEDULED_KEY, "starting", nx=True, ex=settings.site_crawl.interval * 3):
+        return False
+    queue.enqueue(crawl_siciliangames, job_timeout=settings.site_crawl.job_timeout)
+    logger.info("Site crawl scheduled")
+    return True
+
+
+def warm_answers():
+    """
+    Scheduled task: answer the WARMUP_TOP_N most frequent context-free questions
+    of the last WARMUP_LOOKBACK_DAYS ahead of a peak window, report how much of
+    the traffic since the previous run it covered, then reschedule itself at
+    the next of WARMUP_HOURS.
+    """
+    start_time = time.time()
+    settings = Settings.from_env()
+    config = settings.warmup
+    conversation_manager = ConversationManager(settings)
+    try:
+        answer_cache = AnswerCache(config)
+        last_run = answer_cache.last_run() or {}
+        lookback_start = start_time - config.lookback_days * 86400
+        since = min(lookback_start, last_run.get("run_at", start_time))
+        asked = asked_questions(
+            conversation_manager.get_conversations_since(time.strftime(TIMESTAMP_FORMAT, time.localtime(since))),
+            since,
+            settings.single_flight.idle_seconds,
+        )
+        report = {"run_at": time.strftime(TIMESTAMP_FORMAT, time.localtime(start_time))}
+        if last_run:
+            report["since"] = time.strftime(TIMESTAMP_FORMAT, time.localtime(last_run["run_at"]))
+            report.update(coverage_report([q for q in asked if q.asked_at >= last_run["run_at"]], last_run))
+
+        top = top_questions((q for q in asked if q.asked_at >= lookback_start), config.top_n, config.min_count)
+        toolkit, dialect = build_toolkit()
+        digests, failed = [], 0
+        with llm_priority(BACKGROUND):
+            for question, count in top:
+                try:
+                    digests.append(answer_cache.put(question, run_agent(toolkit, dialect, question)))
+                    logger.info(f"Warmed ({count} asks): {question[:100]}")
+                except Exception as e:
+                    failed += 1
+                    logger.warning(f"Warm-up failed for '{question[:100]}': {e}")
+        report.update(warmed=len(digests), failed=failed)
+        answer_cache.record_run(start_time, digests, report)
+
+        metrics.increment("warmup_answers", amount=len(digests), outcome="warmed")
+        metrics.increment("warmup_answers", amount=failed, outcome="failed")
+        logger.critical(f"Warm-up of {len(digests)}/{len(top)} answers completed in {time.time() - start_time:.2f}s")
+        if report.get("coverage") is not None:
+            logger.critical(
+                f"Warm-up coverage since {report['since']}: {report['covered']}/{report['questions']} questions "
+                f"({report['coverage']:.1%}), {report['context_free_coverage']:.1%} of context-free ones"
+            )
+        return report
+    except Exception as e:
+        logger.error(f"Warm-up failed: {e}", exc_info=True)
+        return None
+    finally:
+        conversation_manager.close()
+        job = get_current_job()
+        if job and config.enabled:
+            schedule_warmup(Queue(job.origin, connection=job.connection))
+
+
+def schedule_warmup(queue: Queue) -> float:
+    """Schedule warm_answers at the next of WARMUP_HOURS; returns the delay in seconds"""
+    settings = Settings.from_env()
+    delay = next_run_delay(settings.warmup.hours)
+    queue.enqueue_in(timedelta(seconds=delay), warm_answers, job_timeout='1h')
+    # Lets ensure_warmup_scheduled see the chain is alive
+    queue.connection.set(WARMUP_SCHEDULED_KEY, 1, ex=int(delay) + 3600)
+    logger.info(f"Next answer warm-up in {delay / 3600:.1f}h")
+    return delay
+
+
+def ensure_warmup_scheduled(queue: Queue) -> bool:
+    """
+    Start the warm-up chain unless a run is already scheduled.
+    Safe to call from every worker on startup.
+    """
+    settings = Settings.from_env()
+    if not settings.warmup.enabled:
+        return False
+    if not queue.connection.set(WARMUP_SCHEDULED_KEY, "starting", nx=True, ex=3600):
+        return False
+    schedule_warmup(queue)
+    return True
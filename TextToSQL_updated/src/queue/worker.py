@@ -66,9 +66,18 @@ def main():
         # Initialize queues with explicit connection
         queues = [Queue(name, connection=conn) for name in listen]
         
+        # Start the siciliangames.com crawl chain (no-op if another worker already did)
+        from src.queue.tasks import ensure_site_crawl_scheduled
+        ensure_site_crawl_scheduled(queues[0])
+
+        # Schedule answer warm-up ahead of the next peak window (no-op if already scheduled)
+        from src.queue.tasks import ensure_warmup_scheduled
+        ensure_warmup_scheduled(queues[0])
+
         # Initialize worker with explicit connection
+        # The scheduler moves enqueue_in jobs (site crawl, warm-up) onto the queue when due
         worker = Worker(queues, connection=conn)
-        worker.work()
+        worker.work(with_scheduler=True)
             
     except Exception as e:
         logger.error(f"Worker failed: {e}", exc_info=True)
@@ -0,0 +1,97 @@
+"""Shared keep-alive HTTP client for siciliangames.com fetches
+
+One httpx.AsyncClient (HTTP/2 when `h2` is installed) lives on a dedicated
+event loop in a daemon thread, so its connection pool survives across requests
+even though agent nodes run each request in a fresh `asyncio.run` loop and the
+RQ crawler is synchronous. Callers use the blocking `fetch`; async nodes run
+it (with the page's Redis caching) through asyncio.to_thread.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from typing import Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = "SicilianGamesBot/1.0 (+https://siciliangames.com)"
+DEFAULT_TIMEOUT = 10.0
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_client: Optional[httpx.AsyncClient] = None
+_pid: Optional[int] = None
+_lock = threading.Lock()
+
+
+@dataclass
+class FetchResult:
+    """Outcome of a (conditional) GET"""
+    status: int
+    content: bytes = b""
+    etag: str = ""
+    last_modified: str = ""
+    http_version: str = ""
+
+    @property
+    def not_modified(self) -> bool:
+        return self.status == 304
+
+
+def _ensure_client() -> asyncio.AbstractEventLoop:
+    """Start the background loop and create the client on first use"""
+    global _loop, _client, _pid
+    with _lock:
+        # A forked child (RQ work horse) inherits the globals but not the loop thread
+        if _loop is None or _pid != os.getpid():
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="http-client-loop", daemon=True).start()
+
+            async def create_client() -> httpx.AsyncClient:
+                return httpx.AsyncClient(
+                    http2=HTTP2_AVAILABLE,
+                    follow_redirects=True,
+                    timeout=DEFAULT_TIMEOUT,
+                    headers={"User-Agent": USER_AGENT},
+                    limits=httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=60),
+                )
+
+            _client = asyncio.run_coroutine_threadsafe(create_client(), loop).result()
+            _loop = loop
+            _pid = os.getpid()
+            logger.info(f"Shared HTTP client started (http2={HTTP2_AVAILABLE})")
+    return _loop
+
+
+async def _get(url: str, etag: str, last_modified: str, timeout: Optional[float]) -> FetchResult:
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    resp = await _client.get(url, headers=headers, timeout=timeout or DEFAULT_TIMEOUT)
+    if resp.status_code != 304:
+        resp.raise_for_status()
+    return FetchResult(
+        status=resp.status_code,
+        content=resp.content if resp.status_code != 304 else b"",
+        etag=resp.headers.get("ETag", etag),
+        last_modified=resp.headers.get("Last-Modified", last_modified),
+        http_version=resp.http_version,
+    )
+
+
+def fetch(url: str, etag: str = "", last_modified: str = "", timeout: Optional[float] = None) -> FetchResult:
+    """GET `url`, revalidating against the given validators (blocking)"""
+    loop = _ensure_client()
+    future = asyncio.run_coroutine_threadsafe(_get(url, etag, last_modified, timeout), loop)
+    return future.result((timeout or DEFAULT_TIMEOUT) + 5)
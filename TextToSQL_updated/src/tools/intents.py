@@ -0,0 +1,152 @@
+"""Intent/slot layer for high-frequency sports_rules questions
+
+Recognized questions are answered with a prepared parameterized statement,
+bypassing schema lookup and LLM SQL generation entirely.
+"""
+
+import logging
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+from langchain_community.utilities import SQLDatabase
+from sqlalchemy import inspect, text
+
+from .slots import find_chapter_size, normalize_question
+
+logger = logging.getLogger(__name__)
+
+RULES_TABLE = "sports_rules"
+SPORT_COLUMN_CANDIDATES = ("sport_name", "sport")
+VOCABULARY_REFRESH_INTERVAL = 600  # Seconds between sport-name reloads
+
+
+@dataclass
+class Intent:
+    """A question shape answered by a fixed statement over (sport, chapter_size)"""
+    name: str
+    trigger: re.Pattern                   # Must match the normalized question
+    columns: tuple[str, ...]              # Selected from sports_rules besides sport and chapter_size
+    exclude: Optional[re.Pattern] = None  # Question is not this intent if this matches
+
+
+@dataclass
+class IntentMatch:
+    """A recognized intent with its bound statement"""
+    intent: str
+    sql: str
+    parameters: dict = field(default_factory=dict)
+
+
+INTENTS = (
+    Intent(
+        name="limitation_notes",
+        trigger=re.compile(r"\b(limitations?|restrictions?|restricted|special rules?|how many events)\b"),
+        columns=("limitation_notes",),
+    ),
+    Intent(
+        name="participation_quota",
+        trigger=re.compile(
+            r"\b(how many|quota|limit|max|maximum|allowed|allow|send|participation|participate|entries|entry)\b"
+        ),
+        # Same words, different columns: team size, squad, schedule, results
+        exclude=re.compile(
+            r"\b(playing|squad|field|court|substitutes?|venues?|dates?|when|where|schedule|fixtures?|"
+            r"results?|winners?|won|score)\b"
+        ),
+        columns=("max_participation_per_chapter",),
+    ),
+)
+
+
+class IntentRouter:
+    """Matches questions against INTENTS using sport names loaded from the database"""
+
+    def __init__(self, db: Optional[SQLDatabase], sport_column: Optional[str] = None,
+                 sports: Optional[list[str]] = None):
+        """Initialize intent router
+
+        Args:
+            db: Database the rules table lives in
+            sport_column: Sport name column; detected from the table when omitted
+            sports: Known sport names; loaded with SELECT DISTINCT when omitted
+        """
+        self.db = db
+        self.sport_column = sport_column
+        self._lock = threading.Lock()
+        self._sports: dict[str, str] = {}  # normalized name -> stored value
+        self._sport_re: Optional[re.Pattern] = None
+        self._loaded_at = 0.0
+        if sports is not None:
+            self._set_sports(sports)
+            self._loaded_at = float("inf")
+
+    def _set_sports(self, sports: list[str]) -> None:
+        self._sports = {normalize_question(s): s for s in sports if s and normalize_question(s)}
+        names = sorted(self._sports, key=len, reverse=True)
+        self._sport_re = (
+            re.compile(r"(?<!\w)(" + "|".join(re.escape(n) for n in names) + r")(?!\w)") if names else None
+        )
+
+    def _load_vocabulary(self) -> None:
+        """Detect the sport column and load the distinct sport names"""
+        if time.time() - self._loaded_at < VOCABULARY_REFRESH_INTERVAL:
+            return
+        self._loaded_at = time.time()
+        try:
+            if self.sport_column is None:
+                columns = {c["name"] for c in inspect(self.db._engine).get_columns(RULES_TABLE)}
+                self.sport_column = next((c for c in SPORT_COLUMN_CANDIDATES if c in columns), None)
+                if self.sport_column is None:
+                    logger.warning(f"No sport column in {RULES_TABLE}, intent routing disabled")
+                    return
+            with self.db._engine.connect() as conn:
+                rows = conn.execute(text(
+                    f"SELECT DISTINCT {self.sport_column} FROM {RULES_TABLE}"
+                )).scalars().all()
+            self._set_sports([str(r) for r in rows if r])
+            logger.info(f"Intent router loaded {len(self._sports)} sport names")
+        except Exception as e:
+            logger.error(f"Failed to load intent vocabulary: {e}")
+
+    def match(self, question: str) -> Optional[IntentMatch]:
+        """Return the bound statement for a recognized question, or None"""
+        with self._lock:
+            self._load_vocabulary()
+        if self._sport_re is None or self.sport_column is None:
+            return None
+
+        normalized = normalize_question(question)
+        sports = {self._sports[m] for m in self._sport_re.findall(normalized)}
+        if len(sports) != 1:
+            # No sport, or a comparison across sports: leave it to the LLM
+            return None
+        sport = sports.pop()
+
+        for intent in INTENTS:
+            if not intent.trigger.search(normalized):
+                continue
+            if intent.exclude and intent.exclude.search(normalized):
+                continue
+            columns = ", ".join((self.sport_column, "chapter_size") + intent.columns)
+            sql = f"SELECT {columns} FROM {RULES_TABLE} WHERE {self.sport_column} = :sport"
+            parameters = {"sport": sport}
+            chapter_size = find_chapter_size(normalized)
+            if chapter_size:
+                sql += " AND chapter_size = :chapter_size"
+                parameters["chapter_size"] = chapter_size[0]
+            return IntentMatch(intent=intent.name, sql=sql, parameters=parameters)
+        return None
+
+
+_intent_router: Optional[IntentRouter] = None
+
+
+def get_intent_router(db: SQLDatabase) -> IntentRouter:
+    """Process-wide IntentRouter, so the sport vocabulary is loaded once per refresh interval"""
+    global _intent_router
+    if _intent_router is None or _intent_router.db is not db:
+        _intent_router = IntentRouter(db)
+    return _intent_router
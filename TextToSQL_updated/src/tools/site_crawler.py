@@ -0,0 +1,139 @@
+"""Background crawler for the siciliangames.com pages used by web_search_node
+
+Runs as a self-rescheduling RQ job (see src/queue/tasks.py). Each crawl
+revalidates pages with conditional GETs, stores their full text and passages
+in Redis, and bumps a version counter so every process's SiteIndex reloads.
+"""
+
+import json
+import logging
+import time
+from typing import Optional
+
+from src.config import Settings
+from src.core.dependencies import get_redis_client
+from src.utils import metrics
+from . import http_client
+from .web_scraper import PAGE_TEXT_KEY, extract_text, get_topic_router
+
+logger = logging.getLogger(__name__)
+
+META_KEY = "site_crawl:meta:{url}"          # hash: etag, last_modified, fetched_at, status
+PASSAGES_KEY = "site_crawl:passages:{url}"  # JSON list of passage strings
+VERSION_KEY = "site_crawl:version"          # incremented whenever any page changes
+SCHEDULED_KEY = "site_crawl:scheduled"      # set while a crawl job is queued or scheduled
+
+
+def crawl_urls() -> list[str]:
+    """Pages to keep fresh"""
+    return get_topic_router().urls()
+
+
+def split_passages(text: str, words: int = 80, overlap: int = 20) -> list[str]:
+    """Group text lines into ~`words`-word passages, repeating `overlap` words between them
+
+    Lines come from block-level elements, so table rows and list items stay
+    together; a single oversized line is split on word boundaries.
+    """
+    tokens: list[str] = []
+    breaks: set[int] = set()  # token offsets where a line starts
+    for line in text.splitlines():
+        line_words = line.split()
+        if line_words:
+            breaks.add(len(tokens))
+            tokens.extend(line_words)
+
+    passages = []
+    start = 0
+    while start < len(tokens):
+        end = min(start + words, len(tokens))
+        if end < len(tokens):
+            # Prefer ending on a line boundary in the second half of the window
+            boundary = max((b for b in breaks if start + words // 2 <= b <= end), default=None)
+            if boundary:
+                end = boundary
+        passages.append(" ".join(tokens[start:end]))
+        if end >= len(tokens):
+            break
+        start = max(end - overlap, start + 1)
+    return passages
+
+
+def crawl_page(url: str, settings: Settings, conditional: bool = True) -> str:
+    """Revalidate one page and store its text and passages
+
+    Args:
+        url: Page to crawl
+        settings: Application settings containing the crawl configuration
+        conditional: Send the stored validators (If-None-Match / If-Modified-Since)
+
+    Returns:
+        "modified", "not_modified" or "error"
+    """
+    redis_client = get_redis_client()
+    meta_key = META_KEY.format(url=url)
+    meta = redis_client.hgetall(meta_key)
+
+    etag = meta.get("etag", "") if conditional else ""
+    last_modified = meta.get("last_modified", "") if conditional else ""
+    try:
+        resp = http_client.fetch(url, etag, last_modified, timeout=settings.site_crawl.timeout)
+        if resp.not_modified:
+            redis_client.hset(meta_key, mapping={"fetched_at": time.time(), "status": 304})
+            return "not_modified"
+    except Exception as e:
+        logger.warning(f"Crawl failed for {url}: {e}")
+        redis_client.hset(meta_key, mapping={"status": "error", "error": str(e)[:200]})
+        return "error"
+
+    text = extract_text(resp.content, separator="\n")
+    passages = split_passages(text, settings.site_crawl.passage_words, settings.site_crawl.passage_overlap)
+    pipe = redis_client.pipeline()
+    pipe.set(PAGE_TEXT_KEY.format(url=url), text)
+    pipe.set(PASSAGES_KEY.format(url=url), json.dumps(passages))
+    pipe.hset(meta_key, mapping={
+        "etag": resp.etag,
+        "last_modified": resp.last_modified,
+        "fetched_at": time.time(),
+        "status": resp.status,
+        "http_version": resp.http_version,
+        "passages": len(passages),
+    })
+    pipe.incr(VERSION_KEY)
+    pipe.execute()
+    logger.info(f"Crawled {url}: {len(passages)} passages")
+    return "modified"
+
+
+def crawl_site(settings: Optional[Settings] = None) -> dict:
+    """Crawl every page once; returns {outcome: count}"""
+    settings = settings or Settings.from_env()
+    if not get_redis_client():
+        logger.error("Redis unavailable, skipping site crawl")
+        return {}
+
+    start_time = time.time()
+    outcomes: dict[str, int] = {}
+    for url in crawl_urls():
+        outcome = crawl_page(url, settings)
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+        metrics.increment("site_crawl_pages", outcome=outcome)
+    metrics.observe("site_crawl_seconds", time.time() - start_time)
+    logger.critical(f"Site crawl completed in {time.time() - start_time:.2f} seconds: {outcomes}")
+    return outcomes
+
+
+def load_page_passages(url: str, settings: Optional[Settings] = None) -> list[str]:
+    """Passages of one page, crawling it now if the background crawl hasn't yet"""
+    settings = settings or Settings.from_env()
+    redis_client = get_redis_client()
+    if redis_client:
+        raw = redis_client.get(PASSAGES_KEY.format(url=url))
+        if raw is None and crawl_page(url, settings, conditional=False) == "modified":
+            raw = redis_client.get(PASSAGES_KEY.format(url=url))
+        return json.loads(raw or "[]")
+
+    # No Redis: fetch and split without storing
+    resp = http_client.fetch(url, timeout=settings.site_crawl.timeout)
+    text = extract_text(resp.content, separator="\n")
+    return split_passages(text, settings.site_crawl.passage_words, settings.site_crawl.passage_overlap)
@@ -0,0 +1,221 @@
+"""Structured facts extracted from crawled siciliangames.com pages
+
+When the crawler stores new text for a page, an LLM extracts its schedule
+entries, winners, sponsors and contacts once into compact JSON in Redis.
+web_search_node then answers common questions from these facts: list
+questions (sponsors, contacts) by a plain lookup, the rest with a prompt that
+carries only the matching entries instead of page passages.
+"""
+
+import hashlib
+import json
+import logging
+import time
+from typing import Iterable, Optional
+
+from pydantic import BaseModel, Field
+
+from src.core.dependencies import get_redis_client
+from src.core.llm_calls import get_llm_caller
+from src.core.site_index import tokenize
+from src.prompts.system_prompts import get_page_facts_prompt
+from src.utils import metrics
+from .web_scraper import PAGE_TEXT_KEY
+
+logger = logging.getLogger(__name__)
+
+FACTS_KEY = "site_crawl:facts:{url}"  # JSON: text_hash, extracted_at, facts
+
+EXTRACTION_CHUNK_WORDS = 1500
+
+# Kinds answered by listing every entry when the question names no particular one
+LIST_KINDS = ("sponsors", "contacts")
+
+
+class ScheduleEntry(BaseModel):
+    """One scheduled match or event"""
+    sport: str = Field(description="Sport name")
+    event: Optional[str] = Field(default=None, description="Event, category or round, e.g. Men's Singles Final")
+    teams: Optional[str] = Field(default=None, description="Chapters or teams playing, if listed")
+    date: Optional[str] = Field(default=None, description="Date as written on the page")
+    time: Optional[str] = Field(default=None, description="Start time as written on the page")
+    venue: Optional[str] = Field(default=None, description="Venue or court")
+
+
+class WinnerEntry(BaseModel):
+    """One podium placing"""
+    sport: str = Field(description="Sport name")
+    event: Optional[str] = Field(default=None, description="Event or category")
+    position: Optional[str] = Field(default=None, description="Winner, Runner Up, Gold, Silver, ...")
+    winner: str = Field(description="Person or team placed")
+    chapter: Optional[str] = Field(default=None, description="Chapter the winner represents")
+
+
+class Sponsor(BaseModel):
+    """One sponsor or partner"""
+    name: str = Field(description="Sponsor name")
+    category: Optional[str] = Field(default=None, description="Sponsorship tier or role, e.g. Title Partner")
+
+
+class Contact(BaseModel):
+    """One contact person or channel"""
+    name: Optional[str] = Field(default=None, description="Person or desk name")
+    role: Optional[str] = Field(default=None, description="Role or responsibility")
+    phone: Optional[str] = Field(default=None, description="Phone number")
+    email: Optional[str] = Field(default=None, description="Email address")
+
+
+class PageFacts(BaseModel):
+    """Everything extractable from one page; lists are empty when the page has none"""
+    schedule: list[ScheduleEntry] = Field(default_factory=list)
+    winners: list[WinnerEntry] = Field(default_factory=list)
+    sponsors: list[Sponsor] = Field(default_factory=list)
+    contacts: list[Contact] = Field(default_factory=list)
+
+
+FACT_KINDS = tuple(PageFacts.model_fields)
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _chunks(text: str, words: int) -> list[str]:
+    """Split text on line boundaries into chunks of at most ~`words` words"""
+    chunks, current, count = [], [], 0
+    for line in text.splitlines():
+        line_words = len(line.split())
+        if current and count + line_words > words:
+            chunks.append("\n".join(current))
+            current, count = [], 0
+        current.append(line)
+        count += line_words
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def merge_facts(parts: Iterable[PageFacts]) -> dict[str, list[dict]]:
+    """Combine per-chunk extractions into compact JSON, dropping empty fields and duplicates"""
+    merged: dict[str, list[dict]] = {kind: [] for kind in FACT_KINDS}
+    seen: set[tuple] = set()
+    for part in parts:
+        for kind in FACT_KINDS:
+            for entry in getattr(part, kind):
+                compact = {k: v.strip() for k, v in entry.model_dump().items() if v and v.strip()}
+                key = (kind, tuple(sorted((k, v.lower()) for k, v in compact.items())))
+                if compact and key not in seen:
+                    seen.add(key)
+                    merged[kind].append(compact)
+    return {kind: entries for kind, entries in merged.items() if entries}
+
+
+def extract_page_facts(text: str, llm) -> dict[str, list[dict]]:
+    """Extract the structured facts of one page's text with `llm`"""
+    llm_caller = get_llm_caller()
+    structured_llm = llm_caller.limited(llm, "page_facts").with_structured_output(PageFacts)
+    parts = []
+    for chunk in _chunks(text, EXTRACTION_CHUNK_WORDS):
+        parts.append(llm_caller.invoke("page_facts", structured_llm, [
+            {"role": "system", "content": get_page_facts_prompt()},
+            {"role": "user", "content": chunk},
+        ]))
+    return merge_facts(parts)
+
+
+def refresh_page_facts(url: str, llm) -> str:
+    """Re-extract a page's facts if its stored text changed since the last extraction
+
+    Returns:
+        "extracted", "unchanged", "no_text" or "error"
+    """
+    redis_client = get_redis_client()
+    text = redis_client.get(PAGE_TEXT_KEY.format(url=url))
+    if not text:
+        return "no_text"
+
+    digest = text_hash(text)
+    stored = redis_client.get(FACTS_KEY.format(url=url))
+    if stored and json.loads(stored).get("text_hash") == digest:
+        return "unchanged"
+
+    try:
+        facts = extract_page_facts(text, llm)
+    except Exception as e:
+        logger.warning(f"Fact extraction failed for {url}: {e}")
+        return "error"
+    redis_client.set(FACTS_KEY.format(url=url), json.dumps({
+        "text_hash": digest,
+        "extracted_at": time.time(),
+        "facts": facts,
+    }))
+    logger.info(f"Extracted facts for {url}: { {kind: len(entries) for kind, entries in facts.items()} }")
+    return "extracted"
+
+
+def refresh_site_facts(urls: list[str], llm) -> dict:
+    """Refresh the facts of every crawled page; returns {outcome: count}"""
+    start_time = time.time()
+    outcomes: dict[str, int] = {}
+    for url in urls:
+        outcome = refresh_page_facts(url, llm)
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+        metrics.increment("site_facts_pages", outcome=outcome)
+    logger.critical(f"Site fact extraction completed in {time.time() - start_time:.2f} seconds: {outcomes}")
+    return outcomes
+
+
+def load_facts(urls: list[str]) -> dict[str, list[dict]]:
+    """Stored facts of `urls`, merged by kind (empty if none extracted yet)"""
+    redis_client = get_redis_client()
+    if not redis_client or not urls:
+        return {}
+    facts: dict[str, list[dict]] = {}
+    for raw in redis_client.mget([FACTS_KEY.format(url=url) for url in urls]):
+        if raw:
+            for kind, entries in json.loads(raw).get("facts", {}).items():
+                facts.setdefault(kind, []).extend(entries)
+    return facts
+
+
+def select_facts(facts: dict[str, list[dict]], question: str, kinds: list[str],
+                 limit: int = 12, ignore: Iterable[str] = ()) -> dict[str, list[dict]]:
+    """Entries of `kinds` relevant to `question`
+
+    Entries are scored by how many of the question's terms (minus the routing
+    keywords in `ignore`) appear in their values; the best-scoring ones are
+    kept. When the question names nothing specific, a kind is returned whole
+    only if it has at most `limit` entries. Returns {} when nothing fits, so the
+    caller falls back to passages.
+    """
+    ignored = {term for phrase in ignore for term in tokenize(phrase)}
+    terms = set(tokenize(question)) - ignored
+    selected: dict[str, list[dict]] = {}
+    for kind in kinds:
+        entries = facts.get(kind, [])
+        scored = []
+        for entry in entries:
+            entry_terms = set(tokenize(" ".join(entry.values())))
+            score = len(terms & entry_terms)
+            if score:
+                scored.append((score, entry))
+        if scored:
+            best = max(score for score, _ in scored)
+            selected[kind] = [entry for score, entry in sorted(scored, key=lambda item: -item[0])
+                              if score == best][:limit]
+        elif entries and len(entries) <= limit:
+            selected[kind] = entries
+    return selected
+
+
+def render_fact_list(kind: str, entries: list[dict]) -> str:
+    """Plain answer listing every sponsor or contact entry"""
+    if kind == "sponsors":
+        lines = [f"• {e['name']}" + (f" ({e['category']})" if e.get("category") else "") for e in entries]
+        return "Sicilian Games is supported by these sponsors 🤝\n" + "\n".join(lines)
+    lines = []
+    for entry in entries:
+        who = " – ".join(v for v in (entry.get("name"), entry.get("role")) if v)
+        reach = ", ".join(v for v in (entry.get("phone"), entry.get("email")) if v)
+        lines.append("• " + ": ".join(v for v in (who, reach) if v))
+    return "You can reach the Sicilian Games team here 📞\n" + "\n".join(lines)
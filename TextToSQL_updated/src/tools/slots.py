@@ -0,0 +1,52 @@
+"""Slot vocabulary shared by the verified-example store and intent templates"""
+
+import re
+from typing import Optional
+
+# Same mapping get_generate_query_prompt gives the model
+CHAPTER_SIZES = ("Above 75", "40 to 75 or Merged", "Below 40")
+
+CHAPTER_SIZE_SYNONYMS = {
+    "Above 75": ("above 75", "above-75", "more than 75", "over 75", ">75", "> 75", "big", "large"),
+    "40 to 75 or Merged": (
+        "40 to 75 or merged", "40 to 75", "40-75", "40 - 75", "40–75", "between 40 and 75",
+        "medium", "merged",
+    ),
+    "Below 40": ("below 40", "below-40", "less than 40", "under 40", "<40", "< 40", "small"),
+}
+
+_CHAPTER_SIZE_BY_PHRASE = {
+    phrase: size for size, phrases in CHAPTER_SIZE_SYNONYMS.items() for phrase in phrases
+}
+
+# Longest phrases first so "40 to 75 or merged" wins over "40 to 75" and "merged"
+CHAPTER_SIZE_PATTERN = "|".join(
+    re.escape(p) for p in sorted(_CHAPTER_SIZE_BY_PHRASE, key=len, reverse=True)
+)
+_CHAPTER_SIZE_RE = re.compile(r"(?<![\w<>])(?:" + CHAPTER_SIZE_PATTERN + r")(?!\w)", re.IGNORECASE)
+
+_PUNCTUATION_RE = re.compile(r"[^\w\s<>+\-–']")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase, drop punctuation (keeping <, >, -, +) and collapse whitespace"""
+    text = _PUNCTUATION_RE.sub(" ", question.lower())
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+def chapter_size_from_phrase(phrase: str) -> Optional[str]:
+    """Map a chapter-size phrase ("small", "<40", ...) to its canonical value"""
+    return _CHAPTER_SIZE_BY_PHRASE.get(phrase.lower().strip())
+
+
+def find_chapter_size(text: str) -> Optional[tuple[str, int, int]]:
+    """Find the first chapter-size phrase in `text`
+
+    Returns:
+        (canonical chapter size, start, end) or None
+    """
+    match = _CHAPTER_SIZE_RE.search(text)
+    if not match:
+        return None
+    return _CHAPTER_SIZE_BY_PHRASE[match.group(0).lower()], match.start(), match.end()
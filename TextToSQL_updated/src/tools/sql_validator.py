@@ -0,0 +1,212 @@
+"""Deterministic SQL validation (replaces the LLM check_query call)"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Iterable, Optional
+
+# Same rules the old check_query prompt asked the model to enforce
+FORBIDDEN_KEYWORDS = (
+    # DDL
+    "CREATE", "ALTER", "DROP", "TRUNCATE", "RENAME",
+    # DML
+    "INSERT", "UPDATE", "DELETE", "MERGE", "REPLACE", "UPSERT",
+    # DCL / TCL
+    "GRANT", "REVOKE", "COMMIT", "ROLLBACK", "SAVEPOINT",
+    # Other side effects
+    "LOCK", "UNLOCK", "CALL", "EXEC", "EXECUTE", "HANDLER", "LOAD", "OUTFILE", "DUMPFILE",
+)
+
+# A keyword directly followed by "(" is a function call (e.g. MySQL's REPLACE(str, a, b))
+_FORBIDDEN_RE = re.compile(r"\b(" + "|".join(FORBIDDEN_KEYWORDS) + r")\b(?!\s*\()", re.IGNORECASE)
+_TABLE_REF_RE = re.compile(r"\b(FROM|JOIN)\s+", re.IGNORECASE)
+_TABLE_NAME_RE = re.compile(r"[`\"]?\w+[`\"]?(?:\s*\.\s*[`\"]?\w+[`\"]?)*")
+# Ends a FROM clause; JOINs inside it are left to their own match, but their ON
+# conditions have no top-level commas, so "FROM a JOIN b ON ..., c" still splits on c
+_FROM_END_RE = re.compile(r"\b(WHERE|GROUP|ORDER|HAVING|LIMIT|UNION|INTERSECT|EXCEPT|WINDOW|FOR)\b", re.IGNORECASE)
+_CTE_NAME_RE = re.compile(r"(?:\bWITH|,)\s*(?:RECURSIVE\s+)?([`\"]?\w+[`\"]?)\s*(?:\([^)]*\))?\s+AS\s*\(", re.IGNORECASE)
+_CODE_FENCE_RE = re.compile(r"^```(?:sql)?\s*|\s*```$", re.IGNORECASE)
+
+
+@dataclass
+class ValidationResult:
+    """Outcome of validating a generated SQL query"""
+    valid: bool
+    sql: str
+    error: Optional[str] = None
+    tables: list[str] = field(default_factory=list)
+
+
+def clean_sql(sql: str) -> str:
+    """Strip markdown code fences, surrounding whitespace and a trailing semicolon"""
+    sql = _CODE_FENCE_RE.sub("", sql.strip()).strip()
+    return sql[:-1].rstrip() if sql.endswith(";") else sql
+
+
+def _mask_literals(sql: str) -> tuple[str, Optional[str]]:
+    """Blank out string literals and comments so keyword checks only see SQL.
+
+    Returns the masked text and an error message for unterminated constructs.
+    """
+    out = []
+    i, n = 0, len(sql)
+    while i < n:
+        ch = sql[i]
+        if ch in ("'", '"', "`"):
+            quote = ch
+            j = i + 1
+            while j < n:
+                if sql[j] == "\\" and quote != "`":
+                    j += 2
+                    continue
+                if sql[j] == quote:
+                    if j + 1 < n and sql[j + 1] == quote:  # doubled quote escape
+                        j += 2
+                        continue
+                    break
+                j += 1
+            if j >= n:
+                return "", f"Unterminated {quote} literal"
+            # Backticks quote identifiers, keep the name visible for table checks
+            out.append(sql[i:j + 1] if quote == "`" else quote + " " * (j - i - 1) + quote)
+            i = j + 1
+        elif sql.startswith("--", i) or ch == "#":
+            j = sql.find("\n", i)
+            j = n if j == -1 else j
+            out.append(" " * (j - i))
+            i = j
+        elif sql.startswith("/*", i):
+            j = sql.find("*/", i + 2)
+            if j == -1:
+                return "", "Unterminated /* comment"
+            out.append(" " * (j + 2 - i))
+            i = j + 2
+        else:
+            out.append(ch)
+            i += 1
+    return "".join(out), None
+
+
+def _normalize_identifier(name: str) -> str:
+    return name.split(".")[-1].strip().strip("`\"").lower()
+
+
+def _qualifier(name: str) -> Optional[str]:
+    """The schema part of a qualified table name (`db`.t -> "db"), else None"""
+    parts = [part.strip().strip("`\"").lower() for part in name.split(".")]
+    return ".".join(parts[:-1]) or None
+
+
+def _in_function_call(masked: str, pos: int) -> bool:
+    """True when `pos` sits inside a parenthesis that is not a subquery,
+    e.g. the FROM in EXTRACT(YEAR FROM d) or TRIM(x FROM y)."""
+    opens = []
+    for i, ch in enumerate(masked[:pos]):
+        if ch == "(":
+            opens.append(i)
+        elif ch == ")" and opens:
+            opens.pop()
+    if not opens:
+        return False
+    inner = masked[opens[-1] + 1:pos].lstrip()
+    return not inner.upper().startswith(("SELECT", "WITH"))
+
+
+def _from_items(masked: str, pos: int) -> list[str]:
+    """The comma-separated items of the FROM list starting at `pos` (FROM a, b x, (SELECT ...) y)"""
+    items, current, depth = [], "", 0
+    for i in range(pos, len(masked)):
+        ch = masked[i]
+        if depth == 0 and (ch == ")" or _FROM_END_RE.match(masked, i)):
+            break
+        depth += ch == "("
+        depth -= ch == ")"
+        if depth == 0 and ch == ",":
+            items.append(current)
+            current = ""
+        else:
+            current += ch
+    items.append(current)
+    return items
+
+
+def _table_refs(masked: str, match: re.Match) -> list[str]:
+    """Table names referenced by one FROM or JOIN (subqueries have their own)"""
+    items = _from_items(masked, match.end()) if match.group(1).upper() == "FROM" else [masked[match.end():]]
+    names = (_TABLE_NAME_RE.match(item.strip()) for item in items)
+    return [name.group(0) for name in names if name]
+
+
+def validate_sql(
+    sql: Optional[str], allowed_tables: Optional[Iterable[str]] = None, database: Optional[str] = None
+) -> ValidationResult:
+    """Validate that `sql` is a single read-only SELECT over known tables
+
+    Args:
+        sql: Generated SQL text
+        allowed_tables: Usable table names; references outside this set are rejected
+        database: The connected database; tables qualified with any other schema
+            (information_schema.tables, other_db.t) are rejected
+
+    Returns:
+        ValidationResult with a concrete error message when invalid
+    """
+    if not sql or not sql.strip():
+        return ValidationResult(False, "", "No SQL query was generated")
+
+    sql = clean_sql(sql)
+    masked, error = _mask_literals(sql)
+    if error:
+        return ValidationResult(False, sql, error)
+
+    if ";" in masked:
+        return ValidationResult(False, sql, "Multiple SQL statements are not allowed")
+
+    first_word = masked.lstrip("( \n\t").split(None, 1)[0].upper() if masked.strip() else ""
+    if first_word not in ("SELECT", "WITH"):
+        return ValidationResult(False, sql, f"Only SELECT queries are allowed, got '{first_word or sql[:20]}'")
+
+    forbidden = _FORBIDDEN_RE.search(masked)
+    if forbidden:
+        return ValidationResult(False, sql, f"Forbidden keyword '{forbidden.group(1).upper()}' in query")
+
+    depth = 0
+    for ch in masked:
+        depth += ch == "("
+        depth -= ch == ")"
+        if depth < 0:
+            break
+    if depth != 0:
+        return ValidationResult(False, sql, "Unbalanced parentheses")
+
+    cte_names = {_normalize_identifier(m) for m in _CTE_NAME_RE.findall(masked)}
+    tables, foreign = [], []
+    for match in _TABLE_REF_RE.finditer(masked):
+        if _in_function_call(masked, match.start()):
+            continue
+        for ref in _table_refs(masked, match):
+            name = _normalize_identifier(ref)
+            schema = _qualifier(ref)
+            if schema is not None and schema != (database or "").lower():
+                if f"{schema}.{name}" not in foreign:
+                    foreign.append(f"{schema}.{name}")
+            elif name not in cte_names and name not in tables:
+                tables.append(name)
+
+    if foreign:
+        return ValidationResult(
+            False, sql,
+            f"Table(s) outside the {database or 'current'} database: {', '.join(foreign)}",
+            tables,
+        )
+
+    if allowed_tables is not None:
+        allowed = {t.lower() for t in allowed_tables}
+        unknown = [t for t in tables if t not in allowed]
+        if unknown:
+            return ValidationResult(
+                False, sql,
+                f"Unknown table(s): {', '.join(unknown)}. Available tables: {', '.join(sorted(allowed))}",
+                tables,
+            )
+
+    return ValidationResult(True, sql, None, tables)
@@ -0,0 +1,157 @@
+"""Direct page scraping for siciliangames.com questions"""
+
+import json
+import logging
+import os
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+from bs4 import BeautifulSoup
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as SelectolaxParser
+except ImportError:
+    SelectolaxParser = None
+
+try:
+    from lxml import etree, html as lxml_html
+except ImportError:
+    etree = lxml_html = None
+
+logger = logging.getLogger(__name__)
+
+_SKIP_TAGS = ("script", "style", "noscript", "template")
+
+SITE_DOMAIN = "siciliangames.com"
+
+# Topic keywords, synonyms, weights and URLs
+DEFAULT_TOPICS_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "config", "web_topics.json")
+
+# Written by the background crawler (src/tools/site_crawler.py)
+PAGE_TEXT_KEY = "site_crawl:text:{url}"
+
+
+@dataclass
+class WebTopic:
+    """A group of keywords that routes questions to one or more pages"""
+    name: str
+    keywords: list[str]
+    urls: list[str]
+    weight: float = 1.0
+    facts: Optional[str] = None  # Kind of extracted site facts that answers this topic (see site_facts)
+
+
+class TopicRouter:
+    """Routes questions to siciliangames.com pages with one compiled keyword regex
+
+    All keywords of all topics are alternatives of a single pattern, so routing
+    costs one regex scan regardless of the number of topics. Each topic scores
+    its weight times the number of distinct keywords it matched; a URL scores
+    the sum of its topics, and every matched URL is returned best first.
+    """
+
+    def __init__(self, topics: list[WebTopic]):
+        self.topics = topics
+        self._topics_by_keyword: dict[str, list[WebTopic]] = {}
+        for topic in topics:
+            for keyword in topic.keywords:
+                key = " ".join(keyword.lower().split())
+                if topic not in self._topics_by_keyword.setdefault(key, []):
+                    self._topics_by_keyword[key].append(topic)
+        # Longest first so "match timings" wins over "match timing"; spaces match any whitespace
+        alternatives = sorted(self._topics_by_keyword, key=len, reverse=True)
+        self._pattern = re.compile(
+            r"(?<!\w)(" + "|".join(re.escape(k).replace(r"\ ", r"\s+") for k in alternatives) + r")(?!\w)",
+            re.IGNORECASE,
+        ) if alternatives else None
+
+    @classmethod
+    def from_file(cls, path: str) -> "TopicRouter":
+        with open(path, encoding="utf-8") as f:
+            config = json.load(f)
+        return cls([WebTopic(**topic) for topic in config["topics"]])
+
+    def urls(self) -> list[str]:
+        """Every URL any topic can route to"""
+        return sorted({url for topic in self.topics for url in topic.urls})
+
+    def match(self, question: str) -> list[tuple[WebTopic, float]]:
+        """Topics matched by `question` with their scores, highest first"""
+        if not self._pattern:
+            return []
+        matched = {" ".join(m.lower().split()) for m in self._pattern.findall(question)}
+        topic_scores: dict[str, float] = {}
+        topics = {}
+        for keyword in matched:
+            for topic in self._topics_by_keyword[keyword]:
+                topic_scores[topic.name] = topic_scores.get(topic.name, 0.0) + topic.weight
+                topics[topic.name] = topic
+        return sorted(((topics[name], score) for name, score in topic_scores.items()),
+                      key=lambda item: item[1], reverse=True)
+
+    def route(self, question: str) -> list[str]:
+        """URLs for `question`, highest score first (empty if no topic matches)"""
+        url_scores: dict[str, float] = {}
+        for topic, score in self.match(question):
+            for url in topic.urls:
+                url_scores[url] = url_scores.get(url, 0.0) + score
+        return sorted(url_scores, key=lambda url: url_scores[url], reverse=True)
+
+
+_topic_router: Optional[TopicRouter] = None
+
+
+def get_topic_router() -> TopicRouter:
+    """Process-wide TopicRouter loaded from WEB_TOPICS_PATH"""
+    global _topic_router
+    if _topic_router is None:
+        path = os.getenv("WEB_TOPICS_PATH", DEFAULT_TOPICS_PATH)
+        _topic_router = TopicRouter.from_file(path)
+        logger.info(f"Loaded {len(_topic_router.topics)} web topics from {path}")
+    return _topic_router
+
+
+def _extract_selectolax(html: bytes, separator: str) -> str:
+    tree = SelectolaxParser(html)
+    tree.strip_tags(list(_SKIP_TAGS))
+    root = tree.root
+    return root.text(deep=True, separator=separator, strip=True) if root else ""
+
+
+def _extract_lxml(html: bytes, separator: str) -> str:
+    doc = lxml_html.fromstring(html)
+    etree.strip_elements(doc, *_SKIP_TAGS, etree.Comment, with_tail=False)
+    return separator.join(t.strip() for t in doc.itertext() if t.strip())
+
+
+def _extract_bs4(html: bytes, separator: str) -> str:
+    soup = BeautifulSoup(html, 'html.parser')
+
+    # Remove script/style
+    for script in soup(list(_SKIP_TAGS)):
+        script.decompose()
+
+    return soup.get_text(separator=separator, strip=True)
+
+
+# Fastest available first; BeautifulSoup's pure-Python parser is the fallback
+HTML_EXTRACTORS = {
+    name: extractor
+    for name, extractor, available in (
+        ("selectolax", _extract_selectolax, SelectolaxParser is not None),
+        ("lxml", _extract_lxml, lxml_html is not None),
+        ("bs4", _extract_bs4, True),
+    )
+    if available
+}
+
+
+def extract_text(html: bytes, separator: str = ' ') -> str:
+    """Visible text of an HTML page (scripts and styles removed)"""
+    for name, extractor in HTML_EXTRACTORS.items():
+        try:
+            return extractor(html, separator)
+        except Exception as e:
+            logger.warning(f"{name} failed to parse page, trying next parser: {e}")
+    return ""
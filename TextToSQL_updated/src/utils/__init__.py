@@ -1,4 +1,4 @@
 """Utils module exports"""
 
-# Currently no exports - logging module disabled
-__all__ = []
+# Logging module disabled; metrics is imported as a module (src.utils.metrics)
+__all__ = ["metrics"]
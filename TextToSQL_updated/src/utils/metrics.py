@@ -0,0 +1,94 @@
+"""Lightweight Redis-backed metrics shared by the API and RQ workers
+
+Counters and observations are stored in Redis hashes (`metrics:<name>`) keyed
+by their labels, so every process contributes to the same totals. Recording is
+best-effort: if Redis is unavailable the call is logged and dropped.
+"""
+
+import logging
+from typing import Optional, Sequence
+
+from src.core.dependencies import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+METRICS_PREFIX = "metrics"
+
+
+def _label_key(labels: dict) -> str:
+    """Render labels as a stable `k=v,k2=v2` hash field"""
+    if not labels:
+        return "_"
+    return ",".join(f"{k}={labels[k]}" for k in sorted(labels))
+
+
+def _number(value: str):
+    try:
+        return int(value)
+    except ValueError:
+        return float(value)
+
+
+def increment(name: str, amount: int = 1, **labels) -> None:
+    """Increment a counter, e.g. increment("sql_attempts", attempts=2, outcome="success")"""
+    redis_client = get_redis_client()
+    if not redis_client:
+        return
+    try:
+        redis_client.hincrby(f"{METRICS_PREFIX}:{name}", _label_key(labels), amount)
+    except Exception as e:
+        logger.debug(f"Failed to record metric {name}: {e}")
+
+
+def observe(name: str, value: float, buckets: Optional[Sequence[float]] = None, **labels) -> None:
+    """Record an observation (latency, size, ...) as count/sum/max plus optional buckets"""
+    redis_client = get_redis_client()
+    if not redis_client:
+        return
+    label_key = _label_key(labels)
+    key = f"{METRICS_PREFIX}:{name}"
+    try:
+        pipe = redis_client.pipeline()
+        pipe.hincrby(key, f"{label_key}|count", 1)
+        pipe.hincrbyfloat(key, f"{label_key}|sum", float(value))
+        if buckets:
+            bucket = next((b for b in sorted(buckets) if value <= b), "inf")
+            pipe.hincrby(key, f"{label_key}|le={bucket}", 1)
+        pipe.execute()
+        # Max is read-modify-write; a lost update under contention is acceptable here
+        current = redis_client.hget(key, f"{label_key}|max")
+        if current is None or float(value) > float(current):
+            redis_client.hset(key, f"{label_key}|max", float(value))
+    except Exception as e:
+        logger.debug(f"Failed to record metric {name}: {e}")
+
+
+def snapshot(names: Optional[Sequence[str]] = None) -> dict:
+    """Return all (or the named) metrics as {name: {field: value}}"""
+    redis_client = get_redis_client()
+    if not redis_client:
+        return {}
+    try:
+        if names is None:
+            keys = sorted(redis_client.scan_iter(f"{METRICS_PREFIX}:*"))
+        else:
+            keys = [f"{METRICS_PREFIX}:{n}" for n in names]
+        result = {}
+        for key in keys:
+            values = redis_client.hgetall(key)
+            if values:
+                result[key.split(":", 1)[1]] = {field: _number(v) for field, v in values.items()}
+        return result
+    except Exception as e:
+        logger.error(f"Failed to read metrics: {e}")
+        return {}
+
+
+def reset(name: Optional[str] = None) -> None:
+    """Delete one metric, or all metrics when no name is given"""
+    redis_client = get_redis_client()
+    if not redis_client:
+        return
+    keys = [f"{METRICS_PREFIX}:{name}"] if name else list(redis_client.scan_iter(f"{METRICS_PREFIX}:*"))
+    if keys:
+        redis_client.delete(*keys)
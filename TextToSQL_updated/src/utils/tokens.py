@@ -0,0 +1,59 @@
+"""Local token counting for prompt budgets
+
+Uses tiktoken's o200k_base encoding (the GPT-4o / GPT-5 tokenizer). tiktoken
+downloads the encoding file on first use; if that fails (no network, package
+missing) counts fall back to ~4 characters per token for the life of the process.
+"""
+
+import logging
+import math
+import threading
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+ENCODING_NAME = "o200k_base"
+
+_encoding = None
+_encoding_loaded = False
+_lock = threading.Lock()
+
+
+def _get_encoding():
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        with _lock:
+            if not _encoding_loaded:
+                try:
+                    import tiktoken
+                    _encoding = tiktoken.get_encoding(ENCODING_NAME)
+                except Exception as e:
+                    logger.warning(f"tiktoken {ENCODING_NAME} unavailable, estimating tokens from characters: {e}")
+                _encoding_loaded = True
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """Number of tokens in `text`"""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is None:
+        return math.ceil(len(text) / 4)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text: str, max_tokens: int, marker: str = " …[truncated]") -> str:
+    """`text` cut to at most `max_tokens` tokens (marker included)"""
+    if count_tokens(text) <= max_tokens:
+        return text
+    keep = max(0, max_tokens - count_tokens(marker))
+    encoding = _get_encoding()
+    if encoding is None:
+        return text[:keep * 4] + marker
+    return encoding.decode(encoding.encode(text, disallowed_special=())[:keep]) + marker
+
+
+def tokenizer_name() -> Optional[str]:
+    """Encoding in use, or None when estimating"""
+    return ENCODING_NAME if _get_encoding() is not None else None
@@ -0,0 +1,20 @@
+"""Shared fixtures"""
+
+import fakeredis
+import pytest
+
+from src.core import classify_batch, llm_cache, query_classifier, rate_limits, single_flight, warmup
+from src.utils import metrics
+
+REDIS_MODULES = (classify_batch, llm_cache, query_classifier, rate_limits, single_flight, warmup)
+
+
+@pytest.fixture
+def redis_client(monkeypatch):
+    """In-memory Redis behind the Redis-backed modules; metrics are discarded"""
+    client = fakeredis.FakeRedis(decode_responses=True)
+    for module in REDIS_MODULES:
+        monkeypatch.setattr(module, "get_redis_client", lambda: client)
+    monkeypatch.setattr(metrics, "increment", lambda *args, **labels: None)
+    monkeypatch.setattr(metrics, "observe", lambda *args, **labels: None)
+    return client
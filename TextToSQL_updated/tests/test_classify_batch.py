@@ -0,0 +1,83 @@
+"""Tests for micro-batched classification"""
+
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from src.config.settings import ClassifyBatchConfig, LLMCallsConfig
+from src.core.classify_batch import QUEUE_KEY, ClassifyBatcher, parse_routes
+from src.core.llm_calls import LLMCaller
+
+
+pytestmark = pytest.mark.usefixtures("redis_client")
+
+
+class BatchLLM:
+    """Labels each query in a batch prompt by keyword, recording the batch sizes"""
+
+    def __init__(self, content=None):
+        self.content = content
+        self.batches = []
+        self._lock = threading.Lock()
+
+    def bind(self, **kwargs):
+        return self
+
+    def invoke(self, messages):
+        items = json.loads(messages[-1]["content"])
+        with self._lock:
+            self.batches.append(len(items))
+        routes = [
+            {"index": item["index"], "route": "IN_DOMAIN_DB_QUERY" if "team" in item["query"] else "OUT_OF_DOMAIN"}
+            for item in items
+        ]
+        return AIMessage(content=self.content if self.content is not None else json.dumps({"routes": routes}))
+
+
+def batcher(**kwargs):
+    config = ClassifyBatchConfig(**{**dict(enabled=True, window=0.1, max_items=16, timeout=5), **kwargs})
+    return ClassifyBatcher(config, LLMCaller(LLMCallsConfig()))
+
+
+def prompt(question):
+    return [{"role": "system", "content": "classify"}, {"role": "system", "content": "history"},
+            {"role": "user", "content": question}]
+
+
+def classify_concurrently(classify_batcher, llm, questions):
+    with ThreadPoolExecutor(len(questions)) as pool:
+        return list(pool.map(lambda q: classify_batcher.classify(llm, prompt(q)), questions))
+
+
+def test_concurrent_requests_share_one_call():
+    llm = BatchLLM()
+    questions = [f"how many players per team {i}" if i % 2 else f"hello {i}" for i in range(8)]
+    labels = classify_concurrently(batcher(), llm, questions)
+    assert labels == ["OUT_OF_DOMAIN", "IN_DOMAIN_DB_QUERY"] * 4
+    assert sum(llm.batches) == 8 and len(llm.batches) < 8
+
+
+def test_batches_are_capped_and_leftovers_picked_up(redis_client):
+    llm = BatchLLM()
+    labels = classify_concurrently(batcher(max_items=3), llm, [f"team {i}" for i in range(7)])
+    assert labels == ["IN_DOMAIN_DB_QUERY"] * 7
+    assert max(llm.batches) <= 3
+    assert redis_client.llen(QUEUE_KEY) == 0
+
+
+def test_malformed_batch_output_falls_back_to_single_calls():
+    labels = classify_concurrently(batcher(), BatchLLM(content="not json"), ["team a", "team b"])
+    assert labels == [None, None]
+
+
+def test_parse_routes_drops_invalid_entries():
+    content = json.dumps({"routes": [
+        {"index": 0, "route": "IN_DOMAIN_WEB_SEARCH"},
+        {"index": 1, "route": "SOMETHING_ELSE"},
+        {"index": 7, "route": "OUT_OF_DOMAIN"},
+        {"index": 0, "route": "OUT_OF_DOMAIN"},
+    ]})
+    assert parse_routes(content, 2) == {0: "IN_DOMAIN_WEB_SEARCH"}
@@ -0,0 +1,67 @@
+"""Tests for the token-budgeted context builder"""
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from src.agents.context_builder import DROP, OLDEST, TRUNCATE, ContextBuilder, message_tokens
+
+
+def system(text):
+    return {"role": "system", "content": text}
+
+
+def tokens(messages):
+    return sum(message_tokens(m) for m in messages)
+
+
+def test_within_budget_keeps_everything_in_order():
+    messages = (
+        ContextBuilder("node", 1000)
+        .add("system", [system("rules")])
+        .add("history", [HumanMessage("hi"), AIMessage("hello")], trim=OLDEST)
+        .add("question", [{"role": "user", "content": "q"}])
+        .build()
+    )
+    assert [getattr(m, "content", None) or m["content"] for m in messages] == ["rules", "hi", "hello", "q"]
+
+
+def test_lowest_priority_part_is_trimmed_first():
+    history = [HumanMessage("old " * 50), AIMessage("older answer " * 50), HumanMessage("recent")]
+    examples = [system("example " * 40)]
+    budget = tokens([system("rules")]) + tokens(history[2:]) + tokens(examples)
+    messages = (
+        ContextBuilder("node", budget)
+        .add("system", [system("rules")])
+        .add("examples", examples, priority=1, trim=DROP)
+        .add("history", history, priority=0, trim=OLDEST)
+        .build()
+    )
+    assert examples[0] in messages
+    assert [m.content for m in messages if isinstance(m, HumanMessage)] == ["recent"]
+
+
+def test_tool_calls_are_dropped_with_their_results():
+    call = AIMessage("", tool_calls=[{"name": "sql_db_schema", "args": {"table_names": "t"}, "id": "c1"}])
+    result = ToolMessage("CREATE TABLE t (...)" * 20, tool_call_id="c1")
+    messages = (
+        ContextBuilder("node", 30)
+        .add("history", [call, result, HumanMessage("keep me")], trim=OLDEST)
+        .build()
+    )
+    assert messages == [HumanMessage("keep me")]
+
+
+def test_truncate_cuts_the_longest_message_to_fit():
+    result = {"role": "user", "content": "row, " * 2000}
+    messages = (
+        ContextBuilder("node", 300)
+        .add("system", [system("format the result")])
+        .add("result", [result], trim=TRUNCATE)
+        .build()
+    )
+    assert tokens(messages) <= 300
+    assert messages[1]["content"].endswith("[truncated]")
+
+
+def test_untrimmable_parts_are_sent_even_over_budget():
+    messages = ContextBuilder("node", 5).add("system", [system("a long system prompt " * 10)]).build()
+    assert len(messages) == 1
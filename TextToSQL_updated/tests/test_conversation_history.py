@@ -0,0 +1,83 @@
+"""Tests for bounded conversation history and rolling summaries"""
+
+import json
+
+from langchain_core.messages import AIMessage
+
+from src.config.settings import ConversationConfig
+from src.core.history import format_history, summarize_thread
+from src.utils.tokens import count_tokens
+
+
+def turns(count, answer_chars=40):
+    messages = []
+    for i in range(count):
+        messages.append({"role": "user", "content": f"question {i}", "timestamp": "2026-01-01 10:00:00"})
+        messages.append({"role": "assistant", "content": f"answer {i} " + "x" * answer_chars})
+    return messages
+
+
+def test_format_history_is_compact_json_without_timestamps():
+    text, tokens = format_history("User asked about cricket.", turns(1), 1000)
+    assert json.loads(text) == {
+        "summary": "User asked about cricket.",
+        "recent": [{"role": "user", "content": "question 0"}, {"role": "assistant", "content": "answer 0 " + "x" * 40}],
+    }
+    assert "\n" not in text
+    assert tokens == count_tokens(text)
+
+
+def test_format_history_drops_oldest_messages_to_fit_budget():
+    text, tokens = format_history("", turns(5, answer_chars=400), 300)
+    recent = json.loads(text)["recent"]
+    assert tokens <= 300
+    assert recent[-1]["content"].startswith("answer 4")
+    assert len(recent) < 10
+
+
+def test_format_history_clips_an_oversized_last_exchange():
+    text, tokens = format_history("", turns(1, answer_chars=4000), 200)
+    recent = json.loads(text)["recent"]
+    assert tokens <= 200
+    assert [m["role"] for m in recent] == ["user", "assistant"]
+    assert recent[1]["content"].endswith("…")
+
+
+class FakeConversations:
+    def __init__(self, conversation, summary="", summarized_count=0):
+        self.state = {"conversation": conversation, "summary": summary, "summarized_count": summarized_count}
+        self.updates = []
+
+    def get_summary_state(self, thread_id):
+        return self.state
+
+    def update_summary(self, thread_id, summary, summarized_count):
+        self.updates.append((summary, summarized_count))
+        return True
+
+
+class FakeLLM:
+    def __init__(self):
+        self.calls = []
+
+    def invoke(self, messages):
+        self.calls.append(messages)
+        return AIMessage(content=" New summary. ")
+
+
+def test_summarize_folds_only_new_messages_before_the_recent_turns():
+    conversations = FakeConversations(turns(6), summary="Old summary.", summarized_count=4)
+    llm = FakeLLM()
+    assert summarize_thread(conversations, "t1", llm, ConversationConfig(recent_turns=2)) == "summarized"
+    assert conversations.updates == [("New summary.", 8)]
+    prompt = llm.calls[0][1]["content"]
+    assert "Old summary." in prompt
+    assert "question 2" in prompt and "question 3" in prompt
+    assert "question 1" not in prompt and "question 4" not in prompt
+
+
+def test_summarize_skips_when_only_recent_turns_are_unsummarized():
+    conversations = FakeConversations(turns(3), summarized_count=0)
+    llm = FakeLLM()
+    assert summarize_thread(conversations, "t1", llm, ConversationConfig(recent_turns=3)) == "up_to_date"
+    assert not llm.calls
@@ -0,0 +1,57 @@
+"""Tests for the /query endpoint's conversation bookkeeping"""
+
+import asyncio
+import threading
+
+from langchain_core.messages import AIMessage
+
+from src.api import dependencies, endpoints
+from src.api.endpoints import QueryRequest, process_query
+
+
+class FakeConversationManager:
+    def __init__(self, settings):
+        self.saved = []
+
+    def get_last_messages(self, thread_id, limit=None):
+        return []
+
+    def save_message(self, thread_id, role, content):
+        self.saved.append((role, content))
+
+    def close(self):
+        pass
+
+
+class FakeGraph:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    async def astream(self, inputs, stream_mode=None):
+        yield {"messages": [AIMessage(content="Cricket allows 1 team")]}
+
+
+class FakeDbManager:
+    def get_database(self):
+        return None
+
+    def get_dialect(self):
+        return "mysql"
+
+
+def test_query_with_a_thread_enqueues_its_summary_off_the_event_loop(monkeypatch):
+    queue, enqueued = object(), []
+    monkeypatch.setattr(endpoints, "ConversationManager", FakeConversationManager)
+    monkeypatch.setattr(endpoints, "AgentGraphBuilder", FakeGraph)
+    monkeypatch.setattr(dependencies, "get_db_manager", FakeDbManager)
+    monkeypatch.setattr(dependencies, "get_llm_manager", lambda: None)
+    monkeypatch.setattr(dependencies, "get_toolkit", lambda db_manager, llm_manager: None)
+    monkeypatch.setattr(endpoints, "get_rq_queue", lambda: queue)
+    monkeypatch.setattr(endpoints, "enqueue_conversation_summary",
+                        lambda q, thread_id: enqueued.append((q, thread_id, threading.current_thread())))
+
+    response = asyncio.run(process_query(QueryRequest(question="how many cricket teams", thread_id="t1")))
+
+    assert response.success and response.result == "Cricket allows 1 team"
+    assert [(q, thread_id) for q, thread_id, _ in enqueued] == [(queue, "t1")]
+    assert enqueued[0][2] is not threading.main_thread()
@@ -0,0 +1,122 @@
+"""Tests for verified-example templates and retrieval"""
+
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+
+from src.agents.nodes import AgentNodes
+from src.config.settings import ExampleStoreConfig
+from src.core.example_store import ExampleIndex, ExampleStore, VerifiedExample, build_template
+from src.tools.slots import normalize_question
+
+QUOTA_EXAMPLE = VerifiedExample(
+    "How many players can a Below 40 chapter send in Badminton?",
+    "SELECT max_participation_per_chapter FROM sports_rules "
+    "WHERE sport_name LIKE '%badminton%' AND chapter_size = 'Below 40'",
+)
+
+
+def test_template_fills_new_slot_values():
+    template = build_template(QUOTA_EXAMPLE)
+    sql = template.fill(normalize_question("how many players can a large chapter send in table tennis?"))
+    assert sql == (
+        "SELECT max_participation_per_chapter FROM sports_rules "
+        "WHERE sport_name LIKE '%table tennis%' AND chapter_size = 'Above 75'"
+    )
+
+
+def test_template_rejects_different_shape():
+    template = build_template(QUOTA_EXAMPLE)
+    assert template.fill(normalize_question("who won badminton for below 40 chapters")) is None
+
+
+def test_slot_values_are_escaped():
+    template = build_template(QUOTA_EXAMPLE)
+    sql = template.fill(normalize_question("how many players can a small chapter send in o'neil"))
+    assert "'%o''neil%'" in sql
+
+
+def test_question_without_slots_only_matches_itself():
+    template = build_template(VerifiedExample("List all sports", "SELECT DISTINCT sport_name FROM sports_rules"))
+    assert template.fill(normalize_question("list all sports!")) == "SELECT DISTINCT sport_name FROM sports_rules"
+    assert template.fill(normalize_question("list all venues")) is None
+
+
+def test_index_returns_most_similar_first():
+    other = VerifiedExample("Who is the captain of chapter Alpha", "SELECT captain FROM chapters WHERE name = 'Alpha'")
+    index = ExampleIndex()
+    index.build([other, QUOTA_EXAMPLE])
+    results = index.search("how many players can small chapters send in cricket", k=1)
+    assert results[0][1] is QUOTA_EXAMPLE
+
+
+class FakeConnection:
+    def __init__(self):
+        self.statements = []
+
+    def ping(self, reconnect=False):
+        pass
+
+    def cursor(self):
+        connection = self
+
+        class Cursor:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def execute(self, sql, args=None):
+                connection.statements.append(args)
+
+        return Cursor()
+
+
+def make_store(examples=()):
+    store = ExampleStore.__new__(ExampleStore)
+    store.config = ExampleStoreConfig(min_similarity=0.0)
+    store.conn, store.table_name = FakeConnection(), "verified_sql_examples"
+    store._lock = threading.RLock()
+    store._examples = {ExampleStore._hash(e.question): e for e in examples}
+    store._index = ExampleIndex()
+    store._rebuild()
+    store._loaded_at = time.time()
+    return store
+
+
+def test_added_examples_are_indexed_without_a_rebuild(monkeypatch):
+    other = VerifiedExample("Who is the captain of chapter Alpha", "SELECT captain FROM chapters WHERE name = 'Alpha'")
+    store = make_store([other])
+    vectors = list(store._index._vectors)
+    monkeypatch.setattr(ExampleIndex, "build", lambda *args: pytest.fail("add_example rebuilt the index"))
+
+    store.add_example(QUOTA_EXAMPLE.question, QUOTA_EXAMPLE.sql_query)
+    store.add_example(QUOTA_EXAMPLE.question.upper(), QUOTA_EXAMPLE.sql_query)
+
+    assert store._index._vectors[:1] == vectors
+    assert store.search("how many players can small chapters send in cricket", k=1)[0].hits == 2
+    assert "'%table tennis%'" in store.match_template("how many players can a large chapter send in table tennis?")
+    assert len(store.conn.statements) == 2
+
+
+def test_follow_up_answers_are_not_captured():
+    added = []
+    nodes = AgentNodes.__new__(AgentNodes)
+    nodes.toolkit = SimpleNamespace(db=SimpleNamespace(run=lambda sql: "[(4,)]"))
+    nodes.example_store = SimpleNamespace(add_example=lambda question, sql: added.append(question))
+    sql = AIMessage(content="", additional_kwargs={"metadata": {"sql_query": "SELECT 4"}})
+
+    nodes.user_query = "and cricket?"
+    follow_up = [HumanMessage(content="and cricket?"), HumanMessage(content="how many chess players"),
+                 AIMessage(content="4"), HumanMessage(content="and cricket?"), sql]
+    nodes.run_query_custom({"messages": follow_up, "conversation_summary": ""})
+    assert added == []
+
+    nodes.user_query = "how many chess players"
+    fresh = [HumanMessage(content="how many chess players"), HumanMessage(content="how many chess players"), sql]
+    nodes.run_query_custom({"messages": fresh, "conversation_summary": ""})
+    assert added == ["how many chess players"]
@@ -0,0 +1,50 @@
+"""Tests for the sports_rules intent router"""
+
+from src.tools.intents import IntentRouter, get_intent_router
+
+SPORTS = ["Badminton", "Table Tennis", "Tug  Of War", "Cricket", "Box Cricket"]
+
+
+def make_router():
+    return IntentRouter(None, sport_column="sport", sports=SPORTS)
+
+
+def test_quota_with_chapter_size():
+    match = make_router().match("How many players can a Below 40 chapter send in badminton?")
+    assert match.intent == "participation_quota"
+    assert match.parameters == {"sport": "Badminton", "chapter_size": "Below 40"}
+    assert match.sql == (
+        "SELECT sport, chapter_size, max_participation_per_chapter FROM sports_rules "
+        "WHERE sport = :sport AND chapter_size = :chapter_size"
+    )
+
+
+def test_quota_without_chapter_size_covers_all_sizes():
+    match = make_router().match("what is the quota for tug of war")
+    assert match.parameters == {"sport": "Tug  Of War"}
+    assert "chapter_size =" not in match.sql
+
+
+def test_chapter_size_synonym_and_longest_sport_name():
+    match = make_router().match("max entries for box cricket for large chapters")
+    assert match.parameters == {"sport": "Box Cricket", "chapter_size": "Above 75"}
+
+
+def test_limitation_intent():
+    match = make_router().match("Any restrictions for table tennis?")
+    assert match.intent == "limitation_notes"
+    assert "limitation_notes" in match.sql
+
+
+def test_unrecognized_questions_fall_through():
+    router = make_router()
+    assert router.match("how many players on the court in badminton") is None
+    assert router.match("how many players can we send") is None
+    assert router.match("compare cricket and badminton quota") is None
+    assert router.match("when is the badminton final") is None
+
+
+def test_router_is_shared_per_database():
+    db, other_db = object(), object()
+    assert get_intent_router(db) is get_intent_router(db)
+    assert get_intent_router(other_db).db is other_db
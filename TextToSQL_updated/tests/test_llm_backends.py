@@ -0,0 +1,150 @@
+"""Tests for the LLM backend failover pool"""
+
+import asyncio
+import json
+
+import httpx
+import pytest
+from langchain_openai import ChatOpenAI
+
+from src.config.settings import LLMBackend, LLMBackendsConfig
+from src.core import llm_backends
+from src.core.llm_backends import AsyncFailoverTransport, BackendPool, FailoverTransport
+
+PRIMARY = LLMBackend("primary", "http://primary.test/v1", "key-primary")
+BACKUP = LLMBackend("backup", "http://backup.test/proxy/v1", "key-backup")
+
+
+def completion(content):
+    return {
+        "id": "chatcmpl-1", "object": "chat.completion", "created": 0, "model": "gpt-4o-mini",
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+    }
+
+
+class Backends:
+    """Mock server: per-host status codes, recording every request"""
+
+    def __init__(self, **status):
+        self.status = status
+        self.requests = []
+
+    def __call__(self, request):
+        self.requests.append(request)
+        host = request.url.host.split(".")[0]
+        status = self.status.get(host, 200)
+        if status == "down":
+            raise httpx.ConnectError("connection refused")
+        return httpx.Response(status, json=completion(f"from {host}"))
+
+    def hosts(self):
+        return [r.url.host.split(".")[0] for r in self.requests]
+
+
+@pytest.fixture(autouse=True)
+def no_metrics(monkeypatch):
+    monkeypatch.setattr(llm_backends.metrics, "increment", lambda *args, **labels: None)
+    monkeypatch.setattr(llm_backends.metrics, "observe", lambda *args, **labels: None)
+
+
+def pool(**kwargs):
+    return BackendPool(LLMBackendsConfig(backends=[PRIMARY, BACKUP], **kwargs))
+
+
+def client(backend_pool, mock):
+    return httpx.Client(transport=FailoverTransport(backend_pool, httpx.MockTransport(mock)))
+
+
+def post(http_client):
+    return http_client.post(f"{PRIMARY.base_url}/chat/completions", json={"model": "m"}, headers={"Authorization": "Bearer x"})
+
+
+def test_fails_over_on_retryable_status_with_the_backups_url_and_key():
+    mock = Backends(primary=503)
+    response = post(client(pool(), mock))
+    assert response.json()["choices"][0]["message"]["content"] == "from backup"
+    assert mock.hosts() == ["primary", "backup"]
+    assert str(mock.requests[1].url) == "http://backup.test/proxy/v1/chat/completions"
+    assert mock.requests[1].headers["authorization"] == "Bearer key-backup"
+    assert json.loads(mock.requests[1].content) == {"model": "m"}
+
+
+def test_circuit_opens_after_consecutive_failures_and_probes_after_cooldown(monkeypatch):
+    backend_pool = pool(failure_threshold=2, open_seconds=30)
+    backend_pool.record(PRIMARY, 0.1, ok=True)
+    backend_pool.record(BACKUP, 5.0, ok=True)
+    for _ in range(2):
+        backend_pool.record(PRIMARY, 10.0, ok=False)
+    assert backend_pool.snapshot()["primary"]["circuit"] == "open"
+
+    mock = Backends()
+    http_client = client(backend_pool, mock)
+    post(http_client)
+    assert mock.hosts() == ["backup"]
+
+    now = llm_backends.time.time()
+    monkeypatch.setattr(llm_backends.time, "time", lambda: now + 31)
+    mock.requests.clear()
+    post(http_client)
+    assert mock.hosts() == ["primary"]
+    assert backend_pool.snapshot()["primary"]["circuit"] == "closed"
+
+
+def test_healthier_backend_is_preferred():
+    backend_pool = pool()
+    backend_pool.record(PRIMARY, 4.0, ok=True)
+    backend_pool.record(BACKUP, 0.5, ok=True)
+    assert backend_pool.candidates() == [BACKUP, PRIMARY]
+    for _ in range(3):
+        backend_pool.record(BACKUP, 0.5, ok=False)
+    assert backend_pool.candidates()[0] == PRIMARY
+
+
+def test_last_backends_error_is_returned_to_the_sdk():
+    mock = Backends(primary=503, backup=429)
+    assert post(client(pool(), mock)).status_code == 429
+
+
+def test_chat_model_fails_over_sync_and_async():
+    mock = Backends(primary=502)
+    backend_pool = pool()
+    llm = ChatOpenAI(
+        model="gpt-4o-mini", api_key="unused", base_url=PRIMARY.base_url, max_retries=0,
+        http_client=httpx.Client(transport=FailoverTransport(backend_pool, httpx.MockTransport(mock))),
+        http_async_client=httpx.AsyncClient(transport=AsyncFailoverTransport(backend_pool, httpx.MockTransport(mock))),
+    )
+    assert llm.invoke("hi").content == "from backup"
+    assert asyncio.run(llm.ainvoke("hi")).content == "from backup"
+
+
+def test_error_penalty_fades_so_a_recovered_backend_wins_back(monkeypatch):
+    backend_pool = pool(open_seconds=30)
+    backend_pool.record(PRIMARY, 0.2, ok=True)
+    backend_pool.record(BACKUP, 0.3, ok=True)
+    backend_pool.record(PRIMARY, 0.2, ok=False)
+    assert backend_pool.candidates()[0] == BACKUP
+    now = llm_backends.time.time()
+    monkeypatch.setattr(llm_backends.time, "time", lambda: now + 120)
+    assert backend_pool.candidates()[0] == PRIMARY
+
+
+def test_cancelled_probe_lets_the_next_request_probe(monkeypatch):
+    backend_pool = pool(failure_threshold=1, open_seconds=30)
+    backend_pool.record(PRIMARY, 10.0, ok=False)
+    now = llm_backends.time.time()
+    monkeypatch.setattr(llm_backends.time, "time", lambda: now + 31)
+
+    async def hang(request):
+        await asyncio.sleep(10)
+
+    async def cancel_probe():
+        http_client = httpx.AsyncClient(transport=AsyncFailoverTransport(backend_pool, httpx.MockTransport(hang)))
+        task = asyncio.create_task(http_client.post(f"{PRIMARY.base_url}/chat/completions", json={}))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_probe())
+    assert backend_pool.candidates() == [PRIMARY, BACKUP]
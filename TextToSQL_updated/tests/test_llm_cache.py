@@ -0,0 +1,90 @@
+"""Tests for the per-node LLM response cache"""
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+
+from src.agents.schemas import GeneratedQuery
+from src.config.settings import LLMCacheConfig, LLMCacheNode, LLMCallsConfig
+from src.core.llm_cache import LRU_KEY, LLMCache
+from src.core.llm_calls import LLMCaller
+
+
+pytestmark = pytest.mark.usefixtures("redis_client")
+
+
+class FakeModel:
+    def __init__(self, model_name="gpt-test", responses=()):
+        self.model_name = model_name
+        self.responses = list(responses)
+        self.calls = 0
+
+    def invoke(self, messages):
+        self.calls += 1
+        return self.responses.pop(0)
+
+
+def cache(max_entries=10):
+    return LLMCache(LLMCacheConfig(nodes={"classify_query": LLMCacheNode(ttl=60, max_entries=max_entries)}))
+
+
+PROMPT = [{"role": "system", "content": "classify"}, {"role": "user", "content": "how many teams?"}]
+
+
+def test_hit_after_put():
+    llm_cache_ = cache()
+    digest = llm_cache_.key("classify_query", FakeModel(), PROMPT)
+    assert llm_cache_.get("classify_query", digest) is None
+    llm_cache_.put("classify_query", digest, AIMessage(content="IN_DOMAIN_DB_QUERY", id="run-1"))
+    cached = llm_cache_.get("classify_query", digest)
+    assert cached.content == "IN_DOMAIN_DB_QUERY"
+    assert cached.id is None
+
+
+def test_only_configured_nodes_are_cached():
+    assert cache().key("generate_response", FakeModel(), PROMPT) is None
+    assert LLMCache(LLMCacheConfig(enabled=False)).key("classify_query", FakeModel(), PROMPT) is None
+
+
+def test_key_depends_on_model_but_not_tool_call_ids():
+    def with_call(call_id):
+        return [HumanMessage(content="q"), AIMessage(content="", tool_calls=[
+            {"name": "sql_db_schema", "args": {"table_names": "t"}, "id": call_id, "type": "tool_call"}
+        ])]
+
+    llm_cache_ = cache()
+    assert llm_cache_.key("classify_query", FakeModel(), with_call("a")) == \
+        llm_cache_.key("classify_query", FakeModel(), with_call("b"))
+    assert llm_cache_.key("classify_query", FakeModel(), PROMPT) != \
+        llm_cache_.key("classify_query", FakeModel("gpt-other"), PROMPT)
+
+
+def test_structured_output_round_trips():
+    llm_cache_ = cache()
+    query = GeneratedQuery(sql="SELECT 1", tables_used=["t"], confidence=0.9)
+    digest = llm_cache_.key("classify_query", FakeModel(), PROMPT)
+    llm_cache_.put("classify_query", digest, query)
+    assert llm_cache_.get("classify_query", digest) == query
+
+
+def test_least_recently_used_entries_are_evicted(redis_client):
+    llm_cache_ = cache(max_entries=2)
+    digests = []
+    for i in range(3):
+        digest = llm_cache_.key("classify_query", FakeModel(), [{"role": "user", "content": f"q{i}"}])
+        llm_cache_.put("classify_query", digest, AIMessage(content=str(i)))
+        digests.append(digest)
+        if i == 1:
+            llm_cache_.get("classify_query", digests[0])  # Touch the oldest entry
+
+    assert llm_cache_.get("classify_query", digests[1]) is None
+    assert llm_cache_.get("classify_query", digests[0]).content == "0"
+    assert redis_client.zcard(LRU_KEY.format(node="classify_query")) == 2
+
+
+def test_caller_answers_a_repeated_prompt_from_the_cache():
+    caller = LLMCaller(LLMCallsConfig(), cache=cache())
+    model = FakeModel(responses=[AIMessage(content="IN_DOMAIN_DB_QUERY")])
+    first = caller.invoke("classify_query", model, PROMPT)
+    second = caller.invoke("classify_query", model, PROMPT)
+    assert first.content == second.content == "IN_DOMAIN_DB_QUERY"
+    assert model.calls == 1
@@ -0,0 +1,144 @@
+"""Tests for per-node LLM deadlines, output caps and hedging"""
+
+import asyncio
+import time
+
+import pytest
+from langchain_core.messages import AIMessage
+from langchain_openai import ChatOpenAI
+
+from src.agents.nodes import classification_route, decisive_label
+from src.config.settings import LLMCallLimits, LLMCallsConfig, Settings
+from src.core import llm_calls
+from src.core.llm_calls import LLMCaller, LLMTimeoutError
+
+
+class SlowLLM:
+    """Answers after the given delays, one per call (the last one repeats)"""
+
+    def __init__(self, *delays):
+        self.delays = list(delays)
+        self.calls = 0
+
+    def _delay(self):
+        delay = self.delays[min(self.calls, len(self.delays) - 1)]
+        self.calls += 1
+        return delay
+
+    def invoke(self, messages):
+        time.sleep(self._delay())
+        return AIMessage(content=f"answer {self.calls}")
+
+    async def ainvoke(self, messages):
+        await asyncio.sleep(self._delay())
+        return AIMessage(content=f"answer {self.calls}")
+
+
+def caller(timeout=1.0, **kwargs):
+    return LLMCaller(LLMCallsConfig(limits={"node": LLMCallLimits(timeout, 100)}, **kwargs))
+
+
+def warm(llm_caller, latency, samples=20):
+    for _ in range(samples):
+        llm_caller.record("node", latency, "ok")
+
+
+@pytest.fixture(autouse=True)
+def counters(monkeypatch):
+    recorded = []
+    monkeypatch.setattr(llm_calls.metrics, "increment", lambda name, **labels: recorded.append((name, labels)))
+    monkeypatch.setattr(llm_calls.metrics, "observe", lambda *args, **labels: None)
+    return recorded
+
+
+def test_node_limits_are_parsed_from_env(monkeypatch):
+    monkeypatch.setenv("LLM_NODE_LIMITS", "classify_query=5:200, web_search=10")
+    config = Settings.from_env().llm_calls
+    assert config.for_node("classify_query") == LLMCallLimits(5.0, 200)
+    assert config.for_node("web_search") == LLMCallLimits(10.0, None)
+    assert config.for_node("generate_query").timeout == 30
+    assert config.for_node("unknown").timeout == config.default_timeout
+
+
+def test_limited_copies_the_model_with_caps():
+    llm = ChatOpenAI(model="gpt-4o-mini", api_key="test")
+    llm_caller = caller(timeout=7)
+    limited = llm_caller.limited(llm, "node")
+    assert limited is not llm
+    assert limited.max_tokens == 100
+    assert limited.model_kwargs["timeout"] == 7
+    assert llm.max_tokens is None
+    assert llm_caller.limited(llm, "node") is limited
+
+
+def test_deadline_raises_timeout(counters):
+    llm_caller = caller(timeout=0.1)
+    with pytest.raises(LLMTimeoutError):
+        llm_caller.invoke("node", SlowLLM(0.5), [])
+    assert ("llm_calls", {"node": "node", "outcome": "timeout"}) in counters
+
+
+def test_no_hedge_before_enough_samples():
+    llm_caller = caller(hedging=True)
+    warm(llm_caller, 0.01, samples=5)
+    assert llm_caller.hedge_delay("node") is None
+
+
+def test_hedge_wins_when_primary_is_slow(counters):
+    llm_caller = caller(hedging=True)
+    warm(llm_caller, 0.05)
+    llm = SlowLLM(0.6, 0.01)
+    assert llm_caller.invoke("node", llm, []).content == "answer 2"
+    assert ("llm_hedges", {"node": "node", "outcome": "fired"}) in counters
+    assert ("llm_hedges", {"node": "node", "outcome": "hedge_won"}) in counters
+
+
+def test_async_hedge_cancels_the_loser(counters):
+    llm_caller = caller(hedging=True)
+    warm(llm_caller, 0.05)
+    llm = SlowLLM(0.6, 0.01)
+    start = time.time()
+    assert asyncio.run(llm_caller.ainvoke("node", llm, [])).content == "answer 2"
+    assert time.time() - start < 0.5
+    assert ("llm_hedges", {"node": "node", "outcome": "hedge_won"}) in counters
+
+
+class StreamingLLM:
+    """Streams `text` in chunks of `size` characters, counting the chunks consumed"""
+
+    def __init__(self, text, size=4):
+        self.text, self.size = text, size
+        self.sent = 0
+        self.closed = False
+
+    def stream(self, messages):
+        try:
+            for i in range(0, len(self.text), self.size):
+                self.sent += 1
+                yield AIMessage(content=self.text[i:i + self.size])
+        finally:
+            self.closed = True
+
+
+def test_stream_stops_at_the_first_decisive_prefix(counters):
+    llm = StreamingLLM('{"route": "IN_DOMAIN_DB_QUERY"}')
+    label, text = caller().stream_until("node", llm, [], decisive_label)
+    assert label == "IN_DOMAIN_DB_QUERY"
+    assert text == '{"route": "IN_DOMAIN_DB_'
+    assert llm.closed and llm.sent < len(llm.text) / llm.size
+    assert ("llm_streams", {"node": "node", "outcome": "decided"}) in counters
+
+
+def test_undecided_stream_returns_the_full_text():
+    label, text = caller().stream_until("node", StreamingLLM("I think this is a database question"), [], decisive_label)
+    assert label is None
+    assert classification_route(text) == "OUT_OF_DOMAIN"
+
+
+def test_decisive_label_needs_an_unambiguous_prefix():
+    assert decisive_label("IN_DOMAIN_") is None
+    assert decisive_label("IN_DOMAIN_W") is None  # WITHIN_PREVIOUS_CONVERSATION or WEB_SEARCH
+    assert decisive_label("IN_DOMAIN_WE") == "IN_DOMAIN_WEB_SEARCH"
+    assert decisive_label('{"route":"O') == "OUT_OF_DOMAIN"
+    assert decisive_label('{"rou') is None
+    assert decisive_label("out_of_domain.") == "OUT_OF_DOMAIN"
@@ -0,0 +1,14 @@
+"""Tests for the WhatsApp load test's latency statistics"""
+
+from load_test_whatsapp import percentile
+
+
+def test_nearest_rank_percentile():
+    values = [float(v) for v in range(100, 0, -1)]  # 1..100, unsorted
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 95) == 95.0
+    assert percentile(values, 99) == 99.0
+    assert percentile(values, 100) == 100.0
+    assert percentile(values, 0) == 1.0
+    assert percentile([3.0], 99) == 3.0
+    assert percentile([], 50) == 0.0
@@ -0,0 +1,70 @@
+"""Tests for complexity-based model routing"""
+
+import pytest
+
+from src.config.settings import ModelProfile, ModelRouterConfig, Settings
+from src.core import model_router
+from src.core.model_router import ModelRouter, estimate_complexity
+
+PROFILES = [
+    ModelProfile("nano", "gpt-5-nano", 0, latency=1.0, cost=1.0),
+    ModelProfile("mini", "gpt-4o-mini", 0, latency=2.0, cost=0.5),
+    ModelProfile("mid", "gpt-5-mini", 1, latency=4.0),
+    ModelProfile("big", "gpt-5", 2, latency=10.0),
+]
+
+
+@pytest.fixture(autouse=True)
+def no_metrics(monkeypatch):
+    monkeypatch.setattr(model_router.metrics, "increment", lambda *args, **labels: None)
+    monkeypatch.setattr(model_router.metrics, "observe", lambda *args, **labels: None)
+
+
+def router(**kwargs):
+    config = ModelRouterConfig(enabled=True, models=PROFILES, **kwargs)
+    return ModelRouter(config, {p.name: object() for p in PROFILES})
+
+
+def test_complexity_grows_with_tables_joins_and_analytic_wording():
+    simple = estimate_complexity("how many teams in cricket", tables=1)
+    analytic = estimate_complexity("compare the average score per chapter in cricket", tables=2)
+    joined = estimate_complexity("how many teams in cricket", tables=1, sql="SELECT * FROM a JOIN b ON a.id = b.id")
+    assert simple < 1
+    assert analytic > simple + 3
+    assert joined == simple + 1.5
+
+
+def test_simple_requests_use_the_fastest_lowest_tier_model():
+    assert router().route("generate_query", 1.0).profile.name == "nano"
+    assert router().route("generate_query", 5.0).profile.name == "mid"
+    assert router().route("generate_query", 20.0).profile.name == "big"
+
+
+def test_escalation_moves_up_one_tier_and_stops_at_the_top():
+    model_router_ = router()
+    route = model_router_.route("generate_query", 1.0, escalation=1)
+    assert (route.profile.name, route.reason) == ("mid", "escalated")
+    top = model_router_.route("generate_query", 1.0, escalation=5)
+    assert top.profile.name == "big"
+    assert not model_router_.can_escalate(top)
+
+
+def test_observed_latency_reorders_models_within_a_tier():
+    model_router_ = router()
+    nano = model_router_.route("generate_query", 0.0)
+    model_router_.record(nano, 6.0, "ok")
+    assert model_router_.route("generate_query", 0.0).profile.name == "mini"
+
+
+def test_node_min_tier():
+    route = router(node_min_tiers={"call_get_schema_llm": 1}).route("call_get_schema_llm", 0.0)
+    assert (route.profile.name, route.reason) == ("mid", "min_tier")
+
+
+def test_models_are_parsed_from_env(monkeypatch):
+    monkeypatch.setenv("LLM_MODELS", "fast=gpt-4o-mini:0,reasoning=gpt-5/low:1:9:6")
+    config = Settings.from_env().model_router
+    assert config.models == [
+        ModelProfile("fast", "gpt-4o-mini", 0),
+        ModelProfile("reasoning", "gpt-5", 1, "low", latency=9.0, cost=6.0),
+    ]
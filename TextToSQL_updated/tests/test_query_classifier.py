@@ -0,0 +1,106 @@
+"""Tests for the local classify_query model"""
+
+import time
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+from src.agents.nodes import AgentNodes
+from src.config import Settings
+from src.config.settings import QueryClassifierConfig
+from src.core import query_classifier
+from src.core.query_classifier import QueryClassifier, evaluate, get_query_classifier, load_samples, log_sample
+
+SPORTS = ["cricket", "football", "chess", "badminton", "table tennis", "carrom", "volleyball", "kabaddi"]
+PREVIOUS = [{"role": "user", "content": "how many players in a cricket team"},
+            {"role": "assistant", "content": "A cricket team has 11 players and 4 substitutes."}]
+
+
+def samples():
+    data = []
+    for sport in SPORTS:
+        data += [
+            {"question": f"how many teams can a chapter send for {sport}", "label": "IN_DOMAIN_DB_QUERY"},
+            {"question": f"what is the maximum participation in {sport}", "label": "IN_DOMAIN_DB_QUERY"},
+            {"question": f"when is the {sport} match scheduled", "label": "IN_DOMAIN_WEB_SEARCH"},
+            {"question": f"who won {sport} at sicilian games last year", "label": "IN_DOMAIN_WEB_SEARCH"},
+            {"question": f"what about {sport}", "previous": PREVIOUS, "label": "IN_DOMAIN_WITHIN_PREVIOUS_CONVERSATION"},
+            {"question": f"explain the history of {sport} in england", "label": "OUT_OF_DOMAIN"},
+        ]
+    data += [{"question": q, "label": "OUT_OF_DOMAIN"} for q in ("hello", "tell me a joke", "what is the weather today")]
+    return data
+
+
+@pytest.fixture(scope="module")
+def classifier():
+    return QueryClassifier.fit(samples(), epochs=15)
+
+
+def test_learns_the_logged_labels(classifier):
+    report = evaluate(classifier, samples(), min_confidence=0.5)
+    assert report["accuracy"] > 0.95
+    assert classifier.predict("how many teams can a chapter send for hockey")[0] == "IN_DOMAIN_DB_QUERY"
+
+
+def test_history_distinguishes_follow_ups(classifier):
+    assert classifier.predict("what about hockey", PREVIOUS)[0] == "IN_DOMAIN_WITHIN_PREVIOUS_CONVERSATION"
+
+
+def test_prediction_is_fast(classifier):
+    start_time = time.perf_counter()
+    for _ in range(100):
+        classifier.predict("how many players can a chapter send for table tennis doubles", PREVIOUS)
+    assert (time.perf_counter() - start_time) / 100 < 0.005
+
+
+def test_model_file_round_trips_and_reloads(classifier, tmp_path, monkeypatch):
+    path = str(tmp_path / "classifier.json")
+    classifier.save(path)
+    config = QueryClassifierConfig(enabled=True, model_path=path)
+    monkeypatch.setattr(query_classifier, "_classifier", None)
+    loaded = get_query_classifier(config)
+    question = "when is the chess match scheduled"
+    assert loaded.probabilities(question) == pytest.approx(classifier.probabilities(question), abs=1e-4)
+    assert get_query_classifier(config) is loaded
+    assert get_query_classifier(QueryClassifierConfig(enabled=True, model_path=str(tmp_path / "missing.json"))) is None
+    assert get_query_classifier(QueryClassifierConfig(enabled=False, model_path=path)) is None
+
+
+def test_samples_are_logged_and_trimmed(redis_client):
+    config = QueryClassifierConfig(max_samples=2)
+    for i in range(3):
+        log_sample(config, f"question {i}", PREVIOUS, "IN_DOMAIN_DB_QUERY")
+    log_sample(config, "ignored", [], "NOT_A_LABEL")
+    logged = load_samples()
+    assert [s["question"] for s in logged] == ["question 2", "question 1"]
+    assert logged[0]["previous"] == PREVIOUS
+
+
+def test_only_decided_llm_classifications_are_logged(redis_client):
+    class StreamingCaller:
+        config = SimpleNamespace(constrained_classification=True)
+
+        def __init__(self, decision, text):
+            self.result = decision, text
+
+        def limited(self, llm, node):
+            return SimpleNamespace(bind=lambda **kwargs: llm)
+
+        def stream_until(self, node, llm, messages, decide):
+            return self.result
+
+    settings = Settings.from_env()
+    nodes = AgentNodes.__new__(AgentNodes)
+    nodes.llm_call, nodes.llm_without_reasoning, nodes.classify_batcher = 1, None, None
+    nodes.classifier_config = QueryClassifierConfig(enabled=False, log_samples=True)
+    nodes.conversation_config, nodes.context_config = settings.conversation, settings.context
+    state = {"messages": [HumanMessage(content="hi")], "conversation_summary": ""}
+
+    nodes.llm_caller = StreamingCaller(None, '{"route": "IN_DOMAIN_')
+    assert nodes.classify_query(state)["route"] == "OUT_OF_DOMAIN"
+    assert load_samples() == []
+
+    nodes.llm_caller = StreamingCaller("IN_DOMAIN_WEB_SEARCH", '{"route": "IN_DOMAIN_W')
+    assert nodes.classify_query(state)["route"] == "IN_DOMAIN_WEB_SEARCH"
+    assert [s["label"] for s in load_samples()] == ["IN_DOMAIN_WEB_SEARCH"]
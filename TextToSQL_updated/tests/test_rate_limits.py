@@ -0,0 +1,76 @@
+"""Tests for the shared LLM rate limits"""
+
+import asyncio
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from src.config.settings import LLMCallsConfig, RateLimitConfig
+from src.core.llm_calls import LLMCaller
+from src.core.rate_limits import BACKGROUND, BUCKET_KEY, INTERACTIVE, RateLimiter, llm_priority
+
+
+pytestmark = pytest.mark.usefixtures("redis_client")
+
+
+def limiter(**kwargs):
+    defaults = dict(enabled=True, requests_per_minute=600, tokens_per_minute=600)
+    return RateLimiter(RateLimitConfig(**{**defaults, **kwargs}))
+
+
+def tokens_left(client):
+    return float(client.hget(BUCKET_KEY, "tokens"))
+
+
+def test_calls_within_the_buckets_go_through_immediately(redis_client):
+    rate_limiter = limiter()
+    assert rate_limiter.acquire(100) < 0.1
+    assert rate_limiter.acquire(100) < 0.1
+    assert tokens_left(redis_client) == pytest.approx(400, abs=1)
+
+
+def test_call_waits_for_the_refill(redis_client):
+    rate_limiter = limiter()  # 10 tokens per second
+    rate_limiter.acquire(600)
+    waited = rate_limiter.acquire(5)
+    assert 0.4 <= waited < 1.5
+
+
+def test_background_calls_leave_the_reserve_to_interactive_ones(redis_client):
+    rate_limiter = limiter(background_reserve=0.5, max_wait_background=0.3)
+    assert rate_limiter.acquire(300, priority=BACKGROUND) < 0.1
+    assert rate_limiter.try_acquire(10, priority=BACKGROUND) is False
+    assert rate_limiter.try_acquire(10, priority=INTERACTIVE) is True
+
+
+def test_priority_comes_from_the_context(redis_client):
+    rate_limiter = limiter(background_reserve=0.5)
+    rate_limiter.acquire(300)
+    with llm_priority(BACKGROUND):
+        assert rate_limiter.try_acquire(10) is False
+    assert rate_limiter.try_acquire(10) is True
+
+
+def test_gives_up_after_max_wait_and_keeps_the_debt(redis_client):
+    rate_limiter = limiter(max_wait_interactive=0.2)
+    rate_limiter.acquire(600)
+    waited = asyncio.run(rate_limiter.aacquire(300))
+    assert 0.2 <= waited < 0.6
+    assert tokens_left(redis_client) < -200
+
+
+def test_disabled_limiter_never_waits(redis_client):
+    rate_limiter = limiter(enabled=False)
+    assert rate_limiter.acquire(10_000) == 0
+    assert not redis_client.exists(BUCKET_KEY)
+
+
+class UsageLLM:
+    def invoke(self, messages):
+        return AIMessage(content="ok", usage_metadata={"input_tokens": 20, "output_tokens": 10, "total_tokens": 30})
+
+
+def test_caller_takes_the_estimate_and_settles_reported_usage(redis_client):
+    caller = LLMCaller(LLMCallsConfig(), limiter(tokens_per_minute=100_000, completion_tokens=500))
+    caller.invoke("unknown_node", UsageLLM(), [{"role": "user", "content": "hello"}])
+    assert tokens_left(redis_client) == pytest.approx(100_000 - 30, abs=2)
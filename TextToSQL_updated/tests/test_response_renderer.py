@@ -0,0 +1,57 @@
+"""Tests for deterministic response rendering"""
+
+from src.agents.response_renderer import NO_ROWS_TEXT, render_result, select_columns
+
+QUOTA_SQL = "SELECT sport_name, chapter_size, max_participation_per_chapter FROM sports_rules WHERE sport_name = :sport"
+
+
+def test_select_columns():
+    assert select_columns("SELECT s.sport_name, COUNT(*) AS total FROM sports_rules s") == ["sport_name", "total"]
+    assert select_columns("SELECT CONCAT(a, ', ', b) FROM t") == [None]
+    assert select_columns("SELECT * FROM t") is None
+
+
+def test_no_rows():
+    rendered = render_result("", "SELECT sport_name FROM sports_rules WHERE 1 = 0")
+    assert rendered.shape == "no_rows"
+    assert rendered.text == NO_ROWS_TEXT
+
+
+def test_scalar():
+    rendered = render_result("[('1 Team',)]", "SELECT max_participation_per_chapter FROM sports_rules")
+    assert rendered.shape == "scalar"
+    assert rendered.text == "Here's what I found 🏅\nMax participation per chapter: *1 Team*"
+
+
+def test_chapter_groups_in_canonical_order():
+    result = str([
+        ("Badminton", "Below 40", "Singles - 2+2 (M+F), Doubles - 1+1 Teams (M+F)"),
+        ("Badminton", "Above 75", "Singles - 5+5 (M+F), Doubles - 3+3 Teams (M+F)"),
+        ("Badminton", "40 to 75 or Merged", None),
+    ])
+    rendered = render_result(result, QUOTA_SQL)
+    assert rendered.shape == "chapter_groups"
+    assert rendered.text == (
+        "Here's what I found for Badminton 🏅\n"
+        "\n*Above 75*\n• Singles - 5+5 (M+F)\n• Doubles - 3+3 Teams (M+F)\n"
+        "\n*40 to 75 or Merged*\n• Not specified\n"
+        "\n*Below 40*\n• Singles - 2+2 (M+F)\n• Doubles - 1+1 Teams (M+F)"
+    )
+
+
+def test_short_list():
+    rendered = render_result("[('Chess',), ('Carrom',)]", "SELECT DISTINCT sport_name FROM sports_rules")
+    assert rendered.shape == "list"
+    assert rendered.text == "Here's what I found 🏅\n• Chess\n• Carrom"
+
+
+def test_complex_results_go_to_llm():
+    assert render_result("ERROR executing SQL query: boom", "SELECT a FROM t") is None
+    assert render_result("[(1, 2, 3), (4, 5, 6)]", "SELECT a, b, c FROM t") is None
+    assert render_result("[('x@y.com',)]", "SELECT email FROM members") is None
+
+
+def test_unnamed_columns_go_to_llm():
+    assert render_result("[('Asha', '9876543210'), ('Ravi', '9123456780')]", "SELECT * FROM players") is None
+    assert render_result("[('Asha, 9876543210',)]", "SELECT CONCAT(name, ', ', phone) FROM players") is None
+    assert render_result("[('Asha', '9876543210')]", "SELECT name FROM players") is None
@@ -0,0 +1,91 @@
+"""Tests for single-flight coalescing of identical questions"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.config.settings import SingleFlightConfig
+from src.core.single_flight import SingleFlight, is_context_free
+
+
+pytestmark = pytest.mark.usefixtures("redis_client")
+
+
+class Computation:
+    """Slow answer that counts its runs and can fail the first one"""
+
+    def __init__(self, delay=0.2, fail_first=False):
+        self.delay = delay
+        self.fail_first = fail_first
+        self.runs = 0
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            self.runs += 1
+            run = self.runs
+        time.sleep(self.delay)
+        if self.fail_first and run == 1:
+            raise RuntimeError("leader failed")
+        return f"answer {run}"
+
+
+def run_concurrently(flight, compute, questions):
+    def ask(question):
+        try:
+            return flight.run(question, compute)
+        except RuntimeError:
+            return "error"
+
+    with ThreadPoolExecutor(len(questions)) as pool:
+        return list(pool.map(ask, questions))
+
+
+def test_identical_questions_share_one_computation():
+    compute = Computation()
+    answers = run_concurrently(SingleFlight(SingleFlightConfig(enabled=True)), compute,
+                               ["When is the final?"] * 5 + ["when is the   FINAL"])
+    assert answers == ["answer 1"] * 6
+    assert compute.runs == 1
+
+
+def test_different_questions_are_not_coalesced():
+    compute = Computation(delay=0.05)
+    answers = run_concurrently(SingleFlight(SingleFlightConfig(enabled=True)), compute, ["when is the final", "who won"])
+    assert sorted(answers) == ["answer 1", "answer 2"]
+
+
+def test_a_follower_takes_over_when_the_leader_fails():
+    compute = Computation(delay=0.1, fail_first=True)
+    answers = run_concurrently(SingleFlight(SingleFlightConfig(enabled=True)), compute, ["who won"] * 4)
+    assert answers.count("error") == 1
+    assert answers.count("answer 2") == 3
+    assert compute.runs == 2
+
+
+def test_async_requests_share_one_computation():
+    runs = []
+
+    async def compute():
+        runs.append(1)
+        await asyncio.sleep(0.2)
+        return "answer"
+
+    async def ask_all():
+        flight = SingleFlight(SingleFlightConfig(enabled=True))
+        return await asyncio.gather(*(flight.arun("who won", compute) for _ in range(4)))
+
+    assert asyncio.run(ask_all()) == ["answer"] * 4
+    assert len(runs) == 1
+
+
+def test_context_free_threads():
+    recent = [{"role": "assistant", "content": "hi", "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")}]
+    old = [{"role": "assistant", "content": "hi", "timestamp": "2020-01-01 00:00:00"}]
+    assert is_context_free([], 0)
+    assert not is_context_free(old, 0)
+    assert is_context_free(old, 1800)
+    assert not is_context_free(recent, 1800)
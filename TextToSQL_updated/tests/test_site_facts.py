@@ -0,0 +1,57 @@
+"""Tests for crawl-time fact extraction and selection"""
+
+from src.tools.site_facts import (
+    PageFacts, Sponsor, WinnerEntry, _chunks, merge_facts, render_fact_list, select_facts,
+)
+
+FACTS = {
+    "winners": [
+        {"sport": "Badminton", "event": "Men's Singles", "position": "Winner", "winner": "R. Shah", "chapter": "Pune"},
+        {"sport": "Badminton", "event": "Men's Singles", "position": "Runner Up", "winner": "A. Rao", "chapter": "Delhi"},
+        {"sport": "Cricket", "position": "Winner", "winner": "Mumbai XI", "chapter": "Mumbai"},
+    ],
+    "sponsors": [{"name": "Acme Corp", "category": "Title Partner"}, {"name": "Globex"}],
+}
+
+
+def test_merge_drops_empty_fields_and_duplicates():
+    part = PageFacts(
+        winners=[WinnerEntry(sport="Chess", winner="K. Iyer", event=" ")],
+        sponsors=[Sponsor(name="Acme Corp")],
+    )
+    merged = merge_facts([part, PageFacts(sponsors=[Sponsor(name="acme corp ")])])
+    assert merged == {
+        "winners": [{"sport": "Chess", "winner": "K. Iyer"}],
+        "sponsors": [{"name": "Acme Corp"}],
+    }
+
+
+def test_chunks_split_on_line_boundaries():
+    text = "\n".join(["one two three"] * 5)
+    chunks = _chunks(text, 6)
+    assert chunks == ["one two three\none two three"] * 2 + ["one two three"]
+
+
+def test_select_keeps_best_matching_entries():
+    selected = select_facts(FACTS, "Who won badminton men's singles?", ["winners"], ignore=["won"])
+    assert [e["winner"] for e in selected["winners"]] == ["R. Shah", "A. Rao"]
+
+
+def test_select_returns_small_lists_whole_when_nothing_specific_is_asked():
+    selected = select_facts(FACTS, "Who are the sponsors?", ["sponsors"], ignore=["sponsors"])
+    assert selected == {"sponsors": FACTS["sponsors"]}
+
+
+def test_select_gives_up_on_large_unfiltered_lists():
+    assert select_facts(FACTS, "Who are the winners?", ["winners"], limit=2, ignore=["winners"]) == {}
+
+
+def test_render_sponsor_list():
+    answer = render_fact_list("sponsors", FACTS["sponsors"])
+    assert "• Acme Corp (Title Partner)" in answer
+    assert "• Globex" in answer
+
+
+def test_render_contacts_skips_missing_fields():
+    answer = render_fact_list("contacts", [{"role": "Helpdesk", "email": "help@siciliangames.com"}])
+    assert "• Helpdesk: help@siciliangames.com" in answer
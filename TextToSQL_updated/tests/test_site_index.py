@@ -0,0 +1,51 @@
+"""Tests for crawled passage splitting and the BM25 site index"""
+
+from src.core import site_index
+from src.core.site_index import Passage, SiteIndex
+from src.tools.site_crawler import split_passages
+
+
+def test_split_passages_overlaps_and_prefers_line_breaks():
+    text = "\n".join(f"Match {i} Badminton court {i} at 10 AM" for i in range(30))
+    passages = split_passages(text, words=40, overlap=8)
+    assert len(passages) > 1
+    # Consecutive passages share their boundary words
+    assert passages[0].split()[-8:] == passages[1].split()[:8]
+    assert " ".join(passages).count("Match 29") >= 1
+
+
+def test_split_passages_short_text():
+    assert split_passages("Only one line", words=80, overlap=20) == ["Only one line"]
+    assert split_passages("", words=80, overlap=20) == []
+
+
+def test_search_ranks_and_filters_by_url():
+    index = SiteIndex()
+    index.build([
+        Passage("https://siciliangames.com/schedule.php", "Badminton final on 12 January at Sports Arena"),
+        Passage("https://siciliangames.com/schedule.php", "Cricket league matches every Sunday"),
+        Passage("https://siciliangames.com/winners.php", "Badminton winners: Chapter Alpha"),
+    ])
+    top = index.search("when is the badminton final", k=1)
+    assert top[0][1].text.startswith("Badminton final")
+
+    winners = index.search("badminton", k=3, urls={"https://siciliangames.com/winners.php"})
+    assert [p.url for _, p in winners] == ["https://siciliangames.com/winners.php"]
+    assert index.search("volleyball") == []
+
+
+def test_search_during_a_rebuild_reads_one_snapshot(monkeypatch):
+    index = SiteIndex()
+    index.build([Passage("https://siciliangames.com/schedule.php", f"Cricket match {i}") for i in range(5)])
+    tokenize = site_index.tokenize
+
+    def rebuild_mid_search(text):
+        # Another request refreshes the index after this search has started
+        if text == "cricket":
+            index.build([Passage("https://siciliangames.com/winners.php", "Cricket winners")])
+        return tokenize(text)
+
+    monkeypatch.setattr(site_index, "tokenize", rebuild_mid_search)
+    top = index.search("cricket", k=5)
+    assert len(top) == 5 and {p.url for _, p in top} == {"https://siciliangames.com/schedule.php"}
+    assert [p.text for _, p in index.search("cricket winners")] == ["Cricket winners"]
@@ -0,0 +1,160 @@
+"""Tests for speculative schema retrieval alongside classification"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from src.agents import nodes as nodes_module
+from src.agents.nodes import AgentNodes
+from src.config import Settings
+from src.utils import metrics
+
+
+QUESTION = "how many cricket teams are allowed"
+
+
+class FakeConversationManager:
+    def __init__(self, history):
+        self.history = history
+
+    def get_history(self, thread_id, limit=None):
+        return "", self.history
+
+    def get_last_messages(self, thread_id, limit=None):
+        return self.history
+
+
+class FakeTool:
+    def __init__(self, content):
+        self.content, self.calls = content, []
+
+    def invoke(self, tool_call):
+        self.calls.append(tool_call)
+        return ToolMessage(content=self.content, tool_call_id=tool_call["id"])
+
+
+class FakeToolkit:
+    def __init__(self):
+        self.list_tables = FakeTool("sports, quotas")
+        self.schema = FakeTool("CREATE TABLE quotas (...)")
+
+    def get_list_tables_tool_obj(self):
+        return self.list_tables
+
+    def get_schema_tool_obj(self):
+        return self.schema
+
+
+class FakeLLM:
+    def bind_tools(self, tools, tool_choice=None):
+        return self
+
+
+class FakeLLMCaller:
+    """Answers the schema call with a tool call, optionally holding it until `release` is set"""
+
+    def __init__(self):
+        self.started, self.release = threading.Event(), threading.Event()
+        self.release.set()
+        self.prompts = []
+
+    def limited(self, llm, node):
+        return llm
+
+    def invoke(self, node, llm, messages):
+        self.prompts.append(messages)
+        self.started.set()
+        self.release.wait(5)
+        return AIMessage(content="", tool_calls=[
+            {"name": "sql_db_schema", "args": {"table_names": "quotas"}, "id": "schema_1", "type": "tool_call"}
+        ])
+
+
+def make_nodes(route, history=()):
+    settings = Settings.from_env()
+    nodes = AgentNodes.__new__(AgentNodes)
+    nodes.toolkit = FakeToolkit()
+    nodes.llm = FakeLLM()
+    nodes.conversation_manager = FakeConversationManager(list(history))
+    nodes.thread_id = "t1"
+    nodes.conversation_config = settings.conversation
+    nodes.context_config = settings.context
+    nodes.model_router = None
+    nodes.intent_router = None
+    nodes.example_store = None
+    nodes.llm_caller = FakeLLMCaller()
+    nodes.user_query, nodes.llm_call = "", 1
+    nodes.classified = []
+
+    def classify_query(state):
+        # Like the real node: waits on the LLM and owns the per-request attributes meanwhile
+        nodes.llm_caller.started.wait(1)
+        nodes.user_query = state["messages"][-1].content
+        nodes.llm_call += 1
+        nodes.classified.append(state)
+        return {"messages": [AIMessage(content=route)], "route": route}
+
+    nodes.classify_query = classify_query
+    return nodes
+
+
+@pytest.fixture
+def executor(monkeypatch):
+    executor = ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(nodes_module, "_speculation_executor", executor)
+    yield executor
+    executor.shutdown(wait=True)
+
+
+@pytest.fixture
+def outcomes(monkeypatch):
+    recorded = []
+    monkeypatch.setattr(metrics, "increment", lambda name, amount=1, **labels: recorded.append((name, labels)))
+    monkeypatch.setattr(metrics, "observe", lambda *args, **labels: None)
+    return recorded
+
+
+def test_db_question_uses_the_prefetched_schema(executor, outcomes):
+    nodes = make_nodes("IN_DOMAIN_DB_QUERY", [{"role": "user", "content": QUESTION}])
+    update = nodes.speculative_prefetch({"messages": [HumanMessage(content=QUESTION)]})
+
+    assert update["route"] == "IN_DOMAIN_DB_QUERY"
+    messages = update["speculative_schema"]["messages"]
+    assert messages[0].content == "sports, quotas"
+    assert messages[1].tool_calls[0]["args"] == {"table_names": "quotas"}
+    assert messages[2].content == "CREATE TABLE quotas (...)"
+    # The schema prompt is built from the question itself, not from classify_query's attributes
+    assert any(getattr(m, "content", None) == QUESTION for m in nodes.llm_caller.prompts[0])
+    assert nodes.llm_call == 2
+
+    applied = nodes.apply_speculative_schema({**update})
+    assert applied == {"messages": messages, "speculative_schema": None}
+    assert ("speculative_schema", {"outcome": "used"}) in outcomes
+
+
+def test_non_db_question_drops_the_running_branch(executor, outcomes):
+    nodes = make_nodes("IN_DOMAIN_WEB_SEARCH", [{"role": "user", "content": QUESTION}])
+    nodes.llm_caller.release.clear()
+    update = nodes.speculative_prefetch({"messages": [HumanMessage(content=QUESTION)]})
+
+    assert update["route"] == "IN_DOMAIN_WEB_SEARCH" and update["speculative_schema"] is None
+    nodes.llm_caller.release.set()
+    executor.shutdown(wait=True)
+    # Stopped after the schema LLM call instead of running the schema query
+    assert nodes.toolkit.schema.calls == []
+    assert ("speculative_schema", {"outcome": "cancelled"}) in outcomes
+
+
+def test_follow_up_question_is_not_speculated_on(monkeypatch, outcomes):
+    monkeypatch.setattr(nodes_module, "_speculation_executor", None)  # submit would fail
+    history = [{"role": "user", "content": "how many chess players"},
+               {"role": "assistant", "content": "4"}, {"role": "user", "content": "and cricket?"}]
+    nodes = make_nodes("IN_DOMAIN_DB_QUERY", history)
+    update = nodes.speculative_prefetch({"messages": [HumanMessage(content="and cricket?")]})
+
+    assert update["route"] == "IN_DOMAIN_DB_QUERY" and update["speculative_schema"] is None
+    assert [m.content for m in nodes.classified[0]["messages"]][-3:] == ["how many chess players", "4", "and cricket?"]
+    assert nodes.toolkit.list_tables.calls == [] and nodes.llm_caller.prompts == []
+    assert ("speculative_schema", {"outcome": "skipped", "reason": "history"}) in outcomes
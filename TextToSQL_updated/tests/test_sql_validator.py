@@ -0,0 +1,93 @@
+"""Tests for the deterministic SQL validator"""
+
+from src.tools.sql_validator import clean_sql, validate_sql
+
+TABLES = ["sports_rules", "chapters"]
+
+
+def test_valid_select():
+    result = validate_sql(
+        "SELECT max_participation_per_chapter FROM sports_rules WHERE chapter_size = 'Below 40';",
+        TABLES,
+    )
+    assert result.valid
+    assert result.sql.endswith("'Below 40'")
+    assert result.tables == ["sports_rules"]
+
+
+def test_code_fences_are_stripped():
+    assert clean_sql("```sql\nSELECT 1;\n```") == "SELECT 1"
+
+
+def test_rejects_non_select():
+    result = validate_sql("DELETE FROM sports_rules", TABLES)
+    assert not result.valid
+    assert "Only SELECT" in result.error
+
+
+def test_rejects_multiple_statements():
+    result = validate_sql("SELECT 1 FROM chapters; DROP TABLE chapters", TABLES)
+    assert not result.valid
+    assert "Multiple" in result.error
+
+
+def test_keywords_inside_literals_are_ignored():
+    result = validate_sql("SELECT limitation_notes FROM sports_rules WHERE sport = 'Drop; Update'", TABLES)
+    assert result.valid
+
+
+def test_function_named_like_keyword_is_allowed():
+    result = validate_sql("SELECT REPLACE(sport, 'a', 'b') FROM sports_rules", TABLES)
+    assert result.valid
+
+
+def test_unknown_table():
+    result = validate_sql("SELECT name FROM players", TABLES)
+    assert not result.valid
+    assert "players" in result.error
+
+
+def test_comma_joined_tables_are_checked():
+    result = validate_sql("SELECT s.sport FROM sports_rules s, players p WHERE p.sport = s.sport", TABLES)
+    assert not result.valid
+    assert "players" in result.error
+    result = validate_sql("SELECT * FROM sports_rules AS s, chapters c, (SELECT 1 FROM chapters) x ORDER BY 1", TABLES)
+    assert result.valid, result.error
+    assert result.tables == ["sports_rules", "chapters"]
+    result = validate_sql("SELECT 1 FROM sports_rules s JOIN chapters c ON c.id = s.id, players p", TABLES)
+    assert "players" in result.error
+
+
+def test_tables_of_other_schemas_are_rejected():
+    result = validate_sql("SELECT table_name FROM information_schema.tables", ["tables"], "sicilian_games")
+    assert not result.valid
+    assert "information_schema.tables" in result.error
+    result = validate_sql("SELECT * FROM chapters c JOIN `other_db` . `sports_rules` s ON s.id = c.id",
+                          TABLES, "sicilian_games")
+    assert "other_db.sports_rules" in result.error
+    result = validate_sql("SELECT * FROM `Sicilian_Games`.`chapters`, sicilian_games.sports_rules",
+                          TABLES, "sicilian_games")
+    assert result.valid, result.error
+    assert result.tables == ["chapters", "sports_rules"]
+    assert not validate_sql("SELECT * FROM sicilian_games.chapters", TABLES).valid
+
+
+def test_cte_and_function_from_are_not_tables():
+    sql = (
+        "WITH q AS (SELECT sport, EXTRACT(YEAR FROM created_at) AS y FROM sports_rules) "
+        "SELECT sport FROM q JOIN chapters c ON c.id = q.y"
+    )
+    result = validate_sql(sql, TABLES)
+    assert result.valid, result.error
+    assert result.tables == ["sports_rules", "chapters"]
+
+
+def test_unbalanced_parentheses_and_quotes():
+    assert not validate_sql("SELECT COUNT(1 FROM chapters", TABLES).valid
+    assert not validate_sql("SELECT 'abc FROM chapters", TABLES).valid
+
+
+def test_empty_query():
+    result = validate_sql("", TABLES)
+    assert not result.valid
+    assert result.error == "No SQL query was generated"
@@ -0,0 +1,86 @@
+"""Tests for answer warm-up: mining frequent questions, the answer cache and coverage"""
+
+import time
+from datetime import datetime
+
+import pytest
+
+from src.config.settings import WarmupConfig
+from src.core import warmup
+from src.core.warmup import (
+    AnswerCache, AskedQuestion, asked_questions, coverage_report, invalidate_answers, next_run_delay, top_questions,
+)
+
+
+pytestmark = pytest.mark.usefixtures("redis_client")
+
+
+def at(seconds_ago):
+    return time.strftime(warmup.TIMESTAMP_FORMAT, time.localtime(time.time() - seconds_ago))
+
+
+def thread(*turns):
+    """Alternating user/assistant messages from (question, seconds_ago) pairs"""
+    messages = []
+    for question, seconds_ago in turns:
+        messages.append({"role": "user", "content": question, "timestamp": at(seconds_ago)})
+        messages.append({"role": "assistant", "content": "answer", "timestamp": at(seconds_ago - 5)})
+    return messages
+
+
+def test_only_context_free_questions_are_mined():
+    conversations = [
+        thread(("When is the final?", 7200), ("and the semi final?", 7100)),
+        thread(("when is the FINAL", 5000)),
+        thread(("when is the final", 300)),
+        thread(("who won chess", 200)),
+    ]
+    asked = asked_questions(conversations, time.time() - 86400, idle_seconds=1800)
+    assert [q.context_free for q in asked] == [True, False, True, True, True]
+    assert top_questions(asked, n=5, min_count=2) == [("When is the final?", 3)]
+    assert top_questions(asked, n=1, min_count=1) == [("When is the final?", 3)]
+    assert asked_questions(conversations, time.time() - 250, idle_seconds=1800)[0].question == "who won chess"
+
+
+def test_answer_cache_round_trip(redis_client):
+    cache = AnswerCache(WarmupConfig(enabled=True, answer_ttl=60))
+    assert cache.get("when is the final") is None
+    digest = cache.put("When is the final?", "On Sunday")
+    assert cache.get("when is the   FINAL") == "On Sunday"
+    assert 0 < redis_client.ttl(warmup.ANSWER_KEY.format(digest=digest)) <= 60
+
+
+def test_coverage_counts_live_warmed_entries():
+    cache = AnswerCache(WarmupConfig(enabled=True))
+    last_run = {"run_at": time.time() - 3600, "answer_ttl": 1800,
+                "digests": [cache.put("when is the final", "On Sunday")]}
+    asked = asked_questions([
+        thread(("When is the final?", 3000)),
+        thread(("when is the final", 600)),            # entry already expired
+        thread(("who won chess", 2000)),
+        thread(("hi", 3500), ("when is the final", 3400)),  # follow-up, not context-free
+    ], last_run["run_at"], idle_seconds=0)
+    report = coverage_report(asked, last_run)
+    assert report == {"questions": 5, "context_free": 4, "covered": 1,
+                      "coverage": 0.2, "context_free_coverage": 0.25}
+
+
+def test_invalidation_drops_answers_and_ends_coverage(redis_client):
+    cache = AnswerCache(WarmupConfig(enabled=True, answer_ttl=3600))
+    digests = [cache.put("when is the final", "On Sunday"), cache.put("who won chess", "Asha")]
+    cache.record_run(time.time() - 600, digests, {})
+    assert invalidate_answers("admin") == 2
+    assert cache.get("when is the final") is None
+    assert redis_client.keys("answer_cache:*") == []
+
+    invalidated_at = cache.last_run()["invalidated_at"]
+    asked = [AskedQuestion("when is the final", invalidated_at - 60, True),
+             AskedQuestion("who won chess", invalidated_at + 1, True)]
+    assert coverage_report(asked, cache.last_run())["covered"] == 1
+
+
+def test_next_run_delay_picks_the_next_configured_hour():
+    now = datetime(2026, 3, 2, 5, 30).timestamp()
+    assert next_run_delay([6, 16], now) == 1800
+    assert next_run_delay([6, 16], now + 3600) == 9.5 * 3600
+    assert next_run_delay([6], now + 3600) == 23.5 * 3600
@@ -0,0 +1,86 @@
+"""Tests for running the web answer strategies and the passages they read"""
+
+import asyncio
+import threading
+
+import pytest
+
+from src.agents import nodes as nodes_module
+from src.agents.nodes import AgentNodes
+from src.config.settings import SiteCrawlConfig
+from src.core.site_index import Passage, SiteIndex
+
+
+SCHEDULE = "https://siciliangames.com/schedule.php"
+
+
+@pytest.fixture
+def nodes(redis_client):
+    nodes = AgentNodes.__new__(AgentNodes)
+    nodes.site_crawl = SiteCrawlConfig(top_k=2)
+    return nodes
+
+
+def test_race_keeps_the_first_answer_and_cancels_the_rest(nodes):
+    cancelled = []
+
+    async def slow():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append("web_search")
+            raise
+        return "late answer"
+
+    async def empty():
+        return None
+
+    async def fast():
+        await asyncio.sleep(0.01)
+        return "Final on Sunday"
+
+    strategies = {"page_facts": empty, "direct_scrape": fast, "web_search": slow}
+    result = asyncio.run(nodes._run_web_strategies(strategies, "race"))
+    assert result == ("direct_scrape", "Final on Sunday", None)
+    assert cancelled == ["web_search"]
+
+
+def test_sequential_falls_through_empty_and_failed_strategies(nodes):
+    called = []
+
+    def strategy(name, answer=None, error=None):
+        async def run():
+            called.append(name)
+            if error:
+                raise RuntimeError(error)
+            return answer
+        return run
+
+    strategies = {
+        "page_facts": strategy("page_facts"),
+        "direct_scrape": strategy("direct_scrape", error="page timed out"),
+        "web_search": strategy("web_search", answer="Final on Sunday"),
+    }
+    result = asyncio.run(nodes._run_web_strategies(strategies, "sequential"))
+    assert result == ("web_search", "Final on Sunday", "page timed out")
+    assert called == ["page_facts", "direct_scrape", "web_search"]
+
+    assert asyncio.run(nodes._run_web_strategies({"page_facts": strategy("page_facts")}, "sequential")) == (
+        None, None, None
+    )
+
+
+def test_page_passages_refreshes_the_site_index_off_the_event_loop(nodes, monkeypatch):
+    index = SiteIndex()
+    index.build([Passage(SCHEDULE, "Badminton final on 12 January"), Passage(SCHEDULE, "Cricket on Sunday")])
+    refreshed_on = []
+
+    def get_site_index(urls):
+        refreshed_on.append(threading.current_thread())
+        return index
+
+    monkeypatch.setattr(nodes_module, "get_site_index", get_site_index)
+    monkeypatch.setattr(nodes_module, "crawl_urls", lambda: [SCHEDULE])
+    passages = asyncio.run(nodes._page_passages("when is the badminton final", [SCHEDULE]))
+    assert passages == ["Badminton final on 12 January"]
+    assert refreshed_on and refreshed_on[0] is not threading.main_thread()
@@ -0,0 +1,39 @@
+"""Tests for the web topic router"""
+
+from src.tools.web_scraper import DEFAULT_TOPICS_PATH, TopicRouter, WebTopic
+
+SCHEDULE = "https://siciliangames.com/schedule.php"
+WINNERS = "https://siciliangames.com/winners.php"
+INDEX = "https://siciliangames.com/index.php"
+
+
+def make_router():
+    return TopicRouter([
+        WebTopic("schedule", ["schedule", "fixtures", "match timing"], [SCHEDULE]),
+        WebTopic("winners", ["winner", "champion", "won"], [WINNERS], weight=1.5),
+        WebTopic("sponsors", ["sponsor", "partner"], [INDEX]),
+        WebTopic("about", ["organizer"], [INDEX, "https://siciliangames.com/about.php"]),
+    ])
+
+
+def test_all_matching_pages_ranked_by_weight():
+    assert make_router().route("Who is the winner of the schedule change?") == [WINNERS, SCHEDULE]
+
+
+def test_scores_add_up_across_topics_sharing_a_url():
+    urls = make_router().route("sponsor and organizer details")
+    assert urls[0] == INDEX
+    assert len(urls) == 2
+
+
+def test_whole_words_and_flexible_whitespace():
+    router = make_router()
+    assert router.route("match   timing for cricket") == [SCHEDULE]
+    assert router.route("who won badminton") == [WINNERS]
+    assert router.route("wonderful games") == []
+
+
+def test_default_config_loads():
+    router = TopicRouter.from_file(DEFAULT_TOPICS_PATH)
+    assert SCHEDULE in router.urls()
+    assert router.route("fixtures for football") == [SCHEDULE]
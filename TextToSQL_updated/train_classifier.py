@@ -0,0 +1,91 @@
+"""Train the local classify_query model from logged LLM classifications
+
+classify_query records every LLM classification in Redis
+(QUERY_CLASSIFIER_LOG_SAMPLES). This script trains the hashed n-gram
+classifier on them, reports accuracy and latency on a held-out split, and
+writes the model to QUERY_CLASSIFIER_MODEL, where running processes pick it
+up on their next request:
+
+    # Train on everything logged, hold out 20% for the report
+    python train_classifier.py
+
+    # Export the samples, or train from a JSONL export
+    python train_classifier.py --export samples.jsonl --dry-run
+    python train_classifier.py --samples samples.jsonl --min-confidence 0.95
+
+The report shows the share of held-out questions answered locally at the
+confidence threshold (coverage) and the accuracy on those, which is the
+trade-off QUERY_CLASSIFIER_MIN_CONFIDENCE controls.
+"""
+
+import argparse
+import json
+import random
+import sys
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from src.config import Settings
+from src.core.query_classifier import QueryClassifier, evaluate, load_samples
+
+
+def read_jsonl(path: str) -> list[dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def print_report(title: str, report: dict, min_confidence: float) -> None:
+    print(f"\n{title}: {report['samples']} samples")
+    print(f"  accuracy            {report['accuracy']:.3f}")
+    print(f"  coverage @ {min_confidence:.2f}     {report['coverage']:.3f}")
+    print(f"  accuracy of covered {report['covered_accuracy']:.3f}")
+    print(f"  latency p50 / p99   {report['latency_ms_p50']:.3f} / {report['latency_ms_p99']:.3f} ms")
+    print(f"  {'label':<40} {'support':>8} {'precision':>10} {'recall':>8}")
+    for label, stats in report["labels"].items():
+        print(f"  {label:<40} {stats['support']:>8} {stats['precision']:>10.3f} {stats['recall']:>8.3f}")
+
+
+def main():
+    config = Settings.from_env().query_classifier
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", help="JSONL file of samples instead of the Redis log")
+    parser.add_argument("--limit", type=int, help="use only the newest N logged samples")
+    parser.add_argument("--export", help="write the samples used to this JSONL file")
+    parser.add_argument("--output", default=config.model_path, help="model file (default: QUERY_CLASSIFIER_MODEL)")
+    parser.add_argument("--holdout", type=float, default=0.2, help="share of samples held out for the report")
+    parser.add_argument("--epochs", type=int, default=10)
+    parser.add_argument("--min-confidence", type=float, default=config.min_confidence)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--dry-run", action="store_true", help="report only, don't write the model")
+    args = parser.parse_args()
+
+    samples = read_jsonl(args.samples) if args.samples else load_samples(args.limit)
+    if args.export:
+        with open(args.export, "w", encoding="utf-8") as f:
+            for sample in samples:
+                f.write(json.dumps(sample, ensure_ascii=False) + "\n")
+        print(f"Exported {len(samples)} samples to {args.export}")
+    if len(samples) < 20:
+        print(f"Only {len(samples)} samples logged; let classify_query run on the LLM for a while first")
+        sys.exit(1)
+
+    random.Random(args.seed).shuffle(samples)
+    split = int(len(samples) * (1 - args.holdout))
+    train, test = samples[:split], samples[split:]
+    classifier = QueryClassifier.fit(train, epochs=args.epochs, seed=args.seed)
+    print_report("train", evaluate(classifier, train, args.min_confidence), args.min_confidence)
+    if test:
+        print_report("held out", evaluate(classifier, test, args.min_confidence), args.min_confidence)
+
+    if args.dry_run:
+        return
+    # Ship a model trained on every sample; the held-out report estimates its quality
+    classifier = QueryClassifier.fit(samples, epochs=args.epochs, seed=args.seed)
+    classifier.save(args.output)
+    print(f"\nWrote {args.output} ({len(classifier.weights)} features, {len(samples)} samples)")
+
+
+if __name__ == "__main__":
+    main()